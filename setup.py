@@ -88,5 +88,11 @@ setup(
         "Topic :: Security",
         "Topic :: Security :: Cryptography",
     ],
-    entry_points=dict(console_scripts=["secrets-helper=secrets_helper._commands:cli"]),
+    entry_points={
+        "console_scripts": ["secrets-helper=secrets_helper._commands:cli"],
+        "secrets_helper.backends": [
+            "aws=secrets_helper._util.secrets:AwsBackend",
+            "file=secrets_helper._util.file_backend:FileBackend",
+        ],
+    },
 )
@@ -11,6 +11,9 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """Load PyPI secrets from Secrets Manager into configured environment variables."""
+# Imported first so that package import time can be measured.
+from .timings import IMPORT_STARTED  # noqa: F401 isort:skip  pylint: disable=unused-import
+from .helper import SecretsHelper
 from .identifiers import __version__
 
-__all__ = ("__version__",)
+__all__ = ("__version__", "SecretsHelper")
@@ -11,59 +11,604 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """CLI commands."""
+import contextlib
 import functools
+import json
+import os
+import signal
 import sys
-from typing import IO, Dict, Optional, Tuple
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple
 
 import click
 
-from ._util.config import load_config
-from ._util.execute import run_command
-from ._util.secrets import load_secrets, prep_secrets
-from .identifiers import KNOWN_CONFIGS, __version__
+from ._util.accounts import (
+    DEFAULT_ACCOUNT_WORKERS,
+    DEFAULT_ROLE_SESSION_NAME,
+    AccountClients,
+    AccountResult,
+    account_id,
+    run_in_accounts,
+)
+from ._util.breaker import failure_state, reset_failure_state
+from ._util.bundle import read_bundle, write_bundle
+from ._util.cassette import REPLAY_LATENCIES
+from ._util.config import HelperConfig, load_config
+from ._util.execute import SPAWN_ENGINES, run_command
+from ._util.file_backend import seal_secrets_file
+from ._util.formats import ENV_FORMATS, format_environment
+from ._util.metrics import MetricsRecorder, merge_textfile
+from ._util.profiling import Profiler
+from ._util.projection import compile_projection
+from ._util.secret_files import SecretFileDelivery, deliver_secret_files
+from ._util.secrets import AwsBackend, expand_selectors, load_parameters, load_secrets, prep_secrets
+from ._util.selectors import DEFAULT_SELECTOR_TTL, SecretSelector, parse_tag_selector
+from ._util.supervise import ROTATE_ACTIONS, RestartLimiter, Supervisor
+from ._util.watch import DEFAULT_WATCH_INTERVAL, DEFAULT_WATCH_JITTER, SecretWatcher, watch_secrets
+from .backends import DEFAULT_BACKEND, SecretBackend, load_backend
+from .exceptions import ConfigurationError, SecretsHelperError
+from .identifiers import (
+    BACKEND_ENV,
+    BACKEND_OPTIONS_ENV,
+    BUNDLE_ENV,
+    BUNDLE_KEY_ENV,
+    METRICS_FILE_ENV,
+    SPAWN_ENGINE_ENV,
+    TRACE_FILE_ENV,
+    __version__,
+)
+from .profiles import load_profile, profile_names
+from .timings import IMPORT_STARTED, Timing, TimingRecorder, record, register_hook, timed, unregister_hook
+from .tracing import TRACEPARENT_ENV, TRACESTATE_ENV, OtlpJsonFile, TraceContext, Tracer
 
 __all__ = ("cli",)
 
 
-def _collect_secrets(func):
+@contextlib.contextmanager
+def _usage_errors() -> Iterator[None]:
+    """Report library errors as command line usage errors."""
+    try:
+        yield
+    except SecretsHelperError as error:
+        raise click.UsageError(str(error))
+
+
+_SECRET_SOURCE = "secrets_helper.secret_source"
+_BUNDLE_BACKEND = "bundle"
+_DEFAULT_ROTATE_SIGNAL = "SIGHUP" if hasattr(signal, "SIGHUP") else "SIGTERM"
+
+
+@dataclass
+class _SecretSource:
+    """Where the secrets for a command were loaded from."""
+
+    helper_config: HelperConfig
+    endpoint_url: Optional[str]
+    selector_ttl: int
+    backend: str = DEFAULT_BACKEND
+    secret_backend: Optional[SecretBackend] = None
+    secret_files: Optional[SecretFileDelivery] = None
+    secret_file_env_vars: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def pass_fds(self) -> Tuple[int, ...]:
+        """File descriptors that must be passed to the command."""
+        return self.secret_files.pass_fds if self.secret_files is not None else ()
+
+
+_selector_ttl_option = click.option(
+    "--selector-ttl",
+    type=click.IntRange(min=0),
+    default=DEFAULT_SELECTOR_TTL,
+    show_default=True,
+    help="Seconds to cache secrets resolved from prefix and tag selectors (0 disables caching)",
+)
+_shared_cache_ttl_option = click.option(
+    "--shared-cache-ttl",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Seconds to share retrieved secret values with other processes on this host (0 disables sharing)",
+)
+_endpoint_url_option = click.option("--endpoint-url", required=False, help="Secrets Manager endpoint URL")
+
+
+def _load_helper_config(func):
     @click.option("--secret", "secret_ids", multiple=True, required=False, help="Secrets Manager ARN")
-    @click.option("--config", required=False, type=click.File("r"), help="Config file")
     @click.option(
-        "--profile", required=False, type=click.Choice(list(KNOWN_CONFIGS.keys())), help="Command profile to use"
+        "--secret-prefix", "secret_prefixes", multiple=True, required=False, help="Load all secrets with name prefix"
+    )
+    @click.option(
+        "--secret-tag", "secret_tags", multiple=True, required=False, help="Load all secrets with tag (key=value)"
+    )
+    @click.option("--parameter", "parameter_names", multiple=True, required=False, help="SSM parameter name")
+    @click.option(
+        "--parameter-path",
+        "parameter_paths",
+        multiple=True,
+        required=False,
+        help="Load all SSM parameters under path",
+    )
+    @click.option(
+        "--secret-file",
+        "secret_files",
+        multiple=True,
+        required=False,
+        help="Deliver a whole secret as a file and set an environment variable to its path (SECRET_ID=ENV_VAR)",
     )
+    @click.option("--config", required=False, type=click.File("r"), help="Config file")
+    @click.option("--profile", required=False, help="Command profile to use (see the profiles command)")
     @functools.wraps(func)
-    def wrapper(*, secret_ids: Tuple[str], config: Optional[IO], profile: Optional[str], **kwargs):
+    def wrapper(
+        *,
+        secret_ids: Tuple[str],
+        secret_prefixes: Tuple[str],
+        secret_tags: Tuple[str],
+        parameter_names: Tuple[str],
+        parameter_paths: Tuple[str],
+        secret_files: Tuple[str],
+        config: Optional[IO],
+        profile: Optional[str],
+        **kwargs,
+    ):
+        if kwargs.get("bundle") is not None:
+            # A bundle holds environment variables that were already resolved from a configuration.
+            if config is not None or profile is not None or any(
+                (secret_ids, secret_prefixes, secret_tags, parameter_names, parameter_paths, secret_files)
+            ):
+                raise click.UsageError("--bundle cannot be used with --config, --profile, or secret options")
+            return func(helper_config=HelperConfig(secret_ids=[], environment_mappings={}), **kwargs)
+
         if config is None and profile is None:
             raise click.UsageError("Either --config or --profile must be provided")
 
-        helper_config = load_config(config=config, profile=profile, secret_ids=list(secret_ids))
+        with _usage_errors():
+            secret_selectors = [SecretSelector(prefix=prefix) for prefix in secret_prefixes]
+            secret_selectors.extend(parse_tag_selector(tag) for tag in secret_tags)
 
-        secret_values = load_secrets(secret_ids=helper_config.secret_ids)
-        secret_env_vars = prep_secrets(
-            environment_mappings=helper_config.environment_mappings, secret_values=secret_values
-        )
+            with timed("load_config"):
+                helper_config = load_config(
+                    config=config,
+                    profile=profile,
+                    secret_ids=list(secret_ids),
+                    secret_selectors=secret_selectors,
+                    parameter_names=list(parameter_names),
+                    parameter_paths=list(parameter_paths),
+                    secret_files=list(secret_files),
+                )
+
+        return func(helper_config=helper_config, **kwargs)
+
+    return wrapper
+
+
+def _secret_backend(*, name: str, options: Iterable[str], aws_options: Dict) -> SecretBackend:
+    """Load the backend that secrets are loaded from.
+
+    :param str name: Backend name
+    :param list options: Backend options as ``KEY=VALUE``
+    :param dict aws_options: Options that only apply to the ``aws`` backend
+    :returns: Backend
+    :raises ConfigurationError: if the options do not apply to the backend
+    """
+    parsed = {}
+    for option in options:
+        key, sep, value = option.partition("=")
+        if not sep or not key:
+            raise ConfigurationError(f'Invalid backend option "{option}". Expected "KEY=VALUE".')
+        parsed[key] = value
+
+    if name == DEFAULT_BACKEND:
+        if parsed:
+            raise ConfigurationError(f'The "{DEFAULT_BACKEND}" backend does not accept backend options')
+        return AwsBackend(**aws_options)
+
+    if aws_options["record"] is not None or aws_options["replay"] is not None:
+        raise ConfigurationError(f'--record and --replay can only be used with the "{DEFAULT_BACKEND}" backend')
+    return load_backend(name, **parsed)
+
+
+def _collect_secrets(func):
+    @_load_helper_config
+    @_selector_ttl_option
+    @_shared_cache_ttl_option
+    @_endpoint_url_option
+    @click.option(
+        "--record", required=False, type=click.Path(dir_okay=False), help="Record Secrets Manager calls to a cassette"
+    )
+    @click.option(
+        "--replay",
+        required=False,
+        type=click.Path(exists=True, dir_okay=False),
+        help="Replay Secrets Manager calls from a cassette instead of calling Secrets Manager",
+    )
+    @click.option(
+        "--replay-latency",
+        type=click.Choice(REPLAY_LATENCIES),
+        default="zero",
+        show_default=True,
+        help="Replay calls immediately or as slowly as they were recorded",
+    )
+    @click.option(
+        "--backend",
+        default=DEFAULT_BACKEND,
+        show_default=True,
+        envvar=BACKEND_ENV,
+        help="Where to load secrets from: aws, file, or the name of an installed backend plugin",
+    )
+    @click.option(
+        "--backend-option",
+        "backend_options",
+        multiple=True,
+        envvar=BACKEND_OPTIONS_ENV,
+        help="Option for the backend, as KEY=VALUE",
+    )
+    @click.option(
+        "--secret-files-dir",
+        required=False,
+        type=click.Path(file_okay=False),
+        help="Keep secret files in this directory instead of removing them when the command finishes",
+    )
+    @click.option(
+        "--secret-files-fd",
+        is_flag=True,
+        default=False,
+        help="Deliver secret files as in-memory file descriptors instead of files (Linux only)",
+    )
+    @click.option(
+        "--bundle",
+        required=False,
+        type=click.Path(exists=True, dir_okay=False),
+        envvar=BUNDLE_ENV,
+        help="Load environment variables from a bundle instead of loading secrets",
+    )
+    @click.option(
+        "--bundle-key",
+        required=False,
+        type=click.Path(exists=True, dir_okay=False),
+        envvar=BUNDLE_KEY_ENV,
+        help="PEM-encoded X25519 private key to decrypt the bundle with",
+    )
+    @functools.wraps(func)
+    def wrapper(
+        *,
+        helper_config: HelperConfig,
+        selector_ttl: int,
+        shared_cache_ttl: int,
+        endpoint_url: Optional[str],
+        record: Optional[str],
+        replay: Optional[str],
+        replay_latency: str,
+        backend: str,
+        backend_options: Tuple[str],
+        secret_files_dir: Optional[str],
+        secret_files_fd: bool,
+        bundle: Optional[str],
+        bundle_key: Optional[str],
+        **kwargs,
+    ):
+        ctx = click.get_current_context()
+        if bundle is not None:
+            if record is not None or replay is not None:
+                raise click.UsageError("--record and --replay cannot be used with --bundle")
+            with _usage_errors():
+                secret_env_vars = read_bundle(
+                    path=Path(bundle), private_key=Path(bundle_key) if bundle_key is not None else None
+                )
+            ctx.meta[_SECRET_SOURCE] = _SecretSource(
+                helper_config=helper_config,
+                endpoint_url=endpoint_url,
+                selector_ttl=selector_ttl,
+                backend=_BUNDLE_BACKEND,
+            )
+            return func(secret_env_vars=secret_env_vars, **kwargs)
+
+        with _usage_errors():
+            secret_backend = _secret_backend(
+                name=backend,
+                options=backend_options,
+                aws_options=dict(
+                    selector_ttl=selector_ttl,
+                    shared_cache_ttl=shared_cache_ttl,
+                    endpoint_url=endpoint_url,
+                    record=record,
+                    replay=replay,
+                    replay_latency=replay_latency,
+                ),
+            )
+            secret_values = load_secrets(
+                secret_ids=helper_config.secret_ids,
+                selectors=helper_config.secret_selectors,
+                parameter_names=helper_config.parameter_names,
+                parameter_paths=helper_config.parameter_paths,
+                backend=secret_backend,
+                projection=compile_projection(helper_config.environment_mappings),
+            )
+            with timed("prep_secrets"):
+                secret_env_vars = prep_secrets(
+                    environment_mappings=helper_config.environment_mappings, secret_values=secret_values
+                )
+
+            delivery = None
+            secret_file_env_vars: Dict[str, str] = {}
+            if helper_config.secret_files:
+                delivery = SecretFileDelivery(
+                    directory=Path(secret_files_dir) if secret_files_dir is not None else None,
+                    use_fds=secret_files_fd,
+                )
+                ctx.call_on_close(delivery.close)
+                with timed("secret_files"):
+                    secret_file_env_vars = deliver_secret_files(
+                        payloads=secret_backend.get_secret_payloads(secret_ids=list(helper_config.secret_files)),
+                        secret_files=helper_config.secret_files,
+                        delivery=delivery,
+                    )
+                secret_env_vars.update(secret_file_env_vars)
 
+        # Commands that keep watching the same secrets need to know where they came from.
+        ctx.meta[_SECRET_SOURCE] = _SecretSource(
+            helper_config=helper_config,
+            endpoint_url=endpoint_url,
+            selector_ttl=selector_ttl,
+            backend=backend,
+            secret_backend=secret_backend,
+            secret_files=delivery,
+            secret_file_env_vars=secret_file_env_vars,
+        )
         return func(secret_env_vars=secret_env_vars, **kwargs)
 
     return wrapper
 
 
+def _report_timings(*, recorder: TimingRecorder, timings_file: Optional[IO]):
+    """Stop collecting phase timings and report them.
+
+    :param TimingRecorder recorder: Recorder that collected the timings
+    :param IO timings_file: File to write JSON timings to (default: summary to stderr)
+    """
+    unregister_hook(recorder)
+    if timings_file is not None:
+        json.dump(recorder.as_json(), timings_file, indent=2)
+    else:
+        click.echo(recorder.summary(), err=True)
+
+
+def _report_metrics(*, recorder: MetricsRecorder, metrics_file: Path):
+    """Stop collecting metrics and add them to a textfile.
+
+    Metrics are best effort, so failing to write them only produces a warning.
+
+    :param MetricsRecorder recorder: Recorder that collected the metrics
+    :param Path metrics_file: Textfile to add the metrics to
+    """
+    unregister_hook(recorder)
+    try:
+        merge_textfile(path=metrics_file, samples=recorder.samples())
+    except OSError as error:
+        click.echo(f"Unable to write metrics to {metrics_file}: {error}", err=True)
+
+
+def _finish_trace(*, tracer: Tracer):
+    """Stop tracing and export the spans.
+
+    Tracing is best effort, so failing to export spans only produces a warning.
+
+    :param Tracer tracer: Tracer that recorded the spans
+    """
+    unregister_hook(tracer)
+    try:
+        tracer.finish()
+    except OSError as error:
+        click.echo(f"Unable to write trace spans: {error}", err=True)
+
+
 @click.group()
 @click.version_option(version=__version__)
-def cli():
+@click.option("--timings", is_flag=True, default=False, help="Print the time spent in each phase to stderr")
+@click.option("--timings-file", type=click.File("w"), help="Write the time spent in each phase to a JSON file")
+@click.option(
+    "--profile-out",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Profile secrets-helper (excluding any child process) and write pstats data to this file",
+)
+@click.option(
+    "--memory-profile", is_flag=True, default=False, help="Print the top memory allocation sites to stderr"
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    envvar=METRICS_FILE_ENV,
+    help="Add the API calls, cache hits, and latencies of this run to a Prometheus textfile",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False),
+    envvar=TRACE_FILE_ENV,
+    help="Append trace spans for this run to a file as OTLP/JSON, continuing the trace in TRACEPARENT",
+)
+def cli(
+    timings: bool,
+    timings_file: Optional[IO],
+    profile_out: Optional[str],
+    memory_profile: bool,
+    metrics_file: Optional[str],
+    trace_file: Optional[str],
+):
     """Enter CLI."""
+    if trace_file is not None:
+        command = click.get_current_context().invoked_subcommand
+        tracer = Tracer(
+            name=f"secrets-helper {command}",
+            exporter=OtlpJsonFile(trace_file),
+            parent=TraceContext.parse(os.environ.get(TRACEPARENT_ENV), os.environ.get(TRACESTATE_ENV)),
+            attributes={"secrets_helper.command": str(command)},
+        )
+        register_hook(tracer)
+        click.get_current_context().call_on_close(functools.partial(_finish_trace, tracer=tracer))
+
+    if metrics_file is not None:
+        metrics = MetricsRecorder(command=click.get_current_context().invoked_subcommand)
+        register_hook(metrics)
+        click.get_current_context().call_on_close(
+            functools.partial(_report_metrics, recorder=metrics, metrics_file=Path(metrics_file))
+        )
+
+    if profile_out is not None or memory_profile:
+        profiler = Profiler(profile_out=profile_out, memory=memory_profile)
+        profiler.start()
+        click.get_current_context().call_on_close(functools.partial(profiler.stop, report=sys.stderr))
+
+    if not timings and timings_file is None:
+        return
+
+    recorder = TimingRecorder()
+    register_hook(recorder)
+    record(Timing(phase="import", start=0.0, duration=time.perf_counter() - IMPORT_STARTED))
+    click.get_current_context().call_on_close(
+        functools.partial(_report_timings, recorder=recorder, timings_file=timings_file)
+    )
+
+
+def _secret_watcher(
+    *,
+    source: _SecretSource,
+    backend: AwsBackend,
+    initial_environment: Optional[Dict[str, str]] = None,
+    **kwargs,
+) -> SecretWatcher:
+    """Build a watcher for the secrets described by a loaded configuration.
+
+    :param _SecretSource source: Where the secrets are loaded from
+    :param AwsBackend backend: Backend that the secrets are loaded from
+    :param dict initial_environment: All environment variables, if they were already loaded
+    :returns: Watcher that has not been polled
+    """
+    client = backend.client()
+    secret_ids = expand_selectors(
+        client=client,
+        secret_ids=source.helper_config.secret_ids,
+        selectors=source.helper_config.secret_selectors,
+        selector_ttl=source.selector_ttl if backend.local_caches else 0,
+    )
+    static_environment: Dict[str, str] = {}
+    if initial_environment is None:
+        # SSM parameters do not rotate, so they are only loaded once. Secret files are only delivered once.
+        parameter_values = load_parameters(
+            parameter_names=source.helper_config.parameter_names,
+            parameter_paths=source.helper_config.parameter_paths,
+        )
+        projection = compile_projection(source.helper_config.environment_mappings)
+        if projection is not None:
+            parameter_values = projection.select(parameter_values)
+        static_environment = prep_secrets(
+            environment_mappings=source.helper_config.environment_mappings, secret_values=parameter_values
+        )
+        static_environment.update(source.secret_file_env_vars)
+    return SecretWatcher(
+        client=client,
+        secret_ids=secret_ids,
+        environment_mappings=source.helper_config.environment_mappings,
+        static_environment=static_environment,
+        initial_environment=initial_environment,
+        shared_cache=backend.shared_cache(),
+        negative_cache=backend.local_caches,
+        **kwargs,
+    )
 
 
 @cli.command(context_settings=dict(allow_interspersed_args=False, ignore_unknown_options=True))
 @_collect_secrets
 @click.option("--command", required=True, help="Command to run")
-def run(secret_env_vars: Dict[str, str], command: str):
+@click.option(
+    "--supervise",
+    is_flag=True,
+    default=False,
+    help="Keep the command running and restart or signal it when its secrets are rotated",
+)
+@click.option(
+    "--on-rotate",
+    type=click.Choice(ROTATE_ACTIONS),
+    default="restart",
+    show_default=True,
+    help="What to do with a supervised command when its secrets are rotated",
+)
+@click.option(
+    "--rotate-signal",
+    type=click.Choice(sorted(each.name for each in signal.Signals)),
+    default=_DEFAULT_ROTATE_SIGNAL,
+    show_default=True,
+    help="Signal to send a supervised command when its secrets are rotated with --on-rotate signal",
+)
+@click.option(
+    "--interval",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WATCH_INTERVAL,
+    show_default=True,
+    help="Average seconds between checks for new secret versions while supervising",
+)
+@click.option(
+    "--max-restart-backoff",
+    type=click.IntRange(min=1),
+    default=300,
+    show_default=True,
+    help="Maximum seconds between restarts of a supervised command",
+)
+@click.option(
+    "--spawn-engine",
+    type=click.Choice(SPAWN_ENGINES),
+    default="subprocess",
+    show_default=True,
+    envvar=SPAWN_ENGINE_ENV,
+    help="Start the command with subprocess or with the lower overhead posix_spawn (ignored with --supervise)",
+)
+def run(
+    secret_env_vars: Dict[str, str],
+    command: str,
+    supervise: bool,
+    on_rotate: str,
+    rotate_signal: str,
+    interval: int,
+    max_restart_backoff: int,
+    spawn_engine: str,
+):
     """Run a command with injected environment variables.
 
     :param dict secret_env_vars: Environment variables containing loaded secret values
     :param str command: Command to execute
+    :param bool supervise: Keep the command running and restart or signal it when its secrets are rotated
+    :param str on_rotate: ``restart`` or ``signal`` the supervised command when its secrets are rotated
+    :param str rotate_signal: Name of the signal to send with ``--on-rotate signal``
+    :param int interval: Average seconds between checks for new secret versions while supervising
+    :param int max_restart_backoff: Maximum seconds between restarts of a supervised command
+    :param str spawn_engine: Start the command with ``subprocess`` or ``posix_spawn``
     """
-    result = run_command(raw_command=command, extra_env_vars=secret_env_vars)
+    if supervise:
+        source = click.get_current_context().meta[_SECRET_SOURCE]
+        if not isinstance(source.secret_backend, AwsBackend):
+            raise click.UsageError(f'--supervise can only be used with the "{DEFAULT_BACKEND}" backend')
+        with _usage_errors():
+            supervisor = Supervisor(
+                command=command,
+                watcher=_secret_watcher(
+                    source=source, backend=source.secret_backend, initial_environment=secret_env_vars
+                ),
+                on_rotate=on_rotate,
+                rotate_signal=signal.Signals[rotate_signal],
+                interval=interval,
+                limiter=RestartLimiter(max_backoff=max_restart_backoff),
+                log=lambda message: click.echo(message, err=True),
+                pass_fds=source.pass_fds,
+            )
+            sys.exit(supervisor.run())
+
+    result = run_command(
+        raw_command=command,
+        extra_env_vars=secret_env_vars,
+        pass_fds=click.get_current_context().meta[_SECRET_SOURCE].pass_fds,
+        engine=spawn_engine,
+    )
 
     if result.stdout:
         click.echo(result.stdout)
@@ -74,13 +619,329 @@ def run(secret_env_vars: Dict[str, str], command: str):
     sys.exit(result.returncode)
 
 
+def _echo_account_result(result: AccountResult):
+    """Print the result of running a command in one account."""
+    if result.error is not None:
+        click.echo(f"==> {result.account_id or '?'} ({result.role_arn}): error: {result.error}")
+        return
+
+    click.echo(f"==> {result.account_id} ({result.role_arn}): exit {result.returncode} in {result.duration:.2f}s")
+    if result.stdout:
+        click.echo(result.stdout.rstrip("\n"))
+    if result.stderr:
+        click.echo(result.stderr.rstrip("\n"), err=True)
+
+
+@cli.command(name="run-accounts", context_settings=dict(allow_interspersed_args=False, ignore_unknown_options=True))
+@_load_helper_config
+@_selector_ttl_option
+@_shared_cache_ttl_option
+@_endpoint_url_option
+@click.option("--command", required=True, help="Command to run in each account")
+@click.option("--role-arn", "role_arns", multiple=True, required=False, help="IAM role to run the command as")
+@click.option(
+    "--role-arns-file",
+    required=False,
+    type=click.File("r"),
+    help="File listing IAM roles to run the command as, one per line",
+)
+@click.option(
+    "--role-session-name",
+    default=DEFAULT_ROLE_SESSION_NAME,
+    show_default=True,
+    help="Session name to use when assuming roles",
+)
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_ACCOUNT_WORKERS,
+    show_default=True,
+    help="Maximum number of accounts to run the command in at once",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Report results per account as text or as JSON",
+)
+def run_accounts(
+    helper_config: HelperConfig,
+    selector_ttl: int,
+    shared_cache_ttl: int,
+    endpoint_url: Optional[str],
+    command: str,
+    role_arns: Tuple[str],
+    role_arns_file: Optional[IO],
+    role_session_name: str,
+    max_workers: int,
+    output_format: str,
+):
+    """Run a command in many accounts, assuming a role and loading secrets in each.
+
+    Exits successfully only if the command succeeds in every account.
+
+    :param HelperConfig helper_config: Loaded configuration
+    :param int selector_ttl: Seconds to cache secrets resolved from selectors
+    :param int shared_cache_ttl: Seconds to share retrieved secret values with other processes
+    :param str endpoint_url: Secrets Manager endpoint URL
+    :param str command: Command to run in each account
+    :param tuple role_arns: IAM roles to run the command as
+    :param role_arns_file: File listing IAM roles to run the command as
+    :param str role_session_name: Session name to use when assuming roles
+    :param int max_workers: Maximum number of accounts to run the command in at once
+    :param str output_format: ``text`` or ``json``
+    """
+    all_role_arns = list(role_arns)
+    if role_arns_file is not None:
+        for line in role_arns_file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                all_role_arns.append(line)
+
+    if not all_role_arns:
+        raise click.UsageError("Either --role-arn or --role-arns-file must be provided")
+    if helper_config.secret_files:
+        raise click.UsageError("--secret-file cannot be used with run-accounts")
+
+    with _usage_errors():
+        for role_arn in all_role_arns:
+            account_id(role_arn)
+        results = run_in_accounts(
+            clients=AccountClients(endpoint_url=endpoint_url, role_session_name=role_session_name),
+            role_arns=all_role_arns,
+            command=command,
+            secret_ids=helper_config.secret_ids,
+            environment_mappings=helper_config.environment_mappings,
+            selectors=helper_config.secret_selectors,
+            selector_ttl=selector_ttl,
+            shared_cache_ttl=shared_cache_ttl,
+            parameter_names=helper_config.parameter_names,
+            parameter_paths=helper_config.parameter_paths,
+            max_workers=max_workers,
+        )
+
+    if output_format == "json":
+        click.echo(json.dumps([dict(asdict(result), succeeded=result.succeeded) for result in results], indent=2))
+    else:
+        for result in results:
+            _echo_account_result(result)
+
+    succeeded = sum(result.succeeded for result in results)
+    click.echo(f"Command succeeded in {succeeded} of {len(results)} accounts", err=True)
+    sys.exit(0 if succeeded == len(results) else 1)
+
+
 @cli.command(context_settings=dict(allow_interspersed_args=False, ignore_unknown_options=True))
 @_collect_secrets
-def env(secret_env_vars: Dict[str, str]):
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(ENV_FORMATS),
+    default="dotenv",
+    show_default=True,
+    help="Format to print environment variables in",
+)
+def env(secret_env_vars: Dict[str, str], output_format: str):
     """Print out secret environment variables for processing by ``env`` or a similar program.
 
     :param dict secret_env_vars: Environment variables containing loaded secret values
+    :param str output_format: Format to print environment variables in
+    """
+    secret_files = click.get_current_context().meta[_SECRET_SOURCE].secret_files
+    if secret_files is not None and not secret_files.persistent:
+        raise click.UsageError("--secret-files-dir is required to print the locations of secret files")
+    with _usage_errors():
+        output = format_environment(environment=secret_env_vars, output_format=output_format)
+    # A single write, so that consumers never see a partial variable.
+    click.echo(output, nl=False)
+    sys.exit(0)
+
+
+@cli.command()
+@_load_helper_config
+@_selector_ttl_option
+@_endpoint_url_option
+@click.option(
+    "--env-file", required=False, type=click.Path(dir_okay=False), help="Keep all environment variables in this file"
+)
+@click.option(
+    "--secrets-dir",
+    required=False,
+    type=click.Path(file_okay=False),
+    help="Keep each environment variable in its own file in this directory",
+)
+@click.option(
+    "--interval",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WATCH_INTERVAL,
+    show_default=True,
+    help="Average seconds between checks for new secret versions",
+)
+@click.option(
+    "--jitter",
+    type=click.FloatRange(min=0, max=1),
+    default=DEFAULT_WATCH_JITTER,
+    show_default=True,
+    help="Fraction of the interval to randomly vary each check by",
+)
+@click.option("--once", is_flag=True, default=False, help="Write the outputs once and exit")
+def watch(
+    helper_config: HelperConfig,
+    selector_ttl: int,
+    endpoint_url: Optional[str],
+    env_file: Optional[str],
+    secrets_dir: Optional[str],
+    interval: int,
+    jitter: float,
+    once: bool,
+):
+    """Keep secret environment variables up to date in files as secrets are rotated.
+
+    :param HelperConfig helper_config: Loaded configuration
+    :param int selector_ttl: Seconds to cache secrets resolved from selectors
+    :param str endpoint_url: Secrets Manager endpoint URL
+    :param str env_file: File to keep all environment variables in
+    :param str secrets_dir: Directory to keep each environment variable in as a separate file
+    :param int interval: Average seconds between checks for new secret versions
+    :param float jitter: Fraction of the interval to randomly vary each check by
+    :param bool once: Write the outputs once and exit
+    """
+    if env_file is None and secrets_dir is None:
+        raise click.UsageError("Either --env-file or --secrets-dir must be provided")
+    if helper_config.secret_files:
+        raise click.UsageError("--secret-file cannot be used with watch")
+
+    source = _SecretSource(helper_config=helper_config, endpoint_url=endpoint_url, selector_ttl=selector_ttl)
+    with _usage_errors():
+        watcher = _secret_watcher(
+            source=source,
+            backend=AwsBackend(selector_ttl=selector_ttl, endpoint_url=endpoint_url),
+            env_file=None if env_file is None else Path(env_file),
+            secrets_dir=None if secrets_dir is None else Path(secrets_dir),
+        )
+        watch_secrets(
+            watcher=watcher,
+            interval=interval,
+            jitter=jitter,
+            on_change=lambda changed: click.echo(f"Updated {', '.join(sorted(changed))}", err=True),
+            on_error=lambda error: click.echo(f"Error: {error}", err=True),
+            iterations=1 if once else None,
+        )
+    sys.exit(0)
+
+
+@cli.command(context_settings=dict(allow_interspersed_args=False, ignore_unknown_options=True))
+@_collect_secrets
+@click.option("--output", required=True, type=click.Path(dir_okay=False), help="Bundle file to write")
+@click.option(
+    "--ttl",
+    type=click.IntRange(min=1),
+    default=3600,
+    show_default=True,
+    help="Seconds until the bundle expires",
+)
+@click.option(
+    "--recipient-key",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False),
+    help="PEM-encoded X25519 public key to encrypt the bundle for",
+)
+@click.option("--kms-key-id", required=False, help="KMS key to encrypt the bundle for")
+def bundle(
+    secret_env_vars: Dict[str, str],
+    output: str,
+    ttl: int,
+    recipient_key: Optional[str],
+    kms_key_id: Optional[str],
+):
+    """Load secrets once and encrypt the resulting environment variables into a bundle for other hosts.
+
+    :param dict secret_env_vars: Environment variables containing loaded secret values
+    :param str output: Bundle file to write
+    :param int ttl: Seconds until the bundle expires
+    :param str recipient_key: PEM-encoded X25519 public key to encrypt the bundle for
+    :param str kms_key_id: KMS key to encrypt the bundle for
+    """
+    source = click.get_current_context().meta[_SECRET_SOURCE]
+    if source.backend == _BUNDLE_BACKEND:
+        raise click.UsageError("--bundle cannot be used with the bundle command")
+    if source.helper_config.secret_files:
+        raise click.UsageError("--secret-file cannot be used with the bundle command")
+    if (recipient_key is None) == (kms_key_id is None):
+        raise click.UsageError("Exactly one of --recipient-key and --kms-key-id must be provided")
+
+    with _usage_errors():
+        write_bundle(
+            path=Path(output),
+            environment=secret_env_vars,
+            ttl=ttl,
+            recipient_key=None if recipient_key is None else Path(recipient_key),
+            kms_key_id=kms_key_id,
+        )
+    sys.exit(0)
+
+
+@cli.command(name="seal-file")
+@click.option(
+    "--input",
+    "input_file",
+    required=True,
+    type=click.File("r"),
+    help="JSON file with secrets, tags, and parameters sections",
+)
+@click.option("--output", required=True, type=click.Path(dir_okay=False), help="Encrypted file to write")
+def seal_file(input_file: IO, output: str):
+    """Encrypt secrets and parameters into a file for the file backend.
+
+    :param IO input_file: JSON file with secrets, tags, and parameters sections
+    :param str output: Encrypted file to write
     """
-    for key, value in secret_env_vars.items():
-        click.echo(f'{key}="{value}"')
+    try:
+        contents = json.load(input_file)
+    except ValueError as error:
+        raise click.UsageError(f"Input is not JSON formatted: {error}")
+
+    with _usage_errors():
+        seal_secrets_file(path=Path(output), contents=contents)
+    sys.exit(0)
+
+
+@cli.command()
+@click.option("--show", "show_name", required=False, help="Print the environment mappings of this profile")
+def profiles(show_name: Optional[str]):
+    """List the available command profiles.
+
+    :param str show_name: Print the environment mappings of this profile instead
+    """
+    with _usage_errors():
+        if show_name is not None:
+            for key, env_var in load_profile(show_name).items():
+                click.echo(f"{key}: {env_var}")
+        else:
+            for name in profile_names():
+                click.echo(name)
+    sys.exit(0)
+
+
+@cli.command()
+@click.option("--reset", is_flag=True, default=False, help="Forget all cached failures and circuit breaker state")
+def diagnostics(reset: bool):
+    """Show cached secret failures and circuit breaker state shared by all invocations.
+
+    :param bool reset: Forget all cached failures and circuit breaker state
+    """
+    if reset:
+        reset_failure_state()
+        sys.exit(0)
+
+    now = time.time()
+    for entry in failure_state():
+        remaining = "" if entry["until"] is None else f" ({max(entry['until'] - now, 0):.0f}s remaining)"
+        if entry["kind"] == "circuit":
+            click.echo(
+                f'circuit "{entry["endpoint"]}": {entry["state"]} after {entry["failures"]} failures{remaining}'
+            )
+        else:
+            click.echo(f'secret "{entry["secret_id"]}": {entry["error"]}{remaining}')
     sys.exit(0)
@@ -0,0 +1,337 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for running a command in many AWS accounts."""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import boto3
+import botocore.credentials
+import botocore.exceptions
+import botocore.session
+import click
+
+from ..exceptions import ConfigurationError, SecretsHelperError
+from .cache import atomic_write, cache_dir
+from .crypto import local_key, seal, unseal
+from .execute import run_command
+from .identity import SecretIdIndex
+from .parameters import get_parameter_values
+from .projection import compile_projection
+from .secrets import LazyClient, decode_secret, fetch_raw_secret_values, merge_secret_values, prep_secrets
+from .selectors import SecretSelector
+
+__all__ = (
+    "AccountClients",
+    "AccountResult",
+    "DEFAULT_ACCOUNT_WORKERS",
+    "DEFAULT_ROLE_SESSION_NAME",
+    "account_id",
+    "run_in_accounts",
+)
+DEFAULT_ACCOUNT_WORKERS = 8
+DEFAULT_ROLE_SESSION_NAME = "secrets-helper"
+_ROLE_ARN = re.compile(r"^arn:aws[a-zA-Z-]*:iam::(?P<account>[0-9]{12}):role/.+$")
+_CREDENTIALS_DIR = "credentials"
+_ASSOCIATED_DATA = b"secrets-helper assume-role credentials"
+
+
+def account_id(role_arn: str) -> str:
+    """Extract the account ID from a role ARN.
+
+    :param str role_arn: IAM role ARN
+    :returns: Account ID
+    :rtype: str
+    :raises ConfigurationError: if ``role_arn`` is not an IAM role ARN
+    """
+    match = _ROLE_ARN.match(role_arn)
+    if match is None:
+        raise ConfigurationError(f'"{role_arn}" is not an IAM role ARN')
+    return match.group("account")
+
+
+class _SealedCredentialCache:
+    """Encrypted file cache for assumed role credentials, shared with other invocations.
+
+    Implements the mapping interface that botocore credential fetchers expect.
+    """
+
+    def __init__(self, *, directory: Optional[Path] = None):
+        self._directory = directory if directory is not None else cache_dir() / _CREDENTIALS_DIR
+        self._directory.mkdir(mode=0o700, exist_ok=True)
+        self._key = local_key()
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.entry"
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, key: str) -> Dict:
+        try:
+            sealed = self._path(key).read_bytes()
+            plaintext = unseal(key=self._key, sealed=sealed, associated_data=_ASSOCIATED_DATA + key.encode("utf-8"))
+        except (OSError, ValueError):
+            raise KeyError(key)
+        return json.loads(plaintext.decode("utf-8"))
+
+    def __setitem__(self, key: str, value: Dict):
+        plaintext = json.dumps(value, default=lambda each: each.isoformat()).encode("utf-8")
+        sealed = seal(key=self._key, plaintext=plaintext, associated_data=_ASSOCIATED_DATA + key.encode("utf-8"))
+        try:
+            atomic_write(path=self._path(key), data=sealed)
+        except OSError:
+            # Credentials are still used, just not shared with other invocations.
+            pass
+
+
+class _AssumeRoleProvider(botocore.credentials.CredentialProvider):
+    """Credential provider that assumes a role the first time credentials are used."""
+
+    METHOD = "assume-role"
+
+    def __init__(self, fetcher: botocore.credentials.AssumeRoleCredentialFetcher):
+        super().__init__()
+        self._fetcher = fetcher
+
+    def load(self) -> botocore.credentials.DeferredRefreshableCredentials:
+        return botocore.credentials.DeferredRefreshableCredentials(
+            method=self.METHOD, refresh_using=self._fetcher.fetch_credentials
+        )
+
+
+class AccountClients:
+    """Pool of clients, one per assumed role and service.
+
+    Roles are only assumed when their client is first used.
+    Assumed role credentials are shared with other invocations through an encrypted cache
+    and are refreshed before they expire.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: Optional[boto3.session.Session] = None,
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        role_session_name: str = DEFAULT_ROLE_SESSION_NAME,
+        credential_cache=None,
+    ):
+        """Set up without any clients.
+
+        :param session: boto3 session whose credentials are used to assume roles (default: a new session)
+        :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+        :param str region_name: AWS region (default: the region of ``session``)
+        :param str role_session_name: Session name used when assuming roles
+        :param credential_cache: Mapping to cache assumed role credentials in (default: encrypted files)
+        """
+        self._session = session if session is not None else boto3.session.Session()
+        self._endpoint_url = endpoint_url
+        self._region_name = region_name if region_name is not None else self._session.region_name
+        self._role_session_name = role_session_name
+        self._credential_cache = credential_cache
+        self._sts = None
+        self._role_sessions: Dict[str, boto3.session.Session] = {}
+        self._clients: Dict[Tuple[str, str], LazyClient] = {}
+        self._lock = threading.Lock()
+
+    def _sts_client(self, *_args, **_kwargs):
+        """Create the STS client on first use. All fetchers share it, which is safe across threads."""
+        with self._lock:
+            if self._sts is None:
+                self._sts = self._session.client("sts", region_name=self._region_name)
+            return self._sts
+
+    def _role_session(self, role_arn: str) -> boto3.session.Session:
+        """Create a session that assumes a role the first time its credentials are used. Must hold the lock."""
+        if self._credential_cache is None:
+            try:
+                self._credential_cache = _SealedCredentialCache()
+            except OSError:
+                # Without a usable cache directory, credentials are only cached for this invocation.
+                self._credential_cache = {}
+        fetcher = botocore.credentials.AssumeRoleCredentialFetcher(
+            client_creator=self._sts_client,
+            source_credentials=self._session.get_credentials(),
+            role_arn=role_arn,
+            extra_args=dict(RoleSessionName=self._role_session_name),
+            cache=self._credential_cache,
+        )
+        core_session = botocore.session.Session()
+        # Share loaded service models with the source session.
+        core_session.register_component(
+            "data_loader", self._session._session.get_component("data_loader")  # pylint: disable=protected-access
+        )
+        core_session.get_component("credential_provider").insert_before("env", _AssumeRoleProvider(fetcher))
+        return boto3.session.Session(botocore_session=core_session, region_name=self._region_name)
+
+    def client(self, *, role_arn: str, service_name: str = "secretsmanager") -> LazyClient:
+        """Get the client for a role, creating it if necessary.
+
+        All clients for the same role share one set of assumed role credentials.
+
+        :param str role_arn: IAM role ARN
+        :param str service_name: AWS service
+        :returns: Client that uses credentials for ``role_arn``
+        :raises ConfigurationError: if ``role_arn`` is not an IAM role ARN
+        """
+        account = account_id(role_arn)
+        with self._lock:
+            try:
+                return self._clients[(role_arn, service_name)]
+            except KeyError:
+                pass
+
+            try:
+                session = self._role_sessions[role_arn]
+            except KeyError:
+                session = self._role_sessions[role_arn] = self._role_session(role_arn)
+            client = LazyClient(
+                # The Secrets Manager endpoint does not apply to other services.
+                endpoint_url=self._endpoint_url if service_name == "secretsmanager" else None,
+                region_name=self._region_name,
+                session=session,
+                scope=account,
+                service_name=service_name,
+            )
+            self._clients[(role_arn, service_name)] = client
+            return client
+
+
+@dataclass
+class AccountResult:
+    """Result of running a command in one account.
+
+    :param str role_arn: Role the command ran as
+    :param str account_id: Account ID
+    :param int returncode: Exit code of the command (``None`` if it did not run)
+    :param str stdout: Output of the command
+    :param str stderr: Error output of the command
+    :param str error: Why the command did not run
+    :param float duration: Seconds taken to load secrets and run the command
+    """
+
+    role_arn: str
+    account_id: str
+    returncode: Optional[int] = None
+    stdout: str = ""
+    stderr: str = ""
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        """Determine whether the command ran and exited successfully."""
+        return self.returncode == 0
+
+
+def run_in_accounts(
+    *,
+    clients: AccountClients,
+    role_arns: Iterable[str],
+    command: str,
+    secret_ids: Iterable[str],
+    environment_mappings: Dict[str, str],
+    selectors: Iterable[SecretSelector] = (),
+    selector_ttl: Optional[float] = None,
+    shared_cache_ttl: Optional[float] = None,
+    parameter_names: Iterable[str] = (),
+    parameter_paths: Iterable[str] = (),
+    max_workers: int = DEFAULT_ACCOUNT_WORKERS,
+) -> List[AccountResult]:
+    """Load secrets and run a command in each account, with at most ``max_workers`` accounts at once.
+
+    A failure in one account does not stop the command from running in the others.
+
+    :param AccountClients clients: Clients to use for each role
+    :param list role_arns: Roles to run the command as
+    :param str command: Command to run
+    :param list secret_ids: Secret IDs to load in each account
+    :param dict environment_mappings: Mapping of secret keys to environment variable names
+    :param list selectors: Selectors identifying additional secrets to load in each account
+    :param float selector_ttl: Seconds that resolved selectors are cached
+    :param float shared_cache_ttl: Seconds that unpinned values are shared with other processes
+    :param list parameter_names: SSM parameter names to load in each account
+    :param list parameter_paths: SSM parameter paths to load all parameters under in each account
+    :param int max_workers: Maximum number of accounts to work on at once
+    :returns: Result for each role, in the order the roles were given
+    :rtype: list
+    :raises ConfigurationError: if any environment mapping path is empty
+    """
+    role_arns = list(dict.fromkeys(role_arns))
+    secret_ids = list(secret_ids)
+    selectors = list(selectors)
+    parameter_names = list(parameter_names)
+    parameter_paths = list(parameter_paths)
+    projection = compile_projection(environment_mappings)
+
+    def _run(role_arn: str) -> AccountResult:
+        start = time.perf_counter()
+        result = AccountResult(role_arn=role_arn, account_id="")
+        try:
+            result.account_id = account_id(role_arn)
+            raw_values = fetch_raw_secret_values(
+                secrets_manager=clients.client(role_arn=role_arn),
+                secret_ids=secret_ids,
+                selectors=selectors,
+                selector_ttl=selector_ttl,
+                shared_cache_ttl=shared_cache_ttl,
+                cache_pinned=True,
+                # Friendly names resolve to different ARNs in every account.
+                index=SecretIdIndex(),
+            )
+            secret_maps = [
+                decode_secret(name=name, raw_secret=raw_secret, projection=projection)
+                for name, raw_secret in raw_values
+            ]
+            if parameter_names or parameter_paths:
+                parameter_maps = get_parameter_values(
+                    client=clients.client(role_arn=role_arn, service_name="ssm"),
+                    names=parameter_names,
+                    paths=parameter_paths,
+                )
+                secret_maps.extend(
+                    parameter_maps if projection is None else (projection.select(each) for each in parameter_maps)
+                )
+            secret_values = merge_secret_values(secret_maps)
+            env_vars = prep_secrets(environment_mappings=environment_mappings, secret_values=secret_values)
+            completed = run_command(raw_command=command, extra_env_vars=env_vars)
+        except (SecretsHelperError, botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+            result.error = str(error)
+        except click.UsageError as error:
+            # The command refers to a variable that is not loaded in this account.
+            result.error = error.format_message()
+        except OSError as error:
+            # The command could not be started.
+            result.error = str(error)
+        else:
+            result.returncode = completed.returncode
+            result.stdout = completed.stdout.decode("utf-8", errors="replace")
+            result.stderr = completed.stderr.decode("utf-8", errors="replace")
+        result.duration = time.perf_counter() - start
+        return result
+
+    if not role_arns:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(role_arns))) as executor:
+        return list(executor.map(_run, role_arns))
@@ -0,0 +1,319 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for failing fast on secrets and endpoints that are known to be failing.
+
+State is shared with other invocations through the cache directory.
+If the cache directory cannot be written, state is kept in memory for the current process instead.
+"""
+import contextlib
+import hashlib
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import botocore.exceptions
+
+from ..exceptions import CircuitOpenError, SecretRetrievalError
+from .cache import cache_dir, cached_entries, exclusive_lock, read_cached_json, write_cached_json
+
+__all__ = (
+    "CircuitBreaker",
+    "check_negative_cache",
+    "record_negative_cache",
+    "is_transient_failure",
+    "failure_state",
+    "reset_failure_state",
+)
+NEGATIVE_CACHE_ERRORS = ("ResourceNotFoundException", "AccessDeniedException")
+NEGATIVE_CACHE_TTL = 30
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+_TRANSIENT_ERRORS = (
+    botocore.exceptions.ConnectTimeoutError,
+    botocore.exceptions.ReadTimeoutError,
+    botocore.exceptions.EndpointConnectionError,
+)
+_NEGATIVE_CACHE_DIR = "failures"
+_BREAKER_DIR = "breakers"
+_IN_MEMORY_STATE: Dict[Tuple[str, ...], Tuple[Any, Optional[float]]] = {}
+_IN_MEMORY_LOCK = threading.Lock()
+
+
+def _state_path(group: str, *parts: str) -> Optional[Path]:
+    """Locate the state file for a negative cache entry or circuit breaker.
+
+    :param str group: State group directory name
+    :param parts: Values identifying the state
+    :returns: State file or ``None`` if the cache directory is not usable
+    """
+    try:
+        directory = cache_dir() / group
+        directory.mkdir(mode=0o700, exist_ok=True)
+    except OSError:
+        return None
+    key = hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return directory / f"{key}.json"
+
+
+def _read_state(group: str, *parts: str) -> Optional[Any]:
+    """Read shared state, falling back to state kept in memory by this process.
+
+    :param str group: State group directory name
+    :param parts: Values identifying the state
+    :returns: State or ``None`` if no unexpired state is found
+    """
+    path = _state_path(group, *parts)
+    if path is not None:
+        value = read_cached_json(path=path)
+        if value is not None:
+            return value
+
+    with _IN_MEMORY_LOCK:
+        entry = _IN_MEMORY_STATE.get((group,) + parts)
+    if entry is None or (entry[1] is not None and entry[1] < time.time()):
+        return None
+    return entry[0]
+
+
+def _write_state(group: str, *parts: str, value: Any, ttl: Optional[float]):
+    """Share state with other invocations, keeping it in memory if the cache directory cannot be written.
+
+    :param str group: State group directory name
+    :param parts: Values identifying the state
+    :param value: State
+    :param float ttl: Seconds that the state remains valid (``None`` never expires)
+    """
+    path = _state_path(group, *parts)
+    if path is not None:
+        try:
+            write_cached_json(path=path, value=value, ttl=ttl)
+            return
+        except OSError:
+            pass
+
+    with _IN_MEMORY_LOCK:
+        _IN_MEMORY_STATE[(group,) + parts] = (value, None if ttl is None else time.time() + ttl)
+
+
+def _state_entries(group: str) -> Iterator[Tuple[Any, Optional[float]]]:
+    """Read every unexpired state entry in a group, whether shared or kept in memory.
+
+    :param str group: State group directory name
+    :returns: State and expiry time of each entry
+    :rtype: iterator
+    """
+    try:
+        directory: Optional[Path] = cache_dir() / group
+    except OSError:
+        directory = None
+    if directory is not None:
+        for _path, value, expires in cached_entries(directory=directory):
+            yield value, expires
+
+    now = time.time()
+    with _IN_MEMORY_LOCK:
+        entries = [entry for key, entry in _IN_MEMORY_STATE.items() if key[0] == group]
+    for value, expires in entries:
+        if expires is None or expires >= now:
+            yield value, expires
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    """Extract the AWS error code from an error, if it has one.
+
+    :param error: Error raised by botocore
+    :returns: Error code
+    """
+    if isinstance(error, botocore.exceptions.ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+
+def check_negative_cache(*, endpoint: str, principal: str, secret_id: str):
+    """Fail immediately if retrieving a secret recently failed with a permanent error.
+
+    :param str endpoint: Secrets Manager endpoint URL
+    :param str principal: Identifies the credentials that the secret was retrieved with
+    :param str secret_id: Secret identifier
+    :raises SecretRetrievalError: if a recent failure is cached
+    """
+    cached = _read_state(_NEGATIVE_CACHE_DIR, endpoint, principal, secret_id)
+    if cached is not None:
+        raise SecretRetrievalError(
+            f'Encountered AWS error for secret "{secret_id}": "{cached["error"]}" (cached failure)'
+        )
+
+
+def record_negative_cache(
+    *, endpoint: str, principal: str, secret_id: str, error: Exception, ttl: float = NEGATIVE_CACHE_TTL
+):
+    """Cache a failure to retrieve a secret if the failure is not expected to resolve itself immediately.
+
+    Failures are cached per principal because another principal might be allowed to read the secret.
+
+    :param str endpoint: Secrets Manager endpoint URL
+    :param str principal: Identifies the credentials that the secret was retrieved with
+    :param str secret_id: Secret identifier
+    :param error: Error raised by botocore
+    :param float ttl: Seconds to cache the failure
+    """
+    if _error_code(error) not in NEGATIVE_CACHE_ERRORS:
+        return
+
+    _write_state(
+        _NEGATIVE_CACHE_DIR,
+        endpoint,
+        principal,
+        secret_id,
+        value=dict(endpoint=endpoint, secret_id=secret_id, error=str(error)),
+        ttl=ttl,
+    )
+
+
+def is_transient_failure(error: Exception) -> bool:
+    """Determine whether an error indicates that the endpoint itself is failing.
+
+    :param error: Error raised by botocore
+    :returns: Decision
+    """
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return True
+
+    if isinstance(error, botocore.exceptions.ClientError):
+        return error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500
+
+    return False
+
+
+class CircuitBreaker:
+    """Circuit breaker shared by every invocation that calls the same endpoint.
+
+    After ``threshold`` consecutive server errors or timeouts the circuit opens
+    and all calls fail immediately for ``reset_timeout`` seconds.
+    The next call after that is allowed through:
+    if it succeeds the circuit closes and if it fails the circuit opens again.
+
+    :param str endpoint: Endpoint URL
+    :param int threshold: Consecutive failures that open the circuit
+    :param float reset_timeout: Seconds that the circuit stays open
+    :param bool persistent: Share the circuit state with other invocations (default: True)
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint: str,
+        threshold: int = BREAKER_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        persistent: bool = True,
+    ):
+        """Load the shared circuit state."""
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._state: Dict = dict(failures=0, opened_until=None)
+        self._load()
+
+    def _load(self):
+        """Pick up circuit state changes made by other invocations."""
+        if not self.persistent:
+            return
+        state = _read_state(_BREAKER_DIR, self.endpoint) or {}
+        self._state = dict(failures=state.get("failures", 0), opened_until=state.get("opened_until"))
+
+    def _save(self):
+        """Share the circuit state with other invocations."""
+        if self.persistent:
+            _write_state(_BREAKER_DIR, self.endpoint, value=dict(endpoint=self.endpoint, **self._state), ttl=None)
+
+    @contextlib.contextmanager
+    def _update(self) -> Iterator[None]:
+        """Hold the circuit state exclusively while reading, modifying, and saving it."""
+        with self._lock, contextlib.ExitStack() as stack:
+            path = _state_path(_BREAKER_DIR, self.endpoint) if self.persistent else None
+            if path is not None:
+                with contextlib.suppress(OSError):
+                    stack.enter_context(exclusive_lock(path.with_suffix(".lock")))
+            self._load()
+            yield
+
+    def check(self):
+        """Fail immediately if the circuit is open.
+
+        :raises CircuitOpenError: if the circuit is open
+        """
+        with self._lock:
+            self._load()
+            opened_until = self._state.get("opened_until")
+        if opened_until is not None and opened_until > time.time():
+            raise CircuitOpenError(
+                f'Too many recent failures calling "{self.endpoint}". '
+                f"Not retrying for another {opened_until - time.time():.0f} seconds."
+            )
+
+    def record_success(self):
+        """Close the circuit."""
+        with self._update():
+            if self._state["failures"] or self._state.get("opened_until") is not None:
+                self._state = dict(failures=0, opened_until=None)
+                self._save()
+
+    def record_failure(self, error: Exception):
+        """Count a failure, opening the circuit if the error indicates that the endpoint is failing.
+
+        :param error: Error raised by botocore
+        """
+        if not is_transient_failure(error):
+            return
+
+        with self._update():
+            self._state["failures"] += 1
+            if self._state["failures"] >= self.threshold:
+                self._state["opened_until"] = time.time() + self.reset_timeout
+            self._save()
+
+
+def failure_state() -> Iterator[Dict]:
+    """Describe every cached failure and every circuit breaker that has recorded failures.
+
+    :returns: Description of each entry
+    :rtype: iterator
+    """
+    now = time.time()
+    for value, _expires in _state_entries(_BREAKER_DIR):
+        if not value.get("failures"):
+            continue
+        opened_until = value.get("opened_until")
+        state = "open" if opened_until is not None and opened_until > now else "closed"
+        yield dict(
+            kind="circuit", endpoint=value["endpoint"], state=state, failures=value["failures"], until=opened_until
+        )
+
+    for value, expires in _state_entries(_NEGATIVE_CACHE_DIR):
+        yield dict(kind="failure", until=expires, **value)
+
+
+def reset_failure_state():
+    """Forget every cached failure and every circuit breaker state."""
+    with _IN_MEMORY_LOCK:
+        _IN_MEMORY_STATE.clear()
+    try:
+        directory = cache_dir()
+    except OSError:
+        return
+    for group in (_NEGATIVE_CACHE_DIR, _BREAKER_DIR):
+        shutil.rmtree(str(directory / group), ignore_errors=True)
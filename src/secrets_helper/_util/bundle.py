@@ -0,0 +1,226 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for sealed bundles of resolved environment variables.
+
+A bundle lets one coordinator retrieve secrets once and share the result with many workers.
+It holds the environment variables that a configuration resolved to,
+encrypted for either an X25519 recipient key or a KMS key,
+and it stops being accepted when it expires.
+The header, including the expiry, is authenticated along with the encrypted environment.
+"""
+import base64
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import boto3
+import botocore.exceptions
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from ..exceptions import ConfigurationError, SecretFormatError, SecretRetrievalError
+from ..timings import timed
+from .cache import atomic_write
+from .crypto import seal, unseal
+
+__all__ = ("read_bundle", "write_bundle")
+_MAGIC = b"SHBUNDLE1\n"
+_KDF_INFO = b"secrets-helper bundle"
+_KMS_CONTEXT = "secrets-helper-bundle"
+_KEY_BYTES = 32
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _raw_public_key(key: X25519PublicKey) -> bytes:
+    return key.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
+
+
+def _derive_key(*, shared_secret: bytes, ephemeral_public_key: bytes, recipient_public_key: bytes) -> bytes:
+    """Derive the bundle key from an X25519 shared secret, bound to both public keys."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=_KEY_BYTES,
+        salt=None,
+        info=_KDF_INFO + ephemeral_public_key + recipient_public_key,
+        backend=default_backend(),
+    ).derive(shared_secret)
+
+
+def _load_recipient_key(path: Path) -> X25519PublicKey:
+    """Load a PEM-encoded X25519 public key.
+
+    :raises ConfigurationError: if the file is not an X25519 public key
+    """
+    try:
+        key = serialization.load_pem_public_key(path.read_bytes(), backend=default_backend())
+    except (OSError, ValueError) as error:
+        raise ConfigurationError(f'Unable to load recipient key "{path}": {error}')
+    if not isinstance(key, X25519PublicKey):
+        raise ConfigurationError(f'Recipient key "{path}" is not an X25519 public key')
+    return key
+
+
+def _load_private_key(path: Path) -> X25519PrivateKey:
+    """Load a PEM-encoded X25519 private key.
+
+    :raises ConfigurationError: if the file is not an X25519 private key
+    """
+    try:
+        key = serialization.load_pem_private_key(path.read_bytes(), password=None, backend=default_backend())
+    except (OSError, ValueError, TypeError) as error:
+        raise ConfigurationError(f'Unable to load bundle key "{path}": {error}')
+    if not isinstance(key, X25519PrivateKey):
+        raise ConfigurationError(f'Bundle key "{path}" is not an X25519 private key')
+    return key
+
+
+def _kms_context(expires: int) -> Dict[str, str]:
+    return {_KMS_CONTEXT: str(expires)}
+
+
+def write_bundle(
+    *,
+    path: Path,
+    environment: Dict[str, str],
+    ttl: float,
+    recipient_key: Optional[Path] = None,
+    kms_key_id: Optional[str] = None,
+    kms_client=None,
+):
+    """Encrypt resolved environment variables into a bundle.
+
+    :param Path path: Bundle file to write
+    :param dict environment: Environment variables to bundle
+    :param float ttl: Seconds until the bundle expires
+    :param Path recipient_key: PEM-encoded X25519 public key to encrypt the bundle for
+    :param str kms_key_id: KMS key to encrypt the bundle for
+    :param kms_client: KMS client (default: a client for the default session)
+    :raises ConfigurationError: if not exactly one of ``recipient_key`` and ``kms_key_id`` is provided
+    :raises SecretRetrievalError: if KMS cannot generate a data key
+    """
+    if (recipient_key is None) == (kms_key_id is None):
+        raise ConfigurationError("Bundles must be encrypted for exactly one recipient key or KMS key")
+
+    expires = int(time.time() + ttl)
+    if recipient_key is not None:
+        recipient = _load_recipient_key(recipient_key)
+        ephemeral = X25519PrivateKey.generate()
+        ephemeral_public_key = _raw_public_key(ephemeral.public_key())
+        recipient_public_key = _raw_public_key(recipient)
+        key = _derive_key(
+            shared_secret=ephemeral.exchange(recipient),
+            ephemeral_public_key=ephemeral_public_key,
+            recipient_public_key=recipient_public_key,
+        )
+        key_info = dict(
+            type="x25519", ephemeral_public_key=_b64(ephemeral_public_key), recipient=_b64(recipient_public_key)
+        )
+    else:
+        kms_client = kms_client if kms_client is not None else boto3.client("kms")
+        try:
+            with timed("generate_data_key", kms_key_id):
+                response = kms_client.generate_data_key(
+                    KeyId=kms_key_id, KeySpec="AES_256", EncryptionContext=_kms_context(expires)
+                )
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+            raise SecretRetrievalError(f'Encountered AWS error for KMS key "{kms_key_id}": "{error}"')
+        key = response["Plaintext"]
+        key_info = dict(type="kms", key_id=response["KeyId"], encrypted_key=_b64(response["CiphertextBlob"]))
+
+    header = json.dumps(dict(expires=expires, key=key_info), sort_keys=True).encode("utf-8")
+    plaintext = json.dumps(dict(environment=environment)).encode("utf-8")
+    sealed = seal(key=key, plaintext=plaintext, associated_data=_MAGIC + header)
+    atomic_write(path=path, data=_MAGIC + header + b"\n" + sealed)
+
+
+def _bundle_key(*, path: Path, key_info: Dict, expires: int, private_key: Optional[Path], kms_client) -> bytes:
+    """Recover the key that a bundle was encrypted with.
+
+    :raises ConfigurationError: if the bundle is not encrypted for the provided key
+    :raises SecretRetrievalError: if KMS cannot decrypt the data key
+    """
+    try:
+        if key_info["type"] == "x25519":
+            if private_key is None:
+                raise ConfigurationError(f'Bundle "{path}" is encrypted for a recipient key. Provide --bundle-key.')
+            key = _load_private_key(private_key)
+            recipient_public_key = _raw_public_key(key.public_key())
+            if _b64(recipient_public_key) != key_info["recipient"]:
+                raise ConfigurationError(f'Bundle "{path}" is not encrypted for bundle key "{private_key}"')
+            ephemeral_public_key = base64.b64decode(key_info["ephemeral_public_key"], validate=True)
+            return _derive_key(
+                shared_secret=key.exchange(X25519PublicKey.from_public_bytes(ephemeral_public_key)),
+                ephemeral_public_key=ephemeral_public_key,
+                recipient_public_key=recipient_public_key,
+            )
+
+        if key_info["type"] == "kms":
+            encrypted_key = base64.b64decode(key_info["encrypted_key"], validate=True)
+            kms_client = kms_client if kms_client is not None else boto3.client("kms")
+            try:
+                with timed("decrypt", key_info["key_id"]):
+                    response = kms_client.decrypt(
+                        CiphertextBlob=encrypted_key, KeyId=key_info["key_id"], EncryptionContext=_kms_context(expires)
+                    )
+            except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+                raise SecretRetrievalError(f'Encountered AWS error for KMS key "{key_info["key_id"]}": "{error}"')
+            return response["Plaintext"]
+    except (KeyError, TypeError, ValueError):
+        pass
+    raise SecretFormatError(f'Bundle "{path}" is corrupt')
+
+
+def read_bundle(*, path: Path, private_key: Optional[Path] = None, kms_client=None) -> Dict[str, str]:
+    """Decrypt the environment variables in a bundle.
+
+    :param Path path: Bundle file
+    :param Path private_key: PEM-encoded X25519 private key, for bundles encrypted for a recipient key
+    :param kms_client: KMS client, for bundles encrypted for a KMS key (default: a client for the default session)
+    :returns: Bundled environment variables
+    :rtype: dict
+    :raises ConfigurationError: if the bundle cannot be read, has expired, or is not encrypted for the provided key
+    :raises SecretFormatError: if the bundle is corrupt or has been modified
+    :raises SecretRetrievalError: if KMS cannot decrypt the data key
+    """
+    try:
+        with timed("read_bundle"):
+            raw = path.read_bytes()
+    except OSError as error:
+        raise ConfigurationError(f'Unable to read bundle "{path}": {error}')
+
+    if not raw.startswith(_MAGIC) or b"\n" not in raw[len(_MAGIC) :]:
+        raise ConfigurationError(f'"{path}" is not a bundle')
+    header, _, sealed = raw[len(_MAGIC) :].partition(b"\n")
+    try:
+        parsed = json.loads(header.decode("utf-8"))
+        expires = int(parsed["expires"])
+        key_info = parsed["key"]
+    except (ValueError, KeyError, TypeError):
+        raise SecretFormatError(f'Bundle "{path}" is corrupt')
+
+    if expires <= time.time():
+        expired = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(expires))
+        raise ConfigurationError(f'Bundle "{path}" expired at {expired}')
+
+    key = _bundle_key(path=path, key_info=key_info, expires=expires, private_key=private_key, kms_client=kms_client)
+    try:
+        plaintext = unseal(key=key, sealed=sealed, associated_data=_MAGIC + header)
+    except ValueError:
+        raise SecretFormatError(f'Bundle "{path}" is corrupt or has been modified')
+    return json.loads(plaintext.decode("utf-8"))["environment"]
@@ -0,0 +1,148 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for caching data between invocations."""
+import contextlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+from ..identifiers import CACHE_DIR_ENV, CONFIG_NAME
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # fcntl is not available on Windows
+    fcntl = None  # type: ignore
+    import msvcrt
+
+__all__ = (
+    "atomic_write",
+    "cache_dir",
+    "cached_entries",
+    "exclusive_lock",
+    "read_cached_json",
+    "write_cached_json",
+)
+
+
+def cache_dir() -> Path:
+    """Locate the secrets-helper cache directory, creating it if necessary.
+
+    The ``SECRETS_HELPER_CACHE_DIR`` environment variable takes precedence over the user cache directory.
+
+    :returns: Cache directory
+    :rtype: Path
+    """
+    try:
+        directory = Path(os.environ[CACHE_DIR_ENV])
+    except KeyError:
+        base = os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))
+        directory = Path(base) / CONFIG_NAME
+
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return directory
+
+
+@contextlib.contextmanager
+def exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on a file, blocking until it is available.
+
+    :param Path path: Lock file
+    """
+    handle = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:  # pragma: no cover
+            msvcrt.locking(handle, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        # Closing the file releases the lock.
+        os.close(handle)
+
+
+def atomic_write(*, path: Path, data: bytes, mode: int = 0o600):
+    """Write data to a file, atomically replacing any existing file.
+
+    :param Path path: Destination file
+    :param bytes data: Data to write
+    :param int mode: File permissions (default: private to the current user)
+    """
+    handle, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+    try:
+        if mode != 0o600 and hasattr(os, "fchmod"):
+            os.fchmod(handle, mode)
+        with os.fdopen(handle, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_name, str(path))
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def _read_entry(*, path: Path) -> Optional[Tuple[Any, Optional[float]]]:
+    """Read a cache entry if it exists and has not expired.
+
+    :param Path path: Cache file
+    :returns: Cached value and expiry time or ``None`` if no usable value is cached
+    """
+    try:
+        entry = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+    expires = entry.get("expires")
+    if expires is not None and expires < time.time():
+        return None
+
+    return entry.get("value"), expires
+
+
+def read_cached_json(*, path: Path) -> Optional[Any]:
+    """Read a cached JSON value if it exists and has not expired.
+
+    :param Path path: Cache file
+    :returns: Cached value or ``None`` if no usable value is cached
+    """
+    entry = _read_entry(path=path)
+    return None if entry is None else entry[0]
+
+
+def cached_entries(*, directory: Path) -> Iterator[Tuple[Path, Any, Optional[float]]]:
+    """Read every unexpired JSON cache entry in a directory.
+
+    :param Path directory: Cache directory
+    :returns: Cache file, cached value, and expiry time for each entry
+    :rtype: iterator
+    """
+    if not directory.is_dir():
+        return
+
+    for path in sorted(directory.glob("*.json")):
+        entry = _read_entry(path=path)
+        if entry is not None:
+            yield (path, entry[0], entry[1])
+
+
+def write_cached_json(*, path: Path, value: Any, ttl: Optional[float]):
+    """Cache a JSON-serializable value.
+
+    :param Path path: Cache file
+    :param value: Value to cache
+    :param float ttl: Seconds that the value remains valid (``None`` never expires)
+    """
+    expires = None if ttl is None else time.time() + ttl
+    atomic_write(path=path, data=json.dumps(dict(expires=expires, value=value)).encode("utf-8"))
@@ -0,0 +1,272 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Record and replay Secrets Manager calls."""
+import base64
+import datetime
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import botocore.exceptions
+import botocore.session
+from botocore.errorfactory import ClientExceptionsFactory
+
+from ..exceptions import ConfigurationError, SecretRetrievalError
+from .breaker import CircuitBreaker
+from .cache import atomic_write
+from .crypto import local_key, seal, unseal
+
+__all__ = ("REPLAY_LATENCIES", "Interaction", "Cassette", "RecordingClient", "ReplayClient")
+_MAGIC = b"SHCASSETTE1\n"
+_ASSOCIATED_DATA = b"secrets-helper cassette"
+_RECORDED_OPERATIONS = ("get_secret_value", "describe_secret")
+REPLAY_LATENCIES = ("zero", "recorded")
+
+
+def _encode(value: Any) -> Any:
+    """Convert a response into JSON-compatible values.
+
+    :param value: Response or part of a response
+    :returns: JSON-compatible value
+    """
+    if isinstance(value, dict):
+        return {key: _encode(each) for key, each in value.items() if key != "ResponseMetadata"}
+    if isinstance(value, (list, tuple)):
+        return [_encode(each) for each in value]
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    return value
+
+
+def _decode(value: Any) -> Any:
+    """Reverse :func:`_encode`.
+
+    :param value: JSON-compatible value
+    :returns: Response or part of a response
+    """
+    if isinstance(value, dict):
+        if set(value) == {"__bytes__"}:
+            return base64.b64decode(value["__bytes__"])
+        if set(value) == {"__datetime__"}:
+            return datetime.datetime.fromisoformat(value["__datetime__"])
+        return {key: _decode(each) for key, each in value.items()}
+    if isinstance(value, list):
+        return [_decode(each) for each in value]
+    return value
+
+
+def _request_key(operation: str, request: Dict) -> str:
+    return json.dumps(dict(operation=operation, request=_encode(request)), sort_keys=True)
+
+
+@dataclass
+class Interaction:
+    """A single recorded call.
+
+    :param str operation: Client method name
+    :param dict request: Request parameters
+    :param response: Response, or pages of a paginated response
+    :param dict error: ``Error`` structure of a failed call
+    :param float duration: Seconds that the call took
+    """
+
+    operation: str
+    request: Dict
+    response: Any = None
+    error: Optional[Dict] = None
+    duration: float = 0.0
+
+
+@dataclass
+class Cassette:
+    """Calls recorded against one endpoint.
+
+    Cassettes are encrypted with the local cache key.
+    Set ``SECRETS_HELPER_CACHE_KEY`` to the same key to replay a cassette on another host.
+
+    :param str endpoint_url: Endpoint the calls were made against
+    :param str region_name: Region the calls were made in
+    :param float recorded_at: When the recording started, as a Unix timestamp
+    :param list interactions: Recorded calls, in the order they completed
+    """
+
+    endpoint_url: str = ""
+    region_name: str = ""
+    recorded_at: float = 0.0
+    interactions: List[Interaction] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, *, path: Path) -> "Cassette":
+        """Load and decrypt a cassette.
+
+        :param Path path: Cassette file
+        :returns: Cassette
+        :raises ConfigurationError: if the file is not a cassette or cannot be decrypted
+        """
+        try:
+            raw = path.read_bytes()
+        except OSError as error:
+            raise ConfigurationError(f'Unable to read cassette "{path}": {error}')
+
+        if not raw.startswith(_MAGIC):
+            raise ConfigurationError(f'"{path}" is not a secrets-helper cassette')
+        try:
+            plaintext = unseal(key=local_key(), sealed=raw[len(_MAGIC) :], associated_data=_ASSOCIATED_DATA)
+        except ValueError:
+            raise ConfigurationError(f'Unable to decrypt cassette "{path}". Was it recorded with a different key?')
+
+        contents = json.loads(plaintext.decode("utf-8"))
+        interactions = [Interaction(**each) for each in contents.pop("interactions")]
+        return cls(interactions=interactions, **contents)
+
+    def save(self, *, path: Path):
+        """Encrypt and write the cassette.
+
+        :param Path path: Cassette file
+        """
+        plaintext = json.dumps(asdict(self), sort_keys=True).encode("utf-8")
+        sealed = seal(key=local_key(), plaintext=plaintext, associated_data=_ASSOCIATED_DATA)
+        atomic_write(path=path, data=_MAGIC + sealed)
+
+
+class RecordingClient:
+    """Wrap a Secrets Manager client, recording every call made through it."""
+
+    def __init__(self, *, client, cassette: Cassette):
+        """Set up the recorder.
+
+        :param client: Secrets Manager client
+        :param Cassette cassette: Cassette to record into
+        """
+        self._client = client
+        self._cassette = cassette
+        self._lock = threading.Lock()
+        if not cassette.recorded_at:
+            cassette.recorded_at = time.time()
+
+    def _record(self, interaction: Interaction):
+        with self._lock:
+            if not self._cassette.endpoint_url:
+                self._cassette.endpoint_url = self._client.meta.endpoint_url
+                self._cassette.region_name = self._client.meta.region_name
+            self._cassette.interactions.append(interaction)
+
+    def _wrap(self, operation: str, call: Callable[..., Any]) -> Callable[..., Any]:
+        def _call(**request):
+            start = time.perf_counter()
+            try:
+                response = call(**request)
+            except botocore.exceptions.ClientError as error:
+                self._record(
+                    Interaction(
+                        operation=operation,
+                        request=_encode(request),
+                        error=dict(error.response.get("Error", {})),
+                        duration=time.perf_counter() - start,
+                    )
+                )
+                raise
+            self._record(
+                Interaction(
+                    operation=operation,
+                    request=_encode(request),
+                    response=_encode(response),
+                    duration=time.perf_counter() - start,
+                )
+            )
+            return response
+
+        return _call
+
+    def get_paginator(self, operation: str):
+        """Get a paginator that records all pages as a single call."""
+        paginator = self._client.get_paginator(operation)
+        return SimpleNamespace(paginate=self._wrap(operation, lambda **request: list(paginator.paginate(**request))))
+
+    def __getattr__(self, name: str):
+        """Record calls to recorded operations and pass through everything else."""
+        attribute = getattr(self._client, name)
+        if name in _RECORDED_OPERATIONS:
+            return self._wrap(name, attribute)
+        return attribute
+
+
+class ReplayClient:
+    """Stand-in for a Secrets Manager client that serves recorded calls.
+
+    Calls with the same parameters are replayed in the order they were recorded.
+    Once all recordings of a call have been replayed, the last one is repeated.
+    """
+
+    def __init__(self, *, cassette: Cassette, path: Path, latency: str = "zero"):
+        """Load recorded calls.
+
+        :param Cassette cassette: Cassette to replay
+        :param Path path: Cassette file, used to keep replayed state apart from real endpoints
+        :param str latency: ``zero`` to reply immediately or ``recorded`` to take as long as the recorded call
+        """
+        if latency not in REPLAY_LATENCIES:
+            raise ConfigurationError(f'Unknown replay latency "{latency}"')
+        self._path = path
+        self._latency = latency
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, List[Interaction]] = defaultdict(list)
+        for interaction in cassette.interactions:
+            self._recorded[_request_key(interaction.operation, interaction.request)].append(interaction)
+        self._exceptions = None
+        self.meta = SimpleNamespace(endpoint_url=f"cassette://{path.resolve()}", region_name=cassette.region_name)
+        self.cache_scope = self.meta.endpoint_url
+        self.principal = "cassette"
+        # Replayed failures must not affect other replays.
+        self.breaker = CircuitBreaker(endpoint=self.meta.endpoint_url, persistent=False)
+
+    @property
+    def exceptions(self):
+        """Modeled Secrets Manager exceptions, so that replayed errors are raised as they were recorded."""
+        if self._exceptions is None:
+            service_model = botocore.session.get_session().get_service_model("secretsmanager")
+            self._exceptions = ClientExceptionsFactory().create_client_exceptions(service_model)
+        return self._exceptions
+
+    def _replay(self, operation: str, request: Dict) -> Any:
+        with self._lock:
+            recorded = self._recorded.get(_request_key(operation, request))
+            if not recorded:
+                raise SecretRetrievalError(f'Cassette "{self._path}" has no recorded {operation} call for {request}')
+            interaction = recorded.pop(0) if len(recorded) > 1 else recorded[0]
+
+        if self._latency == "recorded":
+            time.sleep(interaction.duration)
+
+        if interaction.error is not None:
+            code = interaction.error.get("Code", "")
+            error_class = self.exceptions.from_code(code)
+            raise error_class(dict(Error=interaction.error), "".join(part.title() for part in operation.split("_")))
+        return _decode(interaction.response)
+
+    def get_paginator(self, operation: str):
+        """Get a paginator that replays recorded pages."""
+        return SimpleNamespace(paginate=lambda **request: iter(self._replay(operation, request)))
+
+    def __getattr__(self, name: str):
+        """Replay recorded operations."""
+        if name not in _RECORDED_OPERATIONS:
+            raise AttributeError(name)
+        return lambda **request: self._replay(name, request)
@@ -13,12 +13,16 @@
 """Utilities for processing config files."""
 import configparser
 import itertools
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import IO, Dict, List, Optional
 
 import click
 
-from ..identifiers import CONFIG_ENV_GROUP, CONFIG_SETTINGS_GROUP, KNOWN_CONFIGS
+from ..exceptions import ConfigurationError
+from ..identifiers import CONFIG_ENV_GROUP, CONFIG_SETTINGS_GROUP
+from ..profiles import load_profile
+from .secret_files import parse_secret_file
+from .selectors import SecretSelector, parse_tag_selector
 
 __all__ = ("load_config",)
 
@@ -30,11 +34,20 @@ class HelperConfig:
     :param list secret_ids: Secret IDs to retrieve
     :param dict environment_mappings: All environment mappings to use
     :param str profile: Name of environment mapping profile to use
+    :param list secret_selectors: Selectors identifying additional secrets to retrieve
+    :param list parameter_names: SSM parameter names to retrieve
+    :param list parameter_paths: SSM parameter paths to retrieve all parameters under
+    :param dict secret_files: Mapping from IDs of secrets to deliver as files
+        to the environment variables that hold their locations
     """
 
     secret_ids: List[str]
     environment_mappings: Dict[str, str]
     profile: Optional[str] = None
+    secret_selectors: List[SecretSelector] = field(default_factory=list)
+    parameter_names: List[str] = field(default_factory=list)
+    parameter_paths: List[str] = field(default_factory=list)
+    secret_files: Dict[str, str] = field(default_factory=dict)
 
 
 def _merge_key_ids(*, config_list: List[str], user_input_list: List[str]) -> List[str]:
@@ -54,6 +67,25 @@ def _merge_key_ids(*, config_list: List[str], user_input_list: List[str]) -> Lis
     return values
 
 
+def _merge_selectors(
+    *, config_list: List[SecretSelector], user_input_list: List[SecretSelector]
+) -> List[SecretSelector]:
+    """Merge two lists of secret selectors, retaining order, with no duplicates.
+
+    :param list config_list: List of selectors from config file
+    :param list user_input_list: List of selectors from user input
+    :returns: Merged list containing all selectors
+    :rtype: list
+    """
+    values = user_input_list.copy()
+
+    for val in config_list:
+        if val not in values:
+            values.append(val)
+
+    return values
+
+
 def _merge_mappings(*, config_mapping: Dict[str, str], profile_mapping: Dict[str, str]) -> Dict[str, str]:
     """Merge two mappings, raising errors if any keys or mappings conflict.
 
@@ -77,6 +109,40 @@ def _merge_mappings(*, config_mapping: Dict[str, str], profile_mapping: Dict[str
     return mappings
 
 
+def _merge_secret_files(*, config_mapping: Dict[str, str], user_mapping: Dict[str, str]) -> Dict[str, str]:
+    """Merge two secret file mappings, raising errors if any secrets or environment variables conflict.
+
+    :param dict config_mapping: Secret file mappings from config file
+    :param dict user_mapping: Secret file mappings from user input
+    :returns: Merged mappings
+    :rtype: dict
+    :raises ConfigurationError: if any secret maps to more than one environment variable
+    :raises ConfigurationError: if any secrets map to the same environment variable
+    """
+    mappings: Dict[str, str] = {}
+    for secret_id, env_var in itertools.chain(user_mapping.items(), config_mapping.items()):
+        if mappings.get(secret_id, env_var) != env_var:
+            raise ConfigurationError(f'Secret "{secret_id}" already mapped to a secret file.')
+
+        if secret_id not in mappings and env_var in mappings.values():
+            raise ConfigurationError(f'Another secret file already maps to environment variable "{env_var}".')
+
+        mappings[secret_id] = env_var
+
+    return mappings
+
+
+def _parse_secret_files(values: List[str]) -> Dict[str, str]:
+    """Parse ``SECRET_ID=ENV_VAR`` secret file mappings.
+
+    :param list values: Raw mappings
+    :returns: Mapping from secret IDs to environment variables
+    :rtype: dict
+    :raises ConfigurationError: if any mapping is invalid
+    """
+    return _merge_secret_files(config_mapping=dict(parse_secret_file(value) for value in values), user_mapping={})
+
+
 def _mapping_from_profile_names(*, config_profile: Optional[str], user_profile: Optional[str]) -> Dict[str, str]:
     """Load environment mapping for profile identified in config OR user options.
 
@@ -92,15 +158,14 @@ def _mapping_from_profile_names(*, config_profile: Optional[str], user_profile:
             "You must only specify profile once."
         )
 
-    if config_profile is None and user_profile is None:
-        return {}
-
     profile_name = user_profile if user_profile is not None else config_profile
+    if profile_name is None:
+        return {}
 
     try:
-        return KNOWN_CONFIGS[profile_name]
-    except KeyError:
-        raise click.UsageError(f'Unknown profile "{profile_name}"')
+        return load_profile(profile_name)
+    except ConfigurationError as error:
+        raise click.UsageError(str(error))
 
 
 def _load_config_from_file(*, config_file: IO, profile: Optional[str]) -> HelperConfig:
@@ -112,6 +177,7 @@ def _load_config_from_file(*, config_file: IO, profile: Optional[str]) -> Helper
     :rtype: HelperConfig
     :raises click.UsageError: if profile name is set both in config file and in user options
     :raises click.UsageError: if profile name is not known
+    :raises ConfigurationError: if any secret file mapping is invalid
     """
     parser = configparser.ConfigParser()
     parser.read_file(config_file)
@@ -122,6 +188,18 @@ def _load_config_from_file(*, config_file: IO, profile: Optional[str]) -> Helper
     except KeyError:
         secret_ids = []
 
+    # Load secret selectors from config file
+    settings = parser[CONFIG_SETTINGS_GROUP] if parser.has_section(CONFIG_SETTINGS_GROUP) else {}
+    secret_selectors = [SecretSelector(prefix=p.strip()) for p in settings.get("secret-prefixes", "").split()]
+    secret_selectors.extend(parse_tag_selector(t.strip()) for t in settings.get("secret-tags", "").split())
+
+    # Load SSM parameters from config file
+    parameter_names = [p.strip() for p in settings.get("parameters", "").split()]
+    parameter_paths = [p.strip() for p in settings.get("parameter-paths", "").split()]
+
+    # Load secret file mappings from config file
+    secret_files = _parse_secret_files(settings.get("secret-files", "").split())
+
     # Load profile name from config file
     try:
         config_profile: Optional[str] = parser[CONFIG_SETTINGS_GROUP]["profile"]
@@ -139,15 +217,35 @@ def _load_config_from_file(*, config_file: IO, profile: Optional[str]) -> Helper
     # Merge config and profile mappings
     environment_mappings = _merge_mappings(config_mapping=config_map, profile_mapping=profile_map)
 
-    return HelperConfig(secret_ids=secret_ids, environment_mappings=environment_mappings)
+    return HelperConfig(
+        secret_ids=secret_ids,
+        environment_mappings=environment_mappings,
+        secret_selectors=secret_selectors,
+        parameter_names=parameter_names,
+        parameter_paths=parameter_paths,
+        secret_files=secret_files,
+    )
 
 
-def load_config(*, config: Optional[IO], profile: Optional[str], secret_ids: List[str]) -> HelperConfig:
+def load_config(
+    *,
+    config: Optional[IO],
+    profile: Optional[str],
+    secret_ids: List[str],
+    secret_selectors: Optional[List[SecretSelector]] = None,
+    parameter_names: Optional[List[str]] = None,
+    parameter_paths: Optional[List[str]] = None,
+    secret_files: Optional[List[str]] = None,
+) -> HelperConfig:
     """Load config from file and/or user-specified options.
 
     :param IO config: Open config file object
     :param str profile: Pre-defined mapping profile name
     :param list secret_ids: List of user-input secret IDs
+    :param list secret_selectors: List of user-input secret selectors
+    :param list parameter_names: List of user-input SSM parameter names
+    :param list parameter_paths: List of user-input SSM parameter paths
+    :param list secret_files: List of user-input ``SECRET_ID=ENV_VAR`` secret file mappings
     :returns: Loaded config, having expanded and merged profile mappings
         and merged any user input secrets with config secrets
     :rtype: HelperConfig
@@ -158,19 +256,43 @@ def load_config(*, config: Optional[IO], profile: Optional[str], secret_ids: Lis
         loaded_config = HelperConfig(secret_ids=[], environment_mappings={})
 
     if profile is not None:
-        profile_env_map = KNOWN_CONFIGS[profile]
+        profile_env_map = _mapping_from_profile_names(config_profile=None, user_profile=profile)
     else:
         profile_env_map = {}
 
     all_secret_ids = _merge_key_ids(config_list=loaded_config.secret_ids, user_input_list=secret_ids)
+    all_secret_selectors = _merge_selectors(
+        config_list=loaded_config.secret_selectors, user_input_list=list(secret_selectors or [])
+    )
+    all_parameter_names = _merge_key_ids(
+        config_list=loaded_config.parameter_names, user_input_list=list(parameter_names or [])
+    )
+    all_parameter_paths = _merge_key_ids(
+        config_list=loaded_config.parameter_paths, user_input_list=list(parameter_paths or [])
+    )
     all_environment_mappings = _merge_mappings(
         config_mapping=loaded_config.environment_mappings, profile_mapping=profile_env_map
     )
+    all_secret_files = _merge_secret_files(
+        config_mapping=loaded_config.secret_files, user_mapping=_parse_secret_files(list(secret_files or []))
+    )
 
-    if not all_secret_ids:
+    mapped_values = all_secret_ids or all_secret_selectors or all_parameter_names or all_parameter_paths
+    if not (mapped_values or all_secret_files):
         raise click.UsageError("No secret IDs provided")
 
-    if not all_environment_mappings:
+    if mapped_values and not all_environment_mappings:
         raise click.UsageError("No environment mappings provided")
 
-    return HelperConfig(secret_ids=all_secret_ids, environment_mappings=all_environment_mappings)
+    for env_var in all_secret_files.values():
+        if env_var in all_environment_mappings.values():
+            raise ConfigurationError(f'Environment variable "{env_var}" is mapped to both a key and a secret file.')
+
+    return HelperConfig(
+        secret_ids=all_secret_ids,
+        environment_mappings=all_environment_mappings,
+        secret_selectors=all_secret_selectors,
+        parameter_names=all_parameter_names,
+        parameter_paths=all_parameter_paths,
+        secret_files=all_secret_files,
+    )
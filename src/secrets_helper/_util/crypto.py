@@ -0,0 +1,115 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for encrypting locally stored data."""
+import base64
+import binascii
+import os
+import tempfile
+from pathlib import Path
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from ..exceptions import ConfigurationError
+from ..identifiers import CACHE_KEY_ENV
+from .cache import cache_dir
+
+__all__ = ("local_key", "seal", "unseal")
+_KEY_FILE = "cache.key"
+_KEY_BYTES = 32
+_NONCE_BYTES = 12
+
+
+def _read_or_create_key(path: Path) -> bytes:
+    """Read a key file, creating it if it does not exist.
+
+    The key is written to a temporary file that is then linked into place,
+    so the key file never exists without its key
+    and concurrent invocations agree on whichever key was linked first.
+
+    :param Path path: Key file
+    :returns: Key
+    :rtype: bytes
+    :raises ConfigurationError: if the key file does not hold a key
+    """
+    if not path.exists():
+        handle, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+        try:
+            key = AESGCM.generate_key(bit_length=_KEY_BYTES * 8)
+            with os.fdopen(handle, "wb") as key_file:
+                key_file.write(key)
+            os.link(temp_name, str(path))
+            return key
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(temp_name)
+
+    key = path.read_bytes()
+    if len(key) != _KEY_BYTES:
+        raise ConfigurationError(f'Cache key file "{path}" is corrupt. Remove it to create a new key.')
+    return key
+
+
+def local_key() -> bytes:
+    """Load the key used to encrypt locally stored data.
+
+    The base64-encoded ``SECRETS_HELPER_CACHE_KEY`` environment variable takes precedence.
+    Otherwise a private key file is created in the cache directory.
+
+    :returns: Key
+    :rtype: bytes
+    :raises ConfigurationError: if the configured key is not a base64-encoded 256-bit key
+    """
+    try:
+        raw_key = os.environ[CACHE_KEY_ENV]
+    except KeyError:
+        return _read_or_create_key(cache_dir() / _KEY_FILE)
+
+    try:
+        key = base64.b64decode(raw_key, validate=True)
+    except binascii.Error:
+        key = b""
+
+    if len(key) != _KEY_BYTES:
+        raise ConfigurationError(f"{CACHE_KEY_ENV} must be a base64-encoded 256-bit key")
+    return key
+
+
+def seal(*, key: bytes, plaintext: bytes, associated_data: bytes) -> bytes:
+    """Encrypt and authenticate data.
+
+    :param bytes key: Key
+    :param bytes plaintext: Data to encrypt
+    :param bytes associated_data: Data that must be provided unchanged to decrypt
+    :returns: Nonce followed by ciphertext
+    :rtype: bytes
+    """
+    nonce = os.urandom(_NONCE_BYTES)
+    return nonce + AESGCM(key).encrypt(nonce, plaintext, associated_data)
+
+
+def unseal(*, key: bytes, sealed: bytes, associated_data: bytes) -> bytes:
+    """Decrypt and verify data encrypted with :func:`seal`.
+
+    :param bytes key: Key
+    :param bytes sealed: Nonce followed by ciphertext
+    :param bytes associated_data: Data that was provided to encrypt
+    :returns: Plaintext
+    :rtype: bytes
+    :raises ValueError: if the data cannot be decrypted or has been modified
+    """
+    try:
+        return AESGCM(key).decrypt(sealed[:_NONCE_BYTES], sealed[_NONCE_BYTES:], associated_data)
+    except InvalidTag:
+        raise ValueError("Unable to decrypt data")
@@ -0,0 +1,40 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for finding entry points."""
+import sys
+from typing import Dict
+
+__all__ = ("find_entry_points",)
+
+
+def find_entry_points(group: str) -> Dict:
+    """Find all entry points registered in a group. This scans every installed distribution.
+
+    :param str group: Entry point group
+    :returns: Mapping from entry point names to entry points
+    :rtype: dict
+    """
+    # Selecting a group by keyword is only supported by the standard library from Python 3.10.
+    if sys.version_info >= (3, 10):
+        from importlib.metadata import entry_points  # pylint: disable=import-outside-toplevel
+
+        found = entry_points(group=group)
+    elif sys.version_info >= (3, 8):
+        from importlib.metadata import entry_points  # pylint: disable=import-outside-toplevel
+
+        found = entry_points().get(group, ())
+    else:
+        from importlib_metadata import entry_points  # pylint: disable=import-outside-toplevel
+
+        found = entry_points(group=group)
+    return {entry_point.name: entry_point for entry_point in found}
@@ -11,15 +11,25 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """Utilities for running a command."""
+import errno
 import os
+import selectors
 import shlex
+import signal
 import subprocess  # nosec
 from enum import Enum
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Tuple
 
 import click
 
-__all__ = ("run_command",)
+from ..timings import timed
+from ..tracing import TRACESTATE_ENV, child_environment
+from .profiling import excluded
+
+__all__ = ("SPAWN_ENGINES", "SpawnTemplate", "prepare_command", "run_command")
+SPAWN_ENGINES = ("subprocess", "posix_spawn")
+# subprocess restores these signals, which Python ignores, to their defaults in the child.
+_RESTORED_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
 
 
 class Tag(Enum):
@@ -103,13 +113,16 @@ def _clean_command_arguments(*, args: str) -> List[str]:
     return [shlex.quote(i) for i in shlex.split(args)]
 
 
-def run_command(*, raw_command: str, extra_env_vars: Dict[str, str]) -> subprocess.CompletedProcess:
-    """Run a command with the provided environment variables.
+def prepare_command(*, raw_command: str, extra_env_vars: Dict[str, str]) -> Tuple[List[str], Dict[str, str]]:
+    """Build the arguments and environment to run a command with the provided environment variables.
+
+    If a tracer is active, the command receives a ``TRACEPARENT`` that continues its trace
+    and only the ``TRACESTATE`` that belongs to that trace.
 
     :param str raw_command: Raw command string to execute
     :param dict extra_env_vars: Environment variables to inject into subprocess environment
-    :returns: resulting process data
-    :rtype: subprocess.CompletedProcess
+    :returns: Command arguments and subprocess environment
+    :rtype: tuple
     """
     env = os.environ.copy()
 
@@ -118,10 +131,148 @@ def run_command(*, raw_command: str, extra_env_vars: Dict[str, str]) -> subproce
             click.secho(f'Environment variable "{key}" will be overwritten in subprocess', fg="red", err=True)
         env[key] = value
 
-    injected_command = _inject_environment_variables(command_string=raw_command, environment_variables=env)
-    command_args = _clean_command_arguments(args=injected_command)
+    trace_environment = child_environment()
+    if trace_environment:
+        env.pop(TRACESTATE_ENV, None)
+    env.update(trace_environment)
+
+    with timed("inject"):
+        injected_command = _inject_environment_variables(command_string=raw_command, environment_variables=env)
+        command_args = _clean_command_arguments(args=injected_command)
+
+    return command_args, env
+
+
+def _resolve_executable(*, name: str, env: Dict[str, str]) -> str:
+    """Find the executable that a command runs, searching ``PATH`` from the command environment like ``subprocess``.
+
+    :param str name: First command argument
+    :param dict env: Command environment
+    :returns: Path to the executable
+    :rtype: str
+    :raises FileNotFoundError: if no executable is found
+    """
+    if os.path.dirname(name):
+        return name
+
+    for directory in os.get_exec_path(env):
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), name)
+
+
+def _read_pipes(*, stdout: int, stderr: int) -> Tuple[bytes, bytes]:
+    """Read two pipes until both are closed, without either filling up while the other is read.
+
+    :param int stdout: Read end of the stdout pipe
+    :param int stderr: Read end of the stderr pipe
+    :returns: Everything written to each pipe
+    :rtype: tuple
+    """
+    chunks: Dict[int, List[bytes]] = {stdout: [], stderr: []}
+    with selectors.DefaultSelector() as selector:
+        for pipe in chunks:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, 32768)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    selector.unregister(key.fd)
+    return b"".join(chunks[stdout]), b"".join(chunks[stderr])
+
+
+class SpawnTemplate:
+    """A command prepared to be started with ``os.posix_spawn``, once or many times.
+
+    The executable is found and the arguments and environment are encoded once, when the template is built.
+    The command inherits only standard input and the inheritable file descriptors of this process.
+    Python creates file descriptors as non-inheritable, so unlike ``subprocess`` no descriptors are closed.
+    """
+
+    def __init__(self, *, command_args: List[str], env: Dict[str, str]):
+        """Set up the template.
+
+        :param list command_args: Command arguments
+        :param dict env: Command environment
+        :raises FileNotFoundError: if the executable cannot be found
+        """
+        self.args = command_args
+        self._path = os.fsencode(_resolve_executable(name=command_args[0], env=env))
+        self._argv = [os.fsencode(arg) for arg in command_args]
+        self._env = {os.fsencode(key): os.fsencode(value) for key, value in env.items()}
+
+    def run(self) -> subprocess.CompletedProcess:
+        """Run the command to completion, capturing its output.
+
+        If reading the output is interrupted, the command is killed before the interruption is raised.
+
+        :returns: resulting process data
+        :rtype: subprocess.CompletedProcess
+        """
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        try:
+            pid = os.posix_spawn(
+                self._path,
+                self._argv,
+                self._env,
+                file_actions=[(os.POSIX_SPAWN_DUP2, stdout_write, 1), (os.POSIX_SPAWN_DUP2, stderr_write, 2)],
+                setsigdef=_RESTORED_SIGNALS,
+            )
+        except BaseException:
+            for pipe in (stdout_read, stderr_read):
+                os.close(pipe)
+            raise
+        finally:
+            for pipe in (stdout_write, stderr_write):
+                os.close(pipe)
+
+        try:
+            stdout, stderr = _read_pipes(stdout=stdout_read, stderr=stderr_read)
+        except BaseException:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            raise
+        finally:
+            for pipe in (stdout_read, stderr_read):
+                os.close(pipe)
+        _, status = os.waitpid(pid, 0)
+        returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        return subprocess.CompletedProcess(self.args, returncode, stdout, stderr)
+
+
+def run_command(
+    *, raw_command: str, extra_env_vars: Dict[str, str], pass_fds: Tuple[int, ...] = (), engine: str = "subprocess"
+) -> subprocess.CompletedProcess:
+    """Run a command with the provided environment variables.
+
+    The ``posix_spawn`` engine falls back to ``subprocess`` where ``os.posix_spawn`` is not available
+    or when file descriptors must be passed to the command.
+
+    :param str raw_command: Raw command string to execute
+    :param dict extra_env_vars: Environment variables to inject into subprocess environment
+    :param tuple pass_fds: File descriptors to keep open in the subprocess
+    :param str engine: Start the command with ``subprocess`` or ``posix_spawn``
+    :returns: resulting process data
+    :rtype: subprocess.CompletedProcess
+    """
+    if engine not in SPAWN_ENGINES:
+        raise ValueError(f'Unknown spawn engine "{engine}"')
+
+    command_args, env = prepare_command(raw_command=raw_command, extra_env_vars=extra_env_vars)
+
+    if engine == "posix_spawn" and hasattr(os, "posix_spawn") and not pass_fds:
+        template = SpawnTemplate(command_args=command_args, env=env)
+        with timed("child"), excluded():
+            return template.run()
 
     # Using check=False because we process error cases in the upstream command that calls this function.
     # Using shell=False because we explicitly want to contain this subprocess execution.
     # Bandit is disabled for this line because they rightly will not allow any non-whitelisted calls to subprocess.
-    return subprocess.run(command_args, capture_output=True, env=env, check=False, shell=False)  # nosec
+    with timed("child"), excluded():
+        return subprocess.run(  # nosec
+            command_args, capture_output=True, env=env, check=False, shell=False, pass_fds=pass_fds
+        )
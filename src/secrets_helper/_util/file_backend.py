@@ -0,0 +1,176 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Backend that reads secrets and parameters from a local encrypted file."""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..backends import SecretBackend
+from ..exceptions import ConfigurationError, SecretFormatError, SecretRetrievalError
+from ..timings import timed
+from .cache import atomic_write
+from .crypto import local_key, seal, unseal
+from .identity import SecretReference, candidate_names
+from .parameters import parameter_key
+from .selectors import SecretSelector
+
+__all__ = ("FileBackend", "seal_secrets_file")
+_MAGIC = b"SHSECRETS1\n"
+_ASSOCIATED_DATA = b"secrets-helper secrets file"
+_SECTIONS = ("secrets", "tags", "parameters")
+
+
+def _validate(contents: Any) -> Dict[str, Dict]:
+    """Check the structure of secrets file contents.
+
+    :param contents: Decoded contents
+    :returns: Contents with every section present and every secret value JSON-encoded
+    :rtype: dict
+    :raises SecretFormatError: if the contents are not structured as a secrets file
+    """
+    if not isinstance(contents, dict) or set(contents) - set(_SECTIONS):
+        raise SecretFormatError(f"Secrets file must be a JSON object with only {', '.join(_SECTIONS)} sections")
+
+    validated = {section: contents.get(section, {}) for section in _SECTIONS}
+    if not all(isinstance(section, dict) for section in validated.values()):
+        raise SecretFormatError("Every secrets file section must be a JSON object")
+
+    validated["secrets"] = {
+        name: value if isinstance(value, str) else json.dumps(value) for name, value in validated["secrets"].items()
+    }
+    for name, value in validated["parameters"].items():
+        if not isinstance(value, str):
+            raise SecretFormatError(f'Parameter "{name}" value must be a string')
+    return validated
+
+
+def seal_secrets_file(*, path: Path, contents: Dict, key: Optional[bytes] = None):
+    """Encrypt secrets and parameters into a file that the ``file`` backend can read.
+
+    ``contents`` is a JSON object with up to three sections:
+    ``secrets`` maps each secret name to its value (a JSON object or a JSON-encoded string),
+    ``tags`` maps secret names to their tags,
+    and ``parameters`` maps each parameter name to its value.
+
+    :param Path path: File to write
+    :param dict contents: Secrets and parameters
+    :param bytes key: Key (default: the local key)
+    :raises SecretFormatError: if the contents are not structured as a secrets file
+    """
+    plaintext = json.dumps(_validate(contents)).encode("utf-8")
+    key = key if key is not None else local_key()
+    atomic_write(path=path, data=_MAGIC + seal(key=key, plaintext=plaintext, associated_data=_ASSOCIATED_DATA))
+
+
+class FileBackend(SecretBackend):
+    """Backend that reads secrets and parameters from a file written by :func:`seal_secrets_file`.
+
+    The file is encrypted with the local key, or the ``SECRETS_HELPER_CACHE_KEY`` key if that is set.
+    Secrets are looked up by name or ARN and version pins are ignored.
+    """
+
+    name = "file"
+
+    def __init__(self, *, path: str):
+        """Set up the backend. The file is not read until values are requested.
+
+        :param str path: Secrets file
+        """
+        self._path = Path(path)
+        self._contents: Optional[Dict[str, Dict]] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        """Read and decrypt the file once.
+
+        :raises ConfigurationError: if the file cannot be read or decrypted
+        """
+        if self._contents is not None:
+            return self._contents
+
+        try:
+            with timed("read_secrets_file"):
+                raw = self._path.read_bytes()
+        except OSError as error:
+            raise ConfigurationError(f'Unable to read secrets file "{self._path}": {error}')
+
+        if not raw.startswith(_MAGIC):
+            raise ConfigurationError(f'"{self._path}" is not a secrets file')
+        try:
+            plaintext = unseal(key=local_key(), sealed=raw[len(_MAGIC) :], associated_data=_ASSOCIATED_DATA)
+        except ValueError:
+            raise ConfigurationError(f'Unable to decrypt secrets file "{self._path}" with the local key')
+
+        self._contents = _validate(json.loads(plaintext.decode("utf-8")))
+        return self._contents
+
+    def _find_secret(self, secret_id: str) -> str:
+        """Find the name of a secret from any identifier.
+
+        :raises SecretRetrievalError: if no secret matches
+        """
+        secrets = self._load()["secrets"]
+        for name in sorted(candidate_names(SecretReference.parse(secret_id).secret_id)):
+            if name in secrets:
+                return name
+        raise SecretRetrievalError(f'Secret "{secret_id}" not found in secrets file "{self._path}"')
+
+    def get_raw_secret_values(
+        self, *, secret_ids: List[str], selectors: List[SecretSelector]
+    ) -> Iterator[Tuple[str, str]]:
+        """Look up raw secret values.
+
+        :param list secret_ids: Secret names or ARNs to look up
+        :param list selectors: Selectors identifying additional secrets to look up
+        :returns: Secret identifier and JSON-encoded value of each secret, with each secret only returned once
+        :rtype: iterable
+        :raises SecretRetrievalError: if any secret is not in the file
+        """
+        contents = self._load()
+        seen = set()
+        for secret_id in secret_ids:
+            name = self._find_secret(secret_id)
+            if name not in seen:
+                seen.add(name)
+                yield secret_id, contents["secrets"][name]
+
+        for selector in selectors:
+            for name, value in contents["secrets"].items():
+                tags = [dict(Key=key, Value=tag) for key, tag in contents["tags"].get(name, {}).items()]
+                if name not in seen and selector.matches(dict(Name=name, Tags=tags)):
+                    seen.add(name)
+                    yield name, value
+
+    def get_parameter_values(self, *, names: List[str], paths: List[str]) -> Iterator[Dict[str, str]]:
+        """Look up parameter values, as described by :func:`secrets_helper._util.parameters.get_parameter_values`.
+
+        :raises SecretRetrievalError: if any named parameter is not in the file or any path has no parameters
+        """
+        parameters = self._load()["parameters"]
+        missing = [name for name in names if name not in parameters]
+        if missing:
+            raise SecretRetrievalError(f'Parameters not found: "{", ".join(missing)}"')
+
+        seen = set()
+        for name in dict.fromkeys(names):
+            seen.add(name)
+            yield {parameter_key(name=name): parameters[name]}
+
+        for path in dict.fromkeys(paths):
+            prefix = path.rstrip("/") + "/"
+            found = [name for name in parameters if name.startswith(prefix)]
+            if not found:
+                raise SecretRetrievalError(f'No parameters found under path "{path}"')
+            for name in found:
+                if name not in seen:
+                    seen.add(name)
+                    yield {parameter_key(name=name, path=path): parameters[name]}
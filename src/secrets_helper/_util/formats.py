@@ -0,0 +1,76 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for serializing environment variables."""
+import json
+import re
+import shlex
+from typing import Callable, Dict
+
+from ..exceptions import SecretFormatError
+
+__all__ = ("ENV_FORMATS", "format_environment")
+_SHELL_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Dollar signs and backticks are escaped so that shells and dotenv loaders do not expand them.
+_DOTENV_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "$": "\\$", "`": "\\`"}
+_DOTENV_ESCAPE = re.compile("|".join(re.escape(each) for each in _DOTENV_ESCAPES))
+
+
+def _dotenv(environment: Dict[str, str]) -> str:
+    """Serialize as double-quoted ``KEY="value"`` lines, escaping characters that would end or expand the value."""
+    lines = []
+    for key, value in environment.items():
+        escaped = _DOTENV_ESCAPE.sub(lambda match: _DOTENV_ESCAPES[match.group(0)], value)
+        lines.append(f'{key}="{escaped}"\n')
+    return "".join(lines)
+
+
+def _export(environment: Dict[str, str]) -> str:
+    """Serialize as POSIX shell ``export`` statements."""
+    for key in environment:
+        if not _SHELL_NAME.match(key):
+            raise SecretFormatError(f'"{key}" is not a valid shell variable name')
+    return "".join(f"export {key}={shlex.quote(value)}\n" for key, value in environment.items())
+
+
+def _json(environment: Dict[str, str]) -> str:
+    """Serialize as a single JSON object."""
+    return json.dumps(environment) + "\n"
+
+
+def _nul(environment: Dict[str, str]) -> str:
+    """Serialize as NUL-terminated ``KEY=VALUE`` entries."""
+    for key, value in environment.items():
+        if "=" in key or "\0" in key or "\0" in value:
+            raise SecretFormatError(f'Environment variable "{key}" cannot be written in NUL-delimited format')
+    return "".join(f"{key}={value}\0" for key, value in environment.items())
+
+
+_FORMATTERS: Dict[str, Callable[[Dict[str, str]], str]] = dict(dotenv=_dotenv, export=_export, json=_json, nul=_nul)
+ENV_FORMATS = tuple(_FORMATTERS)
+
+
+def format_environment(*, environment: Dict[str, str], output_format: str = "dotenv") -> str:
+    """Serialize environment variables.
+
+    * ``dotenv``: ``KEY="value"`` lines with backslashes, quotes, line breaks, dollar signs, and backticks escaped
+    * ``export``: ``export KEY='value'`` lines quoted for POSIX shells
+    * ``json``: a single JSON object
+    * ``nul``: ``KEY=value`` entries, each terminated by a NUL character
+
+    :param dict environment: Environment variables
+    :param str output_format: One of :data:`ENV_FORMATS`
+    :returns: Serialized environment variables
+    :rtype: str
+    :raises SecretFormatError: if a variable cannot be represented in ``output_format``
+    """
+    return _FORMATTERS[output_format](environment)
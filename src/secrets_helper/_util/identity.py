@@ -0,0 +1,198 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for resolving secret identifiers to canonical ARNs."""
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, Optional, Set
+
+import botocore.exceptions
+
+from ..exceptions import SecretRetrievalError
+
+__all__ = ("SecretIdIndex", "SecretReference", "SECRET_ID_INDEX", "candidate_names")
+_ARN_NAME_MARKER = ":secret:"
+_ARN_SUFFIX = re.compile(r"-[A-Za-z0-9]{6}$")
+_PIN_MARKER = "@"
+_STAGE_PIN_PREFIX = "stage:"
+_VERSION_ID = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+@dataclass(frozen=True)
+class SecretReference:
+    """Reference to a secret, optionally pinned to a specific version.
+
+    :param str secret_id: Secret identifier
+    :param str version_id: Pinned version ID
+    :param str version_stage: Pinned version stage
+    """
+
+    secret_id: str
+    version_id: Optional[str] = None
+    version_stage: Optional[str] = None
+
+    @classmethod
+    def parse(cls, raw: str) -> "SecretReference":
+        """Parse a secret identifier that might be pinned to a version.
+
+        ``SECRET@VERSION_ID`` pins a version ID and ``SECRET@stage:LABEL`` pins a version stage.
+        Secret names can contain ``@`` but not ``:``, and version IDs are UUIDs,
+        so anything else is treated as part of the secret identifier.
+
+        :param str raw: Raw secret identifier
+        :returns: Secret reference
+        :rtype: SecretReference
+        """
+        if not isinstance(raw, str) or _PIN_MARKER not in raw:
+            return cls(secret_id=raw)
+
+        secret_id, pin = raw.rsplit(_PIN_MARKER, 1)
+        if _VERSION_ID.match(pin):
+            return cls(secret_id=secret_id, version_id=pin)
+        if pin.startswith(_STAGE_PIN_PREFIX) and len(pin) > len(_STAGE_PIN_PREFIX):
+            return cls(secret_id=secret_id, version_stage=pin[len(_STAGE_PIN_PREFIX) :])
+        return cls(secret_id=raw)
+
+    @property
+    def immutable(self) -> bool:
+        """Determine whether this reference always identifies the same value."""
+        return self.version_id is not None
+
+    def request(self) -> Dict[str, str]:
+        """Build the ``GetSecretValue`` parameters for this reference.
+
+        :returns: Request parameters
+        :rtype: dict
+        """
+        params = dict(SecretId=self.secret_id)
+        if self.version_id is not None:
+            params["VersionId"] = self.version_id
+        if self.version_stage is not None:
+            params["VersionStage"] = self.version_stage
+        return params
+
+
+def candidate_names(secret_id: str) -> Set[str]:
+    """Determine every friendly name that a secret identifier might refer to.
+
+    A full ARN ends in a random six character suffix that a partial ARN does not,
+    but a friendly name can end in something that looks just like that suffix.
+
+    :param str secret_id: Secret identifier
+    :returns: Possible friendly names
+    :rtype: set
+    """
+    if not isinstance(secret_id, str) or not secret_id.startswith("arn:"):
+        return {secret_id}
+
+    name = secret_id.split(_ARN_NAME_MARKER, 1)[-1]
+    names = {name}
+    if _ARN_SUFFIX.search(name):
+        names.add(_ARN_SUFFIX.sub("", name))
+    return names
+
+
+class SecretIdIndex:
+    """Cached index from any secret identifier to the canonical ARN of that secret.
+
+    Secrets Manager accepts a friendly name, a partial ARN, or a full ARN for the same secret.
+    Entries are resolved lazily with ``DescribeSecret`` the first time an identifier is seen
+    and can be invalidated if a secret is replaced.
+    An index is safe to share between threads.
+    """
+
+    def __init__(self):
+        """Set up an empty index."""
+        self._arns: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, secret_id: str) -> bool:
+        """Determine whether an identifier has already been resolved."""
+        return secret_id in self._arns
+
+    def resolve(self, *, client, secret_id: str) -> str:
+        """Resolve a secret identifier to the canonical ARN of that secret.
+
+        :param client: Secrets Manager client
+        :param str secret_id: Secret identifier
+        :returns: Canonical secret ARN
+        :rtype: str
+        :raises SecretRetrievalError: if the secret cannot be described
+        """
+        try:
+            return self._arns[secret_id]
+        except KeyError:
+            pass
+
+        try:
+            arn = client.describe_secret(SecretId=secret_id)["ARN"]
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+            raise SecretRetrievalError(f'Encountered AWS error for secret "{secret_id}": "{error}"')
+
+        with self._lock:
+            self._arns[secret_id] = arn
+            self._arns[arn] = arn
+        return arn
+
+    def canonicalize(self, *, client, secret_ids: Iterable[str]) -> Dict[SecretReference, str]:
+        """Collapse secret identifiers that refer to the same secret version.
+
+        Only identifiers that might overlap with another identifier are resolved.
+        Every other identifier is used as-is, so the common case makes no extra calls.
+
+        :param client: Secrets Manager client
+        :param list secret_ids: Secret identifiers, optionally pinned to a version
+        :returns: Ordered mapping from secret reference (using the canonical ARN where resolved)
+            to the first identifier that referred to it
+        :rtype: dict
+        """
+        references = {secret_id: SecretReference.parse(secret_id) for secret_id in secret_ids}
+        name_counts = Counter(
+            name for secret_id in {ref.secret_id for ref in references.values()} for name in candidate_names(secret_id)
+        )
+
+        canonical: Dict[SecretReference, str] = {}
+        for raw_id, reference in references.items():
+            secret_id = reference.secret_id
+            if secret_id in self or any(name_counts[name] > 1 for name in candidate_names(secret_id)):
+                reference = replace(reference, secret_id=self.resolve(client=client, secret_id=secret_id))
+            canonical.setdefault(reference, raw_id)
+        return canonical
+
+    def add(self, *, name: str, arn: str):
+        """Record an already known secret name and ARN.
+
+        :param str name: Secret friendly name
+        :param str arn: Secret ARN
+        """
+        with self._lock:
+            self._arns[name] = arn
+            self._arns[arn] = arn
+
+    def clear(self):
+        """Drop every resolved identifier."""
+        with self._lock:
+            self._arns.clear()
+
+    def invalidate(self, *, arn: str):
+        """Drop every identifier that resolved to an ARN.
+
+        :param str arn: Canonical secret ARN
+        """
+        with self._lock:
+            for key in [key for key, value in self._arns.items() if value == arn]:
+                del self._arns[key]
+
+
+SECRET_ID_INDEX = SecretIdIndex()
@@ -0,0 +1,82 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Thread-safe in-memory cache with expiry and least-recently-used eviction."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+__all__ = ("MemoryCache",)
+
+
+class MemoryCache:
+    """Thread-safe in-memory cache.
+
+    Entries expire ``ttl`` seconds after they are stored.
+    Once the cache holds ``max_entries`` entries, storing another entry evicts the least recently used one.
+    """
+
+    def __init__(self, *, ttl: Optional[float], max_entries: int):
+        """Set up an empty cache.
+
+        :param float ttl: Seconds that entries are kept (``None`` keeps entries until they are evicted)
+        :param int max_entries: Maximum number of entries
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Count the stored entries, including any that have expired but not yet been dropped."""
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Look up an entry.
+
+        :param key: Entry key
+        :returns: Stored value, or ``None`` if there is no current entry
+        """
+        with self._lock:
+            try:
+                expires, value = self._entries[key]
+            except KeyError:
+                return None
+
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store an entry, evicting the least recently used entry if the cache is full.
+
+        :param key: Entry key
+        :param value: Value to store
+        """
+        if self.max_entries <= 0 or self.ttl == 0:
+            return
+
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
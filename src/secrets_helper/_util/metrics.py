@@ -0,0 +1,203 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for exporting cumulative activity as Prometheus metrics.
+
+Each invocation collects its own counters and histograms from phase timings
+and merges them into a node-exporter textfile when it finishes.
+"""
+import bisect
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..timings import Timing
+from .cache import atomic_write, exclusive_lock
+
+__all__ = ("MetricsRecorder", "merge_textfile")
+_API_OPERATIONS = dict(
+    get_secret_value="GetSecretValue", get_parameters="GetParameters", get_parameters_by_path="GetParametersByPath"
+)
+_THROTTLE_CODES = frozenset(
+    ("Throttling", "ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded", "ThrottledException")
+)
+_API_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_CHILD_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+# Family name, type, and help text of every metric, in the order they are written.
+_FAMILIES = (
+    ("secrets_helper_invocations_total", "counter", "Invocations of secrets-helper by command."),
+    ("secrets_helper_api_calls_total", "counter", "AWS API calls made by secrets-helper."),
+    ("secrets_helper_api_errors_total", "counter", "AWS API calls that failed, by error code."),
+    ("secrets_helper_api_throttles_total", "counter", "AWS API calls that were throttled."),
+    ("secrets_helper_cache_hits_total", "counter", "Secret values served from a local cache."),
+    ("secrets_helper_api_call_duration_seconds", "histogram", "Latency of AWS API calls."),
+    ("secrets_helper_child_duration_seconds", "histogram", "Run time of child commands."),
+)
+_TYPES = {name: kind for name, kind, _ in _FAMILIES}
+_HELP = {name: text for name, _, text in _FAMILIES}
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _family(name: str) -> str:
+    """Find the family that a sample belongs to."""
+    for suffix in _HISTOGRAM_SUFFIXES:
+        base = name[: -len(suffix)]
+        if name.endswith(suffix) and _TYPES.get(base) == "histogram":
+            return base
+    return name
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Histogram:
+    """Observations of one histogram series."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.counts):
+            self.counts[position] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name: str, **labels: str) -> List[Tuple[str, float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f"{name}_bucket{_labels(**labels, le=_format(bound))}", float(cumulative)))
+        samples.append((f"{name}_bucket{_labels(**labels, le='+Inf')}", float(self.count)))
+        samples.append((f"{name}_sum{_labels(**labels)}", self.total))
+        samples.append((f"{name}_count{_labels(**labels)}", float(self.count)))
+        return samples
+
+
+class MetricsRecorder:
+    """Timing hook that collects the counters and histograms of one invocation."""
+
+    def __init__(self, *, command: Optional[str] = None):
+        """Set up an empty recorder.
+
+        :param str command: Name of the command being run, counted as one invocation
+        """
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._api_latency: Dict[str, _Histogram] = {}
+        self._child_duration = _Histogram(_CHILD_BUCKETS)
+        if command is not None:
+            self._count(f"secrets_helper_invocations_total{_labels(command=command)}")
+
+    def _count(self, sample: str):
+        self._counters[sample] = self._counters.get(sample, 0.0) + 1
+
+    def __call__(self, timing: Timing):
+        """Collect the metrics described by a phase timing."""
+        with self._lock:
+            operation = _API_OPERATIONS.get(timing.phase)
+            if operation is not None:
+                self._count(f"secrets_helper_api_calls_total{_labels(operation=operation)}")
+                if timing.error is not None:
+                    self._count(f"secrets_helper_api_errors_total{_labels(operation=operation, code=timing.error)}")
+                    if timing.error in _THROTTLE_CODES:
+                        self._count(f"secrets_helper_api_throttles_total{_labels(operation=operation)}")
+                self._api_latency.setdefault(operation, _Histogram(_API_BUCKETS)).observe(timing.duration)
+            elif timing.phase == "shared_cache_hit":
+                self._count(f"secrets_helper_cache_hits_total{_labels(cache='shared')}")
+            elif timing.phase == "child":
+                self._child_duration.observe(timing.duration)
+
+    def samples(self) -> Dict[str, float]:
+        """Build every collected sample.
+
+        :returns: Value of each sample, by sample name and labels
+        :rtype: dict
+        """
+        with self._lock:
+            samples = dict(self._counters)
+            for operation, histogram in sorted(self._api_latency.items()):
+                samples.update(histogram.samples("secrets_helper_api_call_duration_seconds", operation=operation))
+            if self._child_duration.count:
+                samples.update(self._child_duration.samples("secrets_helper_child_duration_seconds"))
+        return samples
+
+
+def _parse(text: str) -> Dict[str, float]:
+    """Read the samples of a textfile, ignoring comments and any line that cannot be parsed."""
+    samples: Dict[str, float] = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        try:
+            samples[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+        except ValueError:
+            continue
+    return samples
+
+
+def _render(samples: Dict[str, float]) -> str:
+    """Write samples grouped by family, as the textfile format requires."""
+    families: Dict[str, List[str]] = {}
+    for sample, value in samples.items():
+        family = _family(sample.split("{", 1)[0])
+        families.setdefault(family, []).append(f"{sample} {_format(value)}")
+
+    order = [name for name, _, _ in _FAMILIES if name in families]
+    order.extend(name for name in families if name not in _TYPES)
+    lines = []
+    for family in order:
+        lines.append(f"# HELP {family} {_HELP.get(family, family)}")
+        lines.append(f"# TYPE {family} {_TYPES.get(family, 'untyped')}")
+        lines.extend(families[family])
+    return "\n".join(lines) + "\n"
+
+
+def merge_textfile(*, path: Path, samples: Dict[str, float]):
+    """Add samples to the cumulative samples in a node-exporter textfile.
+
+    Every sample is a counter or part of a histogram, so merging adds values.
+    Concurrent invocations take turns through a lock file next to the textfile,
+    and the textfile is replaced atomically so that node-exporter never reads a partial file.
+
+    :param Path path: Textfile, which node-exporter only reads if it ends in ``.prom``
+    :param dict samples: Value of each sample to add, by sample name and labels
+    """
+    if not samples:
+        return
+
+    with exclusive_lock(path.with_name(path.name + ".lock")):
+        try:
+            merged = _parse(path.read_text())
+        except FileNotFoundError:
+            merged = {}
+        for sample, value in samples.items():
+            merged[sample] = merged.get(sample, 0.0) + value
+        atomic_write(path=path, data=_render(merged).encode("utf-8"), mode=0o644)
@@ -0,0 +1,130 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for retrieving SSM parameters."""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import botocore.exceptions
+
+from ..exceptions import SecretRetrievalError
+from ..timings import timed
+
+__all__ = ("GET_PARAMETERS_BATCH_SIZE", "get_parameter_values", "parameter_key")
+GET_PARAMETERS_BATCH_SIZE = 10
+_MAX_CONCURRENT_REQUESTS = 8
+
+
+def parameter_key(*, name: str, path: Optional[str] = None) -> str:
+    """Determine the key that a parameter value is mapped to environment variables with.
+
+    Parameters retrieved by path are identified by their name relative to that path.
+    Parameters retrieved by name are identified by the last part of their name.
+
+    :param str name: Parameter name
+    :param str path: Path that the parameter was retrieved by
+    :returns: Key
+    :rtype: str
+    """
+    if path is None:
+        return name.rsplit("/", 1)[-1]
+    return name[len(path.rstrip("/")) :].lstrip("/")
+
+
+def _get_parameters(*, client, names: List[str]) -> List[Tuple[str, str]]:
+    """Retrieve up to ``GET_PARAMETERS_BATCH_SIZE`` named parameters in a single call.
+
+    :param client: SSM client
+    :param list names: Parameter names
+    :returns: Name and decrypted value of each parameter
+    :rtype: list
+    :raises SecretRetrievalError: if any parameter does not exist
+    """
+    try:
+        with timed("get_parameters", ",".join(names)):
+            response = client.get_parameters(Names=names, WithDecryption=True)
+    except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+        raise SecretRetrievalError(f'Encountered AWS error for parameters "{", ".join(names)}": "{error}"')
+
+    if response.get("InvalidParameters"):
+        raise SecretRetrievalError(f'Parameters not found: "{", ".join(response["InvalidParameters"])}"')
+
+    return [(parameter["Name"], parameter["Value"]) for parameter in response["Parameters"]]
+
+
+def _get_parameters_by_path(*, client, path: str) -> List[Tuple[str, str]]:
+    """Retrieve all parameters under a path, including nested paths.
+
+    :param client: SSM client
+    :param str path: Parameter path
+    :returns: Name and decrypted value of each parameter
+    :rtype: list
+    :raises SecretRetrievalError: if no parameters exist under the path
+    """
+    parameters: List[Tuple[str, str]] = []
+    try:
+        with timed("get_parameters_by_path", path):
+            paginator = client.get_paginator("get_parameters_by_path")
+            for page in paginator.paginate(Path=path, Recursive=True, WithDecryption=True):
+                parameters.extend((parameter["Name"], parameter["Value"]) for parameter in page["Parameters"])
+    except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+        raise SecretRetrievalError(f'Encountered AWS error for parameter path "{path}": "{error}"')
+
+    if not parameters:
+        raise SecretRetrievalError(f'No parameters found under path "{path}"')
+    return parameters
+
+
+def get_parameter_values(*, client, names: Iterable[str], paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Retrieve decrypted SSM parameter values with as few calls as possible.
+
+    Named parameters are retrieved ``GET_PARAMETERS_BATCH_SIZE`` at a time and paths are paginated.
+    Batches and paths are retrieved concurrently but returned in order.
+    A parameter that is retrieved both by name and by path is only returned once.
+
+    :param client: SSM client
+    :param list names: Parameter names
+    :param list paths: Parameter paths
+    :returns: Mapping of the key to the value of each parameter
+    :rtype: iterable
+    """
+    names = list(dict.fromkeys(names))
+    requests: List[Tuple[Optional[str], Callable[[], List[Tuple[str, str]]]]] = []
+
+    for start in range(0, len(names), GET_PARAMETERS_BATCH_SIZE):
+        batch = names[start : start + GET_PARAMETERS_BATCH_SIZE]
+        requests.append((None, functools.partial(_get_parameters, client=client, names=batch)))
+    for path in dict.fromkeys(paths):
+        requests.append((path, functools.partial(_get_parameters_by_path, client=client, path=path)))
+
+    def _request(
+        request: Tuple[Optional[str], Callable[[], List[Tuple[str, str]]]]
+    ) -> List[Tuple[Optional[str], str, str]]:
+        path, call = request
+        return [(path, name, value) for name, value in call()]
+
+    def _results() -> Iterator[List[Tuple[Optional[str], str, str]]]:
+        if len(requests) <= 1:
+            yield from map(_request, requests)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(_MAX_CONCURRENT_REQUESTS, len(requests))) as executor:
+            yield from executor.map(_request, requests)
+
+    seen = set()
+    for result in _results():
+        for parameter_path, name, value in result:
+            if name in seen:
+                continue
+            seen.add(name)
+            yield {parameter_key(name=name, path=parameter_path): value}
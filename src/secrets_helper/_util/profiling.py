@@ -0,0 +1,100 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for profiling secrets-helper itself."""
+import contextlib
+import cProfile
+import tracemalloc
+from typing import IO, Iterator, Optional
+
+__all__ = ("Profiler", "active", "excluded")
+_TOP_ALLOCATIONS = 20
+_ACTIVE: Optional["Profiler"] = None
+
+
+class Profiler:
+    """CPU and/or memory profiler for the whole invocation.
+
+    Anything run inside :func:`excluded`, such as the child process, is not profiled.
+
+    :param str profile_out: File to write ``pstats`` data to (CPU profiling is disabled if not set)
+    :param bool memory: Trace memory allocations
+    """
+
+    def __init__(self, *, profile_out: Optional[str], memory: bool):
+        """Set up profilers without starting them."""
+        self.profile_out = profile_out
+        self.memory = memory
+        self._cpu: Optional[cProfile.Profile] = cProfile.Profile() if profile_out is not None else None
+
+    def start(self):
+        """Start profiling."""
+        global _ACTIVE  # pylint: disable=global-statement
+        _ACTIVE = self
+        if self.memory:
+            tracemalloc.start()
+        if self._cpu is not None:
+            self._cpu.enable()
+
+    def pause(self):
+        """Stop profiling temporarily."""
+        if self._cpu is not None:
+            self._cpu.disable()
+
+    def resume(self):
+        """Resume profiling after :meth:`pause`."""
+        if self._cpu is not None:
+            self._cpu.enable()
+
+    def stop(self, *, report: IO):
+        """Stop profiling and write results.
+
+        :param IO report: Stream to write the memory allocation report to
+        """
+        global _ACTIVE  # pylint: disable=global-statement
+        _ACTIVE = None
+
+        if self._cpu is not None and self.profile_out is not None:
+            self._cpu.disable()
+            self._cpu.dump_stats(self.profile_out)
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report.write(f"secrets-helper peak traced memory: {peak / 1024:.1f} KiB\n")
+            report.write(f"secrets-helper top {_TOP_ALLOCATIONS} allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:_TOP_ALLOCATIONS]:
+                report.write(f"  {stat}\n")
+
+
+def active() -> bool:
+    """Determine whether the invocation is being profiled.
+
+    :returns: Decision
+    """
+    return _ACTIVE is not None
+
+
+@contextlib.contextmanager
+def excluded() -> Iterator[None]:
+    """Exclude everything run in this context from the CPU profile."""
+    profiler = _ACTIVE
+    if profiler is None:
+        yield
+        return
+
+    profiler.pause()
+    try:
+        yield
+    finally:
+        profiler.resume()
@@ -0,0 +1,269 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for projecting mapped keys out of nested JSON secrets.
+
+Environment mapping keys that start with ``/`` are JSON pointers (RFC 6901)
+and keys that start with ``$.`` are dotted paths.
+Any other key names a top-level member, as it always has.
+Mappings are compiled once into a tree of path segments,
+and each secret is then decoded in a single pass that only builds the values of mapped paths
+and skips everything else.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from json.decoder import scanstring  # type: ignore
+from typing import Any, Dict, List, Optional
+
+from ..exceptions import ConfigurationError, MappingError, SecretFormatError
+
+__all__ = ("KeyProjection", "compile_projection", "is_path")
+_POINTER_PREFIX = "/"
+_DOTTED_PREFIX = "$."
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Everything up to the next bracket outside a string. Group 1 opens and group 2 closes a container.
+_TOKEN = re.compile(r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*(?:([{\[])|([}\]]))', re.DOTALL)
+_SCALAR = re.compile(r"[^,}\] \t\n\r]+")
+_DECODER = json.JSONDecoder()
+
+
+def is_path(key: str) -> bool:
+    """Determine whether an environment mapping key is a path into nested secrets.
+
+    :param str key: Environment mapping key
+    :rtype: bool
+    """
+    return key.startswith(_POINTER_PREFIX) or key.startswith(_DOTTED_PREFIX)
+
+
+def _segments(key: str) -> List[str]:
+    """Split an environment mapping key into path segments.
+
+    :param str key: Environment mapping key
+    :returns: Member names or array indexes from the top of the secret
+    :rtype: list
+    :raises ConfigurationError: if the path is empty
+    """
+    if key.startswith(_POINTER_PREFIX):
+        segments = [each.replace("~1", "/").replace("~0", "~") for each in key[1:].split("/")]
+    elif key.startswith(_DOTTED_PREFIX):
+        segments = key[len(_DOTTED_PREFIX) :].split(".")
+    else:
+        return [key]
+
+    if not all(segments):
+        raise ConfigurationError(f'Invalid path "{key}" in environment mapping.')
+    return segments
+
+
+@dataclass
+class _Node:
+    """Path segment in a compiled projection.
+
+    :param list keys: Environment mapping keys that this value is loaded as
+    :param dict children: Nodes for mapped members or array indexes of this value
+    """
+
+    keys: List[str] = field(default_factory=list)
+    children: Dict[str, "_Node"] = field(default_factory=dict)
+
+
+def _skip_whitespace(document: str, index: int) -> int:
+    """Find the first character at or after an index that is not JSON whitespace."""
+    match = _WHITESPACE.match(document, index)
+    if match is None:
+        raise ValueError("Expected whitespace")
+    return match.end()
+
+
+def _check_strings(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Make sure that every mapped path refers to a value that can be loaded as an environment variable.
+
+    :raises MappingError: if any path refers to a value that is not a string
+    """
+    for key, value in values.items():
+        if is_path(key) and not isinstance(value, str):
+            raise MappingError(f'Path "{key}" in environment mapping does not refer to a string value.')
+    return values
+
+
+def _skip_value(document: str, index: int) -> int:
+    """Find the end of a JSON value without building it.
+
+    Skipped values are only checked for balanced brackets and terminated strings.
+    """
+    char = document[index]
+    if char == '"':
+        match = _STRING.match(document, index)
+        if match is None:
+            raise ValueError("Unterminated string")
+        return match.end()
+
+    if char not in "{[":
+        match = _SCALAR.match(document, index)
+        if match is None:
+            raise ValueError("Expected a value")
+        return match.end()
+
+    depth = 0
+    while True:
+        # Anchored, so that a missing bracket fails once instead of once per remaining character.
+        match = _TOKEN.match(document, index)
+        if match is None:
+            raise ValueError("Unterminated container")
+        index = match.end()
+        if match.lastindex == 1:
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return index
+
+
+def _walk(value: Any, node: _Node, values: Dict[str, Any]):
+    """Collect the mapped paths below a value that has already been decoded."""
+    if not isinstance(value, (dict, list)):
+        return
+    for segment, child in node.children.items():
+        try:
+            member = value[int(segment)] if isinstance(value, list) else value[segment]
+        except (KeyError, IndexError, ValueError):
+            continue
+        for key in child.keys:
+            values[key] = member
+        _walk(member, child, values)
+
+
+class KeyProjection:
+    """Environment mapping keys compiled into a tree of the paths to load from each secret."""
+
+    def __init__(self, keys: List[str]):
+        """Compile environment mapping keys.
+
+        :param list keys: Environment mapping keys
+        :raises ConfigurationError: if any path is empty
+        """
+        self._root = _Node()
+        for key in keys:
+            node = self._root
+            for segment in _segments(key):
+                node = node.children.setdefault(segment, _Node())
+            node.keys.append(key)
+
+    def _value(self, document: str, index: int, node: _Node, values: Dict[str, Any]) -> int:
+        if node.keys:
+            value, index = _DECODER.raw_decode(document, index)
+            for key in node.keys:
+                values[key] = value
+            _walk(value, node, values)
+            return index
+
+        char = document[index]
+        if char == "{":
+            return self._object(document, index, node, values)
+        if char == "[":
+            return self._array(document, index, node, values)
+        return _skip_value(document, index)
+
+    def _object(self, document: str, index: int, node: _Node, values: Dict[str, Any]) -> int:
+        index = _skip_whitespace(document, index + 1)
+        if document[index] == "}":
+            return index + 1
+
+        while True:
+            if document[index] != '"':
+                raise ValueError("Expected a member name")
+            name, index = scanstring(document, index + 1)
+            index = _skip_whitespace(document, index)
+            if document[index] != ":":
+                raise ValueError("Expected ':'")
+            index = _skip_whitespace(document, index + 1)
+
+            child = node.children.get(name)
+            index = _skip_value(document, index) if child is None else self._value(document, index, child, values)
+
+            index = _skip_whitespace(document, index)
+            if document[index] == "}":
+                return index + 1
+            if document[index] != ",":
+                raise ValueError("Expected ',' or '}'")
+            index = _skip_whitespace(document, index + 1)
+
+    def _array(self, document: str, index: int, node: _Node, values: Dict[str, Any]) -> int:
+        index = _skip_whitespace(document, index + 1)
+        if document[index] == "]":
+            return index + 1
+
+        position = 0
+        while True:
+            child = node.children.get(str(position))
+            index = _skip_value(document, index) if child is None else self._value(document, index, child, values)
+            position += 1
+
+            index = _skip_whitespace(document, index)
+            if document[index] == "]":
+                return index + 1
+            if document[index] != ",":
+                raise ValueError("Expected ',' or ']'")
+            index = _skip_whitespace(document, index + 1)
+
+    def project(self, *, name: str, raw_secret: str) -> Dict[str, Any]:
+        """Decode only the mapped values of a JSON-encoded secret.
+
+        :param str name: Secret identifier
+        :param str raw_secret: Raw secret value
+        :returns: Mapping of environment mapping keys to the values found in the secret
+        :rtype: dict
+        :raises SecretFormatError: if the value is not a JSON object
+        :raises MappingError: if any mapped path refers to a value that is not a string
+        """
+        values: Dict[str, Any] = {}
+        try:
+            index = _skip_whitespace(raw_secret, 0)
+            if raw_secret[index] != "{":
+                raise ValueError("Expected an object")
+            index = self._object(raw_secret, index, self._root, values)
+            if _skip_whitespace(raw_secret, index) != len(raw_secret):
+                raise ValueError("Extra data")
+        except (ValueError, IndexError):
+            raise SecretFormatError(f'Secret "{name}" value is not JSON formatted.')
+        return _check_strings(values)
+
+    def select(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the mapped values from values that have already been decoded.
+
+        :param dict values: Decoded values
+        :returns: Mapping of environment mapping keys to the values found
+        :rtype: dict
+        :raises MappingError: if any mapped path refers to a value that is not a string
+        """
+        selected: Dict[str, Any] = {}
+        _walk(values, self._root, selected)
+        return _check_strings(selected)
+
+
+def compile_projection(environment_mappings: Dict[str, str]) -> Optional[KeyProjection]:
+    """Compile environment mappings into a projection if any of them is a path.
+
+    Secrets loaded without a projection keep every top-level member,
+    and any member that is not mapped is an error.
+    Secrets loaded with a projection only keep the mapped values.
+
+    :param dict environment_mappings: Mapping from keys or paths to environment variable names
+    :returns: Projection, or ``None`` if every key names a top-level member
+    :raises ConfigurationError: if any path is empty
+    """
+    if not any(is_path(key) for key in environment_mappings):
+        return None
+    return KeyProjection(list(environment_mappings))
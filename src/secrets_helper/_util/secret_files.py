@@ -0,0 +1,141 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for delivering secret payloads to child processes as files."""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..exceptions import ConfigurationError, MappingError
+from .cache import atomic_write
+
+__all__ = ("SecretFileDelivery", "deliver_secret_files", "parse_secret_file")
+_WRITE_CHUNK_SIZE = 1 << 20
+
+
+def parse_secret_file(value: str) -> Tuple[str, str]:
+    """Parse a ``SECRET_ID=ENV_VAR`` secret file mapping.
+
+    Secret names can contain ``=`` but environment variable names cannot,
+    so the mapping is split at the last ``=``.
+
+    :param str value: Raw mapping
+    :returns: Secret ID and environment variable name
+    :rtype: tuple
+    :raises ConfigurationError: if the mapping is not of the form ``SECRET_ID=ENV_VAR``
+    """
+    secret_id, sep, env_var = value.rpartition("=")
+    if not sep or not secret_id or not env_var:
+        raise ConfigurationError(f'Invalid secret file mapping "{value}". Expected "SECRET_ID=ENV_VAR".')
+    return secret_id, env_var
+
+
+def _write_all(fd: int, data: bytes):
+    """Write all data to a file descriptor without copying it."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view[:_WRITE_CHUNK_SIZE])
+        view = view[written:]
+
+
+class SecretFileDelivery:
+    """Deliver secret payloads as private files or memory file descriptors.
+
+    Payloads are written from the bytes they were retrieved as,
+    and only their location is ever placed in the environment.
+    Unless a directory is provided, everything delivered is removed when the delivery is closed.
+    """
+
+    def __init__(self, *, directory: Optional[Path] = None, use_fds: bool = False):
+        """Set up without delivering anything.
+
+        :param Path directory: Directory to keep files in after the delivery is closed
+        :param bool use_fds: Deliver payloads as memory file descriptors instead of files
+        :raises ConfigurationError: if both are requested or memory file descriptors are not supported
+        """
+        if directory is not None and use_fds:
+            raise ConfigurationError("Secret files cannot be delivered both to a directory and as file descriptors")
+        if use_fds and not hasattr(os, "memfd_create"):
+            raise ConfigurationError("Secret files cannot be delivered as file descriptors on this platform")
+        self._directory = directory
+        self._use_fds = use_fds
+        self._temporary_directory: Optional[Path] = None
+        self._fds: List[int] = []
+
+    @property
+    def persistent(self) -> bool:
+        """Determine whether delivered payloads remain available after the delivery is closed."""
+        return self._directory is not None
+
+    @property
+    def pass_fds(self) -> Tuple[int, ...]:
+        """File descriptors that must be passed to the child process."""
+        return tuple(self._fds)
+
+    def deliver(self, *, env_var: str, data: bytes) -> str:
+        """Deliver a payload.
+
+        :param str env_var: Environment variable that the location is stored in
+        :param bytes data: Payload
+        :returns: Path that the child can read the payload from
+        :rtype: str
+        """
+        if self._use_fds:
+            fd = os.memfd_create(env_var)
+            self._fds.append(fd)
+            _write_all(fd, data)
+            # Opening /dev/fd/N reopens the file from the start, however much earlier readers consumed.
+            return f"/dev/fd/{fd}"
+
+        directory = self._directory
+        if directory is None:
+            if self._temporary_directory is None:
+                self._temporary_directory = Path(tempfile.mkdtemp(prefix="secrets-helper-"))
+            directory = self._temporary_directory
+        else:
+            directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        path = directory / env_var
+        atomic_write(path=path, data=data)
+        return str(path)
+
+    def close(self):
+        """Close delivered file descriptors and remove temporary files."""
+        while self._fds:
+            os.close(self._fds.pop())
+        if self._temporary_directory is not None:
+            shutil.rmtree(str(self._temporary_directory), ignore_errors=True)
+            self._temporary_directory = None
+
+
+def deliver_secret_files(
+    *, payloads: Iterable[Tuple[str, bytes]], secret_files: Dict[str, str], delivery: SecretFileDelivery
+) -> Dict[str, str]:
+    """Deliver retrieved payloads one at a time.
+
+    :param payloads: Secret ID and payload of each secret, as retrieved
+    :param dict secret_files: Mapping from secret IDs to the environment variables that hold their locations
+    :param SecretFileDelivery delivery: How to deliver the payloads
+    :returns: Environment variables holding the location of each payload
+    :rtype: dict
+    :raises MappingError: if a retrieved secret has no environment variable mapping
+    """
+    env_vars: Dict[str, str] = {}
+    for secret_id, data in payloads:
+        try:
+            env_var = secret_files[secret_id]
+        except KeyError:
+            raise MappingError(f'Secret "{secret_id}" has no secret file mapping')
+        env_vars[env_var] = delivery.deliver(env_var=env_var, data=data)
+    return env_vars
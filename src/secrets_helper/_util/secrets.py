@@ -11,72 +11,625 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """Utilities for handling secrets."""
+import hashlib
+import itertools
 import json
-from typing import Dict, Iterable, Iterator, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import boto3
 import botocore.exceptions
-import click
 
-__all__ = ("load_secrets", "prep_secrets")
+from ..backends import SecretBackend
+from ..exceptions import ConfigurationError, MappingError, SecretFormatError, SecretRetrievalError
+from ..timings import timed
+from .breaker import CircuitBreaker, check_negative_cache, record_negative_cache
+from .cassette import Cassette, RecordingClient, ReplayClient
+from .identity import SECRET_ID_INDEX, SecretIdIndex, SecretReference
+from .parameters import get_parameter_values
+from .profiling import active as profiling_active
+from .projection import KeyProjection
+from .selectors import DEFAULT_SELECTOR_TTL, SecretSelector, resolve_selectors
+from .shared_cache import SharedSecretCache
 
+__all__ = (
+    "AwsBackend",
+    "LazyClient",
+    "decode_secret",
+    "expand_selectors",
+    "fetch_raw_secret_values",
+    "get_secret_value",
+    "load_parameters",
+    "load_secrets",
+    "merge_secret_values",
+    "prep_secrets",
+    "shared_cache_key",
+)
+_MAX_CONCURRENT_FETCHES = 8
 
-def _get_raw_secret_values(*, secret_ids: Iterable[str]) -> Iterator[Tuple[str, str]]:
+
+class LazyClient:
+    """AWS client (Secrets Manager unless otherwise requested) that is only created when it is first used.
+
+    This avoids the cost of creating a client when every secret is served from the local cache.
+    The client is created only once even if it is first used by several worker threads at the same time,
+    because boto3 sessions are not thread safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        session: Optional[boto3.session.Session] = None,
+        scope: Optional[str] = None,
+        service_name: str = "secretsmanager",
+    ):
+        """Set up without a client.
+
+        :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+        :param str region_name: AWS region (default: determined by botocore)
+        :param session: boto3 session to create the client from (default: the default session)
+        :param str scope: Separates locally cached results from those of other clients for the same endpoint,
+            such as clients for other accounts
+        :param str service_name: AWS service to create a client for
+        """
+        self._endpoint_url = endpoint_url
+        self._region_name = region_name
+        self._session = session
+        self._scope = scope
+        self._service_name = service_name
+        self._client = None
+        self._breaker: Optional[CircuitBreaker] = None
+        self._principal: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker for the client endpoint."""
+        if self._breaker is None:
+            self._breaker = CircuitBreaker(endpoint=self.meta.endpoint_url)
+        return self._breaker
+
+    @property
+    def cache_scope(self) -> str:
+        """Identifies the endpoint and credentials that locally cached results belong to."""
+        if self._scope is None:
+            return self.meta.endpoint_url
+        return f"{self.meta.endpoint_url}#{self._scope}"
+
+    @property
+    def principal(self) -> str:
+        """Identifies the credentials that the client uses without revealing them."""
+        with self._lock:
+            if self._principal is None:
+                with timed("credentials"):
+                    credentials = self._boto_session().get_credentials()
+                if credentials is None:
+                    self._principal = "anonymous"
+                else:
+                    self._principal = hashlib.sha256(credentials.access_key.encode("utf-8")).hexdigest()[:16]
+        return self._principal
+
+    def _boto_session(self) -> boto3.session.Session:
+        """Session to create the client from."""
+        if self._session is not None:
+            return self._session
+        # Same session that boto3.client would use, so that loaded service models are reused.
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        return boto3.DEFAULT_SESSION
+
+    def __getattr__(self, name: str):
+        """Create the client if necessary and pass through all attribute lookups."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    session = self._boto_session()
+                    with timed("credentials"):
+                        session.get_credentials()
+                    try:
+                        with timed("client"):
+                            self._client = session.client(
+                                self._service_name, endpoint_url=self._endpoint_url, region_name=self._region_name
+                            )
+                    except botocore.exceptions.NoRegionError:
+                        raise ConfigurationError("Unable to determine correct AWS region")
+        return getattr(self._client, name)
+
+
+def get_secret_value(
+    *,
+    client: LazyClient,
+    reference: SecretReference,
+    name: str,
+    index: SecretIdIndex = SECRET_ID_INDEX,
+    negative_cache: bool = True,
+) -> Dict:
+    """Retrieve a single secret value, re-resolving the identifier once if the cached ARN is stale.
+
+    Recent permanent failures for the same secret and repeated failures of the endpoint
+    are reported immediately without calling Secrets Manager.
+
+    :param client: Secrets Manager client
+    :param SecretReference reference: Canonical secret reference
+    :param str name: Identifier that resolved to ``reference``
+    :param SecretIdIndex index: Index that ``reference`` was resolved with
+    :param bool negative_cache: Report and cache permanent failures shared with other invocations (default: True)
+    :returns: ``GetSecretValue`` response
+    :rtype: dict
+    """
+    endpoint = client.cache_scope
+    principal = client.principal
+    if negative_cache:
+        check_negative_cache(endpoint=endpoint, principal=principal, secret_id=name)
+    client.breaker.check()
+
+    original_id = SecretReference.parse(name).secret_id
+    try:
+        try:
+            with timed("get_secret_value", name):
+                response = client.get_secret_value(**reference.request())
+        except client.exceptions.ResourceNotFoundException:
+            if original_id == reference.secret_id:
+                raise
+            # The secret might have been deleted and re-created under a new ARN suffix.
+            index.invalidate(arn=reference.secret_id)
+            arn = index.resolve(client=client, secret_id=original_id)
+            with timed("get_secret_value", name):
+                response = client.get_secret_value(**replace(reference, secret_id=arn).request())
+    except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+        client.breaker.record_failure(error)
+        if negative_cache:
+            record_negative_cache(endpoint=endpoint, principal=principal, secret_id=name, error=error)
+        raise SecretRetrievalError(f'Encountered AWS error for secret "{name}": "{error}"')
+
+    client.breaker.record_success()
+    return response
+
+
+def _get_secret_payloads(
+    *, secrets_manager, secret_ids: Iterable[str], index: SecretIdIndex = SECRET_ID_INDEX
+) -> Iterator[Tuple[str, bytes]]:
+    """Retrieve whole secret values as bytes, one at a time.
+
+    ``SecretBinary`` values are produced as the bytes that botocore decoded them into,
+    without further copies, and ``SecretString`` values are encoded as UTF-8.
+    Payloads bypass the shared cache, which only holds text.
+
+    :param secrets_manager: Secrets Manager client
+    :param list secret_ids: Secret IDs to retrieve, optionally pinned to a version
+    :param SecretIdIndex index: Index to resolve secret IDs with
+    :returns: Requested secret ID and payload of each secret
+    :rtype: iterator
+    """
+    for secret_id in secret_ids:
+        reference = SecretReference.parse(secret_id)
+        response = get_secret_value(client=secrets_manager, reference=reference, name=secret_id, index=index)
+        payload = response.get("SecretBinary")
+        if payload is None:
+            payload = response["SecretString"].encode("utf-8")
+        # Drop the response so that only one payload is held in memory at a time.
+        del response
+        yield secret_id, payload
+        del payload
+
+
+def shared_cache_key(*, client: LazyClient, reference: SecretReference) -> str:
+    """Build the shared cache key for a secret reference.
+
+    A version ID always identifies the same value, so pinned versions are cached by version ID
+    and never need to be revalidated.
+    Any other reference is cached per endpoint and scope because the value it identifies can change.
+    Every key includes the principal, so that a value is only served to callers with the same credentials.
+
+    :param client: Secrets Manager client
+    :param SecretReference reference: Canonical secret reference
+    :returns: Cache key
+    :rtype: str
+    """
+    if reference.immutable:
+        return "\0".join(("version", client.principal, str(reference.secret_id), str(reference.version_id)))
+    return "\0".join(
+        ("value", client.cache_scope, client.principal, str(reference.secret_id), str(reference.version_stage or ""))
+    )
+
+
+def expand_selectors(
+    *,
+    client,
+    secret_ids: Iterable[str],
+    selectors: Iterable[SecretSelector],
+    selector_ttl: Optional[float],
+    index: SecretIdIndex = SECRET_ID_INDEX,
+) -> List[str]:
+    """Add the secrets matched by selectors to a list of secret IDs.
+
+    :param client: Secrets Manager client
+    :param list secret_ids: Secret IDs
+    :param list selectors: Selectors identifying additional secrets
+    :param float selector_ttl: Seconds that resolved selectors are cached
+    :param SecretIdIndex index: Index to record the names and ARNs of matched secrets in
+    :returns: Secret IDs followed by the names of all matched secrets
+    :rtype: list
+    """
+    secret_ids = list(secret_ids)
+    for secret in resolve_selectors(client=client, selectors=selectors, ttl=selector_ttl):
+        index.add(name=secret["Name"], arn=secret["ARN"])
+        secret_ids.append(secret["Name"])
+    return secret_ids
+
+
+def _secrets_manager_client(
+    *, endpoint_url: Optional[str], replay: Optional[str], replay_latency: str
+) -> Union[LazyClient, ReplayClient]:
+    """Create a Secrets Manager client, or a client that replays a cassette.
+
+    :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+    :param str replay: Serve all Secrets Manager calls from this cassette file instead of calling Secrets Manager
+    :param str replay_latency: ``zero`` to replay calls immediately or ``recorded`` to take as long as recorded calls
+    :returns: Client
+    """
+    if replay is None:
+        return LazyClient(endpoint_url=endpoint_url)
+    replay_path = Path(replay)
+    return ReplayClient(cassette=Cassette.load(path=replay_path), path=replay_path, latency=replay_latency)
+
+
+def _get_raw_secret_values(
+    *,
+    secret_ids: Iterable[str],
+    selectors: Iterable[SecretSelector] = (),
+    selector_ttl: Optional[float] = DEFAULT_SELECTOR_TTL,
+    shared_cache_ttl: Optional[float] = None,
+    endpoint_url: Optional[str] = None,
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    replay_latency: str = "zero",
+) -> Iterator[Tuple[str, str]]:
     """Retrieve secret values from Secrets Manager.
 
+    Selectors are expanded into the secrets that they match
+    and identifiers that refer to the same secret are collapsed before any value is retrieved.
+    Values pinned to a version ID are served from the shared cache after they are first retrieved.
+    If ``shared_cache_ttl`` is set, all other values are also served from the shared cache for that long.
+    Values are retrieved concurrently but returned in order.
+
+    While recording or replaying a cassette, resolved selectors, values, and failures are never served from local
+    caches, so that every run makes the same calls.
+
     :param list secret_ids: All secret IDs to retrieve
+    :param list selectors: Selectors identifying additional secrets to retrieve
+    :param float selector_ttl: Seconds that resolved selectors are cached
+    :param float shared_cache_ttl: Seconds that unpinned values are shared with other processes
+    :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+    :param str record: Record all Secrets Manager calls into this cassette file
+    :param str replay: Serve all Secrets Manager calls from this cassette file instead of calling Secrets Manager
+    :param str replay_latency: ``zero`` to replay calls immediately or ``recorded`` to take as long as recorded calls
     :returns: Raw secret values
     :rtype: iterable
     """
+    if record is not None and replay is not None:
+        raise ConfigurationError("Cannot record and replay at the same time")
+
+    secrets_manager: Union[LazyClient, ReplayClient, RecordingClient] = _secrets_manager_client(
+        endpoint_url=endpoint_url, replay=replay, replay_latency=replay_latency
+    )
+    cassette: Optional[Cassette] = None
+
+    if record is not None:
+        cassette = Cassette()
+        secrets_manager = RecordingClient(client=secrets_manager, cassette=cassette)
+    use_local_caches = cassette is None and replay is None
+
     try:
-        secrets_manager = boto3.client("secretsmanager")
-    except botocore.exceptions.NoRegionError:
-        raise click.UsageError("Unable to determine correct AWS region")
+        yield from fetch_raw_secret_values(
+            secrets_manager=secrets_manager,
+            secret_ids=secret_ids,
+            selectors=selectors,
+            selector_ttl=selector_ttl if use_local_caches else 0,
+            shared_cache_ttl=shared_cache_ttl if use_local_caches else 0,
+            cache_pinned=use_local_caches,
+            negative_cache=use_local_caches,
+        )
+    finally:
+        if cassette is not None and record is not None:
+            cassette.save(path=Path(record))
+
+
+def fetch_raw_secret_values(
+    *,
+    secrets_manager,
+    secret_ids: Iterable[str],
+    selectors: Iterable[SecretSelector],
+    selector_ttl: Optional[float],
+    shared_cache_ttl: Optional[float],
+    cache_pinned: bool,
+    index: SecretIdIndex = SECRET_ID_INDEX,
+    negative_cache: bool = True,
+) -> Iterator[Tuple[str, str]]:
+    """Retrieve secret values through a client.
 
-    for name in secret_ids:
+    :param secrets_manager: Secrets Manager client
+    :param list secret_ids: All secret IDs to retrieve
+    :param list selectors: Selectors identifying additional secrets to retrieve
+    :param float selector_ttl: Seconds that resolved selectors are cached
+    :param float shared_cache_ttl: Seconds that unpinned values are shared with other processes
+    :param bool cache_pinned: Serve values pinned to a version ID from the shared cache
+    :param SecretIdIndex index: Index used to resolve secret identifiers
+    :param bool negative_cache: Report and cache permanent failures shared with other invocations
+    :returns: Raw secret values
+    :rtype: iterable
+    """
+    shared_cache: Optional[SharedSecretCache] = None
+
+    secret_ids = expand_selectors(
+        client=secrets_manager, secret_ids=secret_ids, selectors=selectors, selector_ttl=selector_ttl, index=index
+    )
+    canonical_ids = index.canonicalize(client=secrets_manager, secret_ids=secret_ids)
+
+    cache_pinned = cache_pinned and any(reference.immutable for reference in canonical_ids)
+    if shared_cache_ttl or cache_pinned:
         try:
-            response = secrets_manager.get_secret_value(SecretId=name)
-        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
-            raise click.UsageError(f'Encountered AWS error for secret "{name}": "{error}"')
+            shared_cache = SharedSecretCache()
+        except OSError:
+            # Without a usable cache directory every value is retrieved directly.
+            shared_cache = None
 
-        yield (name, response["SecretString"])
+    def _fetch(canonical_id: Tuple[SecretReference, str]) -> Tuple[str, str]:
+        reference, name = canonical_id
 
+        def _retrieve() -> str:
+            response = get_secret_value(
+                client=secrets_manager, reference=reference, name=name, index=index, negative_cache=negative_cache
+            )
+            return response["SecretString"]
 
-def load_secrets(*, secret_ids: Iterable[str]) -> Dict[str, str]:
-    """Load JSON-encoded secrets values.
+        if shared_cache is None or not ((cache_pinned and reference.immutable) or shared_cache_ttl):
+            return (name, _retrieve())
 
-    :param list secret_ids: All secret IDs to retrieve
-    :returns: Mapping of secret identifiers to secret values
+        ttl = None if reference.immutable else shared_cache_ttl
+        cache_key = shared_cache_key(client=secrets_manager, reference=reference)
+        return (name, shared_cache.get_or_fetch(cache_key, ttl, _retrieve))
+
+    # The CPU profiler only sees the thread that started it, so do not fetch concurrently while profiling.
+    if len(canonical_ids) <= 1 or profiling_active():
+        yield from map(_fetch, canonical_ids.items())
+        return
+
+    with ThreadPoolExecutor(max_workers=min(_MAX_CONCURRENT_FETCHES, len(canonical_ids))) as executor:
+        yield from executor.map(_fetch, canonical_ids.items())
+
+
+def decode_secret(*, name: str, raw_secret: str, projection: Optional[KeyProjection] = None) -> Dict[str, str]:
+    """Decode a JSON-encoded secret value.
+
+    :param str name: Secret identifier
+    :param str raw_secret: Raw secret value
+    :param KeyProjection projection: Only decode the values of these keys and paths (default: every top-level key)
+    :returns: Mapping of secret keys to values
     :rtype: dict
+    :raises SecretFormatError: if the value is not JSON formatted
+    :raises MappingError: if any projected path refers to a value that is not a string
     """
-    values: Dict[str, str] = {}
+    try:
+        with timed("decode", name):
+            if projection is not None:
+                return projection.project(name=name, raw_secret=raw_secret)
+            return json.loads(raw_secret)
+    except json.decoder.JSONDecodeError:
+        raise SecretFormatError(f'Secret "{name}" value is not JSON formatted.')
 
-    for secret_name, raw_secret in _get_raw_secret_values(secret_ids=secret_ids):
-        try:
-            secret_map = json.loads(raw_secret)
-        except json.decoder.JSONDecodeError:
-            raise click.UsageError(f'Secret "{secret_name}" value is not JSON formatted.')
 
+def merge_secret_values(secret_maps: Iterable[Dict[str, str]]) -> Dict[str, str]:
+    """Merge decoded secret values.
+
+    :param list secret_maps: Decoded secret values
+    :returns: Mapping of secret keys to values
+    :rtype: dict
+    :raises SecretFormatError: if any key is loaded more than once
+    """
+    values: Dict[str, str] = {}
+
+    for secret_map in secret_maps:
         for key, value in secret_map.items():
 
             if key in values:
-                raise click.UsageError(f'Key "{key}" already loaded!')
+                raise SecretFormatError(f'Key "{key}" already loaded!')
 
             values[key] = value
 
     return values
 
 
+class AwsBackend(SecretBackend):
+    """Backend that retrieves secrets from Secrets Manager and parameters from SSM Parameter Store."""
+
+    name = "aws"
+
+    def __init__(
+        self,
+        *,
+        selector_ttl: Optional[float] = DEFAULT_SELECTOR_TTL,
+        shared_cache_ttl: Optional[float] = None,
+        endpoint_url: Optional[str] = None,
+        record: Optional[str] = None,
+        replay: Optional[str] = None,
+        replay_latency: str = "zero",
+    ):
+        """Set up the backend. Nothing is retrieved until values are requested.
+
+        :param float selector_ttl: Seconds that resolved selectors are cached
+        :param float shared_cache_ttl: Seconds that retrieved values are shared with other processes
+        :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+        :param str record: Record all Secrets Manager calls into this cassette file
+        :param str replay: Serve all Secrets Manager calls from this cassette file instead of calling Secrets Manager
+        :param str replay_latency: ``zero`` to replay calls immediately
+            or ``recorded`` to take as long as recorded calls
+        """
+        self._selector_ttl = selector_ttl
+        self._shared_cache_ttl = shared_cache_ttl
+        self._endpoint_url = endpoint_url
+        self._record = record
+        self._replay = replay
+        self._replay_latency = replay_latency
+
+    def get_raw_secret_values(
+        self, *, secret_ids: List[str], selectors: List[SecretSelector]
+    ) -> Iterator[Tuple[str, str]]:
+        """Retrieve raw secret values from Secrets Manager, as described by :func:`_get_raw_secret_values`."""
+        return _get_raw_secret_values(
+            secret_ids=secret_ids,
+            selectors=selectors,
+            selector_ttl=self._selector_ttl,
+            shared_cache_ttl=self._shared_cache_ttl,
+            endpoint_url=self._endpoint_url,
+            record=self._record,
+            replay=self._replay,
+            replay_latency=self._replay_latency,
+        )
+
+    @property
+    def local_caches(self) -> bool:
+        """Whether values and failures are cached locally, which they are not while recording or replaying."""
+        return self._record is None and self._replay is None
+
+    def client(self) -> Union[LazyClient, ReplayClient]:
+        """Create the Secrets Manager client that this backend uses, for watching secrets for rotation.
+
+        :returns: Client
+        :raises ConfigurationError: if Secrets Manager calls are being recorded
+        """
+        if self._record is not None:
+            raise ConfigurationError("Watched secrets cannot be recorded")
+        return _secrets_manager_client(
+            endpoint_url=self._endpoint_url, replay=self._replay, replay_latency=self._replay_latency
+        )
+
+    def shared_cache(self) -> Optional[SharedSecretCache]:
+        """Open the shared cache for values pinned to a version ID, if local caches are used and available.
+
+        :returns: Shared cache or ``None``
+        """
+        if not self.local_caches:
+            return None
+        try:
+            return SharedSecretCache()
+        except OSError:
+            return None
+
+    def get_parameter_values(self, *, names: List[str], paths: List[str]) -> Iterator[Dict[str, str]]:
+        """Retrieve decrypted values from SSM Parameter Store, as described by :func:`get_parameter_values`.
+
+        :raises ConfigurationError: if Secrets Manager calls are being recorded or replayed
+        """
+        if self._record is not None or self._replay is not None:
+            raise ConfigurationError("SSM parameters cannot be recorded or replayed")
+        return get_parameter_values(client=LazyClient(service_name="ssm"), names=names, paths=paths)
+
+    def get_secret_payloads(self, *, secret_ids: List[str]) -> Iterator[Tuple[str, bytes]]:
+        """Retrieve whole secret values from Secrets Manager, as described by :func:`_get_secret_payloads`.
+
+        :raises ConfigurationError: if Secrets Manager calls are being recorded or replayed
+        """
+        if self._record is not None or self._replay is not None:
+            raise ConfigurationError("Secret files cannot be recorded or replayed")
+        return _get_secret_payloads(secrets_manager=LazyClient(endpoint_url=self._endpoint_url), secret_ids=secret_ids)
+
+
+def load_secrets(
+    *,
+    secret_ids: Iterable[str],
+    selectors: Iterable[SecretSelector] = (),
+    selector_ttl: Optional[float] = DEFAULT_SELECTOR_TTL,
+    shared_cache_ttl: Optional[float] = None,
+    endpoint_url: Optional[str] = None,
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    replay_latency: str = "zero",
+    parameter_names: Iterable[str] = (),
+    parameter_paths: Iterable[str] = (),
+    backend: Optional[SecretBackend] = None,
+    projection: Optional[KeyProjection] = None,
+) -> Dict[str, str]:
+    """Load JSON-encoded secrets values and parameter values.
+
+    Each parameter is loaded as a single key, as described by :func:`secrets_helper._util.parameters.parameter_key`.
+
+    :param list secret_ids: All secret IDs to retrieve
+    :param list selectors: Selectors identifying additional secrets to retrieve
+    :param float selector_ttl: Seconds that resolved selectors are cached
+    :param float shared_cache_ttl: Seconds that retrieved values are shared with other processes
+    :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+    :param str record: Record all Secrets Manager calls into this cassette file
+    :param str replay: Serve all Secrets Manager calls from this cassette file instead of calling Secrets Manager
+    :param str replay_latency: ``zero`` to replay calls immediately or ``recorded`` to take as long as recorded calls
+    :param list parameter_names: Parameter names to retrieve
+    :param list parameter_paths: Parameter paths to retrieve all parameters under
+    :param SecretBackend backend: Backend to retrieve values from
+        (default: an :class:`AwsBackend` configured with the options above)
+    :param KeyProjection projection: Only load the values of these keys and paths (default: every top-level key)
+    :returns: Mapping of secret identifiers to secret values
+    :rtype: dict
+    :raises SecretFormatError: if any key is loaded more than once
+    """
+    if backend is None:
+        backend = AwsBackend(
+            selector_ttl=selector_ttl,
+            shared_cache_ttl=shared_cache_ttl,
+            endpoint_url=endpoint_url,
+            record=record,
+            replay=replay,
+            replay_latency=replay_latency,
+        )
+    parameter_names = list(parameter_names)
+    parameter_paths = list(parameter_paths)
+
+    raw_values = backend.get_raw_secret_values(secret_ids=list(secret_ids), selectors=list(selectors))
+    secret_maps: Iterable[Dict[str, str]] = (
+        decode_secret(name=secret_name, raw_secret=raw_secret, projection=projection)
+        for secret_name, raw_secret in raw_values
+    )
+    if parameter_names or parameter_paths:
+        parameter_maps = backend.get_parameter_values(names=parameter_names, paths=parameter_paths)
+        if projection is not None:
+            parameter_maps = (projection.select(parameter_map) for parameter_map in parameter_maps)
+        secret_maps = itertools.chain(secret_maps, parameter_maps)
+    return merge_secret_values(secret_maps)
+
+
+def load_parameters(*, parameter_names: Iterable[str], parameter_paths: Iterable[str], client=None) -> Dict[str, str]:
+    """Load SSM parameter values.
+
+    :param list parameter_names: SSM parameter names to retrieve
+    :param list parameter_paths: SSM parameter paths to retrieve all parameters under
+    :param client: SSM client (default: a client for the default session)
+    :returns: Mapping of parameter keys to parameter values
+    :rtype: dict
+    :raises SecretFormatError: if any key is loaded more than once
+    """
+    parameter_names = list(parameter_names)
+    parameter_paths = list(parameter_paths)
+    if not parameter_names and not parameter_paths:
+        return {}
+
+    client = client if client is not None else LazyClient(service_name="ssm")
+    return merge_secret_values(get_parameter_values(client=client, names=parameter_names, paths=parameter_paths))
+
+
 def prep_secrets(*, environment_mappings: Dict[str, str], secret_values: Dict[str, str]) -> Dict[str, str]:
     """Convert secrets from standardized name map to required environment variable map.
 
     :param dict environment_mappings: Mapping from secret identifiers to environment variable names
     :param dict secret_values: Mapping from secret identifiers to secret values
     :returns: Mapping from environment variable names to secret values
-    :raises click.UsageError: if secrets contains an identifier that is not in environment_mappings
+    :raises MappingError: if secrets contains an identifier that is not in environment_mappings
     """
     try:
         return {environment_mappings[key]: value for key, value in secret_values.items()}
     except KeyError as error:
         missing_key = error.args[0]
-        raise click.UsageError(f'Identifier key "{missing_key}" not found in environment variable mapping.')
+        raise MappingError(f'Identifier key "{missing_key}" not found in environment variable mapping.')
@@ -0,0 +1,173 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Utilities for selecting secrets by name prefix or tag."""
+import contextlib
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import botocore.exceptions
+
+from ..exceptions import ConfigurationError, SecretRetrievalError
+from .cache import cache_dir, read_cached_json, write_cached_json
+
+__all__ = ("SecretSelector", "parse_tag_selector", "resolve_selectors")
+DEFAULT_SELECTOR_TTL = 300
+
+
+@dataclass(frozen=True)
+class SecretSelector:
+    """Selector matching every secret with a name prefix and/or a tag.
+
+    :param str prefix: Secret name prefix
+    :param str tag_key: Tag key
+    :param str tag_value: Tag value
+    """
+
+    prefix: Optional[str] = None
+    tag_key: Optional[str] = None
+    tag_value: Optional[str] = None
+
+    def filters(self) -> List[Dict]:
+        """Build the server-side ``ListSecrets`` filters for this selector.
+
+        ``ListSecrets`` matches tag keys and tag values independently,
+        so results must still be checked with :meth:`matches`.
+
+        :returns: ``ListSecrets`` filters
+        :rtype: list
+        """
+        filters = []
+        if self.prefix is not None:
+            filters.append(dict(Key="name", Values=[self.prefix]))
+        if self.tag_key is not None:
+            filters.append(dict(Key="tag-key", Values=[self.tag_key]))
+        if self.tag_value is not None:
+            filters.append(dict(Key="tag-value", Values=[self.tag_value]))
+        return filters
+
+    def matches(self, secret: Dict) -> bool:
+        """Determine whether a ``ListSecrets`` entry matches this selector.
+
+        :param dict secret: ``ListSecrets`` entry
+        :returns: Decision
+        """
+        if self.prefix is not None and not secret["Name"].startswith(self.prefix):
+            return False
+
+        if self.tag_key is not None:
+            tags = {tag["Key"]: tag.get("Value") for tag in secret.get("Tags", [])}
+            if self.tag_key not in tags:
+                return False
+            if self.tag_value is not None and tags[self.tag_key] != self.tag_value:
+                return False
+
+        return True
+
+
+def parse_tag_selector(value: str) -> SecretSelector:
+    """Parse a ``key=value`` tag selector.
+
+    :param str value: Raw selector
+    :returns: Tag selector
+    :rtype: SecretSelector
+    :raises ConfigurationError: if the selector is not of the form ``key=value``
+    """
+    key, sep, tag_value = value.partition("=")
+    if not sep or not key:
+        raise ConfigurationError(f'Invalid secret tag selector "{value}". Expected "key=value".')
+    return SecretSelector(tag_key=key, tag_value=tag_value)
+
+
+def _list_matching_secrets(*, client, selector: SecretSelector) -> List[Dict[str, str]]:
+    """List every secret matching a selector.
+
+    :param client: Secrets Manager client
+    :param SecretSelector selector: Selector to resolve
+    :returns: Name and ARN of every matching secret
+    :rtype: list
+    :raises SecretRetrievalError: if the secrets cannot be listed
+    """
+    paginator = client.get_paginator("list_secrets")
+    matches = []
+    try:
+        for page in paginator.paginate(Filters=selector.filters()):
+            for secret in page["SecretList"]:
+                if selector.matches(secret):
+                    matches.append(dict(Name=secret["Name"], ARN=secret["ARN"]))
+    except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+        raise SecretRetrievalError(f'Encountered AWS error listing secrets for selector "{selector}": "{error}"')
+    return matches
+
+
+def _cache_key(*, client, selector: SecretSelector) -> str:
+    """Build the cache file name for a selector resolved in the client's region and cache scope by its principal.
+
+    :param client: Secrets Manager client
+    :param SecretSelector selector: Selector
+    :returns: Cache file name
+    :rtype: str
+    """
+    scope = getattr(client, "cache_scope", None)
+    principal = getattr(client, "principal", None)
+    raw = json.dumps(
+        dict(region=client.meta.region_name, scope=scope, principal=principal, selector=asdict(selector)),
+        sort_keys=True,
+    )
+    return f"selector-{hashlib.sha256(raw.encode('utf-8')).hexdigest()}.json"
+
+
+def _cache_file(*, client, selector: SecretSelector) -> Optional[Path]:
+    """Locate the cache file for a selector.
+
+    :param client: Secrets Manager client
+    :param SecretSelector selector: Selector
+    :returns: Cache file or ``None`` if the cache directory is not usable
+    """
+    try:
+        return cache_dir() / _cache_key(client=client, selector=selector)
+    except OSError:
+        return None
+
+
+def resolve_selectors(
+    *, client, selectors: Iterable[SecretSelector], ttl: Optional[float] = DEFAULT_SELECTOR_TTL
+) -> List[Dict[str, str]]:
+    """Resolve selectors to the secrets that they match.
+
+    Results are cached for ``ttl`` seconds so that repeated invocations do not list secrets again.
+
+    :param client: Secrets Manager client
+    :param list selectors: Selectors to resolve
+    :param float ttl: Seconds that resolved selectors are cached (0 disables caching)
+    :returns: Name and ARN of every matching secret, without duplicates
+    :rtype: list
+    """
+    secrets: Dict[str, Dict[str, str]] = {}
+
+    for selector in selectors:
+        cache_file = _cache_file(client=client, selector=selector) if ttl else None
+        matches = read_cached_json(path=cache_file) if cache_file is not None else None
+
+        if matches is None:
+            matches = _list_matching_secrets(client=client, selector=selector)
+            if cache_file is not None:
+                with contextlib.suppress(OSError):
+                    write_cached_json(path=cache_file, value=matches, ttl=ttl)
+
+        for secret in matches:
+            secrets.setdefault(secret["ARN"], secret)
+
+    return list(secrets.values())
@@ -0,0 +1,119 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Encrypted secret cache shared by every process on a host."""
+import hashlib
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..timings import event
+from .cache import atomic_write, cache_dir, exclusive_lock
+from .crypto import local_key, seal, unseal
+
+__all__ = ("SharedSecretCache",)
+_MAGIC = b"SHC1"
+_HEADER = struct.Struct("!4sd")
+_NEVER = 0.0
+
+
+class SharedSecretCache:
+    """Encrypted secret cache shared by every process on a host.
+
+    Each entry is stored in its own file, encrypted with the local cache key
+    and bound to its cache key so that entries cannot be swapped.
+    Entries are replaced atomically, so readers map them into memory without taking any lock.
+    When an entry is missing, one process retrieves the value while holding a lock for that entry
+    and every other process waiting on that lock reads the result.
+
+    :param Path directory: Directory to store entries in (default: ``secrets`` in the cache directory)
+    :param bytes key: Key to encrypt entries with (default: local cache key)
+    """
+
+    def __init__(self, *, directory: Optional[Path] = None, key: Optional[bytes] = None):
+        """Set up the cache directory."""
+        self._directory = directory if directory is not None else cache_dir() / "secrets"
+        self._directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._key = key if key is not None else local_key()
+
+    def _path(self, cache_key: str, suffix: str) -> Path:
+        """Locate a file for an entry.
+
+        :param str cache_key: Cache key
+        :param str suffix: File suffix
+        :returns: Entry file
+        :rtype: Path
+        """
+        return self._directory / f"{hashlib.sha256(cache_key.encode('utf-8')).hexdigest()}{suffix}"
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """Read a value if it is cached and has not expired.
+
+        :param str cache_key: Cache key
+        :returns: Cached value or ``None``
+        """
+        try:
+            with open(str(self._path(cache_key, ".entry")), "rb") as entry_file:
+                with mmap.mmap(entry_file.fileno(), 0, access=mmap.ACCESS_READ) as entry:
+                    if len(entry) < _HEADER.size:
+                        return None
+                    magic, expires = _HEADER.unpack_from(entry)
+                    if magic != _MAGIC or (expires != _NEVER and expires < time.time()):
+                        return None
+                    sealed = entry[_HEADER.size :]
+        except (OSError, ValueError):
+            return None
+
+        try:
+            return unseal(key=self._key, sealed=sealed, associated_data=cache_key.encode("utf-8")).decode("utf-8")
+        except ValueError:
+            return None
+
+    def put(self, cache_key: str, value: str, ttl: Optional[float]):
+        """Cache a value.
+
+        :param str cache_key: Cache key
+        :param str value: Value to cache
+        :param float ttl: Seconds that the value remains valid (``None`` never expires)
+        """
+        expires = _NEVER if ttl is None else time.time() + ttl
+        sealed = seal(key=self._key, plaintext=value.encode("utf-8"), associated_data=cache_key.encode("utf-8"))
+        atomic_write(path=self._path(cache_key, ".entry"), data=_HEADER.pack(_MAGIC, expires) + sealed)
+
+    def get_or_fetch(self, cache_key: str, ttl: Optional[float], fetch: Callable[[], str]) -> str:
+        """Read a cached value, retrieving and caching it if necessary.
+
+        Only one process retrieves a missing value at a time.
+
+        :param str cache_key: Cache key
+        :param float ttl: Seconds that a retrieved value remains valid (``None`` never expires)
+        :param fetch: Callable that retrieves the value
+        :returns: Value
+        :rtype: str
+        """
+        value = self.get(cache_key)
+        if value is not None:
+            event("shared_cache_hit")
+            return value
+
+        with exclusive_lock(self._path(cache_key, ".lock")):
+            # Another process might have retrieved the value while we waited.
+            value = self.get(cache_key)
+            if value is None:
+                value = fetch()
+                self.put(cache_key, value, ttl)
+            else:
+                event("shared_cache_hit")
+
+        return value
@@ -0,0 +1,212 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Keep a command running with current secrets as secrets are rotated."""
+import random
+import signal
+import subprocess  # nosec
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from ..exceptions import SecretsHelperError
+from .execute import prepare_command
+from .watch import DEFAULT_WATCH_INTERVAL, DEFAULT_WATCH_JITTER, SecretWatcher
+
+__all__ = ("ROTATE_ACTIONS", "RestartLimiter", "Supervisor")
+ROTATE_ACTIONS = ("restart", "signal")
+DEFAULT_STOP_TIMEOUT = 10.0
+_FORWARDED_SIGNALS = ("SIGINT", "SIGTERM")
+
+
+class RestartLimiter:
+    """Exponential backoff between restarts.
+
+    A restart is allowed once the previous start was at least the current backoff ago.
+    The backoff doubles with each restart, up to ``max_backoff``,
+    and resets once a child has been running for ``reset_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        reset_after: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Set up without any recorded starts.
+
+        :param float min_backoff: Seconds between the first start and the first restart
+        :param float max_backoff: Maximum seconds between restarts
+        :param float reset_after: Seconds a child must run for the backoff to reset
+        :param clock: Monotonic clock
+        """
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.reset_after = reset_after
+        self._clock = clock
+        self._backoff = min_backoff
+        self._last_start: Optional[float] = None
+
+    def delay(self) -> float:
+        """Seconds until the next restart is allowed."""
+        if self._last_start is None:
+            return 0.0
+        return max(self._last_start + self._backoff - self._clock(), 0.0)
+
+    def record_start(self):
+        """Record that a child was started."""
+        now = self._clock()
+        if self._last_start is None or now - self._last_start >= self.reset_after:
+            self._backoff = self.min_backoff
+        else:
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+        self._last_start = now
+
+
+class Supervisor:
+    """Run a command and restart or signal it when the secrets it was started with are rotated.
+
+    The supervisor exits with the command's exit code when the command exits on its own.
+    ``SIGINT`` and ``SIGTERM`` received by the supervisor are forwarded to the command.
+    """
+
+    def __init__(
+        self,
+        *,
+        command: str,
+        watcher: SecretWatcher,
+        on_rotate: str = "restart",
+        rotate_signal: int = signal.SIGTERM,
+        interval: float = DEFAULT_WATCH_INTERVAL,
+        jitter: float = DEFAULT_WATCH_JITTER,
+        limiter: Optional[RestartLimiter] = None,
+        stop_timeout: float = DEFAULT_STOP_TIMEOUT,
+        log: Callable[[str], None] = lambda message: None,
+        pass_fds: Tuple[int, ...] = (),
+    ):
+        """Set up the supervisor. Nothing is started until :meth:`run` is called.
+
+        :param str command: Command to run, which can refer to secrets with ``{env:NAME}``
+        :param SecretWatcher watcher: Watcher for the secrets to run the command with
+        :param str on_rotate: ``restart`` to restart the command with the new secrets
+            or ``signal`` to send it ``rotate_signal``
+        :param int rotate_signal: Signal sent when ``on_rotate`` is ``signal``
+        :param float interval: Average seconds between checks for new secret versions
+        :param float jitter: Fraction of the interval to randomly vary each check by
+        :param RestartLimiter limiter: Limits how often the command is restarted
+        :param float stop_timeout: Seconds to wait for the command to stop before killing it
+        :param log: Called with a message for every rotation, restart, and error
+        :param tuple pass_fds: File descriptors to keep open in the command
+        """
+        if on_rotate not in ROTATE_ACTIONS:
+            raise ValueError(f'Unknown rotation action "{on_rotate}"')
+        self._command = command
+        self._watcher = watcher
+        self._on_rotate = on_rotate
+        self._rotate_signal = rotate_signal
+        self._interval = interval
+        self._jitter = jitter
+        self._limiter = limiter if limiter is not None else RestartLimiter()
+        self._stop_timeout = stop_timeout
+        self._log = log
+        self._pass_fds = pass_fds
+        self._child: Optional[subprocess.Popen] = None
+
+    def _next_poll(self) -> float:
+        return time.monotonic() + self._interval * (1 + random.uniform(-self._jitter, self._jitter))  # nosec
+
+    def _start(self) -> subprocess.Popen:
+        command_args, env = prepare_command(raw_command=self._command, extra_env_vars=self._watcher.environment)
+        # Using shell=False because we explicitly want to contain this subprocess execution.
+        child = subprocess.Popen(command_args, env=env, shell=False, pass_fds=self._pass_fds)  # nosec
+        self._child = child
+        self._limiter.record_start()
+        return child
+
+    def _stop(self, child: subprocess.Popen):
+        child.terminate()
+        try:
+            child.wait(timeout=self._stop_timeout)
+        except subprocess.TimeoutExpired:
+            self._log(f"Command did not stop within {self._stop_timeout:.0f} seconds. Killing it.")
+            child.kill()
+            child.wait()
+
+    def _forward(self, signum, _frame):
+        if self._child is not None and self._child.poll() is None:
+            self._child.send_signal(signum)
+
+    def _poll(self) -> bool:
+        """Check for rotated secrets.
+
+        :returns: Whether the command needs to be restarted
+        """
+        try:
+            changed = self._watcher.poll()
+        except SecretsHelperError as error:
+            self._log(f"Error: {error}")
+            return False
+
+        if not changed:
+            return False
+
+        self._log(f"Rotated {', '.join(sorted(changed))}")
+        if self._on_rotate == "restart":
+            return True
+
+        if self._child is not None and self._child.poll() is None:
+            self._child.send_signal(self._rotate_signal)
+        return False
+
+    def run(self) -> int:
+        """Run the command until it exits on its own.
+
+        :returns: Exit code of the command
+        :rtype: int
+        """
+        self._watcher.poll()
+
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for name in _FORWARDED_SIGNALS:
+                signum = getattr(signal, name)
+                previous_handlers[signum] = signal.signal(signum, self._forward)
+
+        try:
+            child = self._start()
+            next_poll = self._next_poll()
+            restart_pending = False
+
+            while True:
+                wake_at = next_poll
+                if restart_pending:
+                    wake_at = min(wake_at, time.monotonic() + self._limiter.delay())
+
+                try:
+                    return child.wait(timeout=max(wake_at - time.monotonic(), 0.0))
+                except subprocess.TimeoutExpired:
+                    pass
+
+                if time.monotonic() >= next_poll:
+                    restart_pending = self._poll() or restart_pending
+                    next_poll = self._next_poll()
+
+                if restart_pending and self._limiter.delay() == 0:
+                    self._log("Restarting command with rotated secrets")
+                    self._stop(child)
+                    child = self._start()
+                    restart_pending = False
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
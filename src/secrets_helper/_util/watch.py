@@ -0,0 +1,275 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Keep secret outputs up to date as secrets are rotated."""
+import random
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import botocore.exceptions
+
+from ..exceptions import SecretFormatError, SecretRetrievalError, SecretsHelperError
+from .cache import atomic_write
+from .formats import format_environment
+from .identity import SECRET_ID_INDEX, SecretIdIndex, SecretReference
+from .projection import compile_projection
+from .secrets import decode_secret, get_secret_value, prep_secrets, shared_cache_key
+from .shared_cache import SharedSecretCache
+
+__all__ = ("DEFAULT_WATCH_INTERVAL", "DEFAULT_WATCH_JITTER", "SecretWatcher", "watch_secrets")
+DEFAULT_WATCH_INTERVAL = 300
+DEFAULT_WATCH_JITTER = 0.1
+_CURRENT_STAGE = "AWSCURRENT"
+
+
+@dataclass
+class _WatchedSecret:
+    """Last retrieved state of one watched secret."""
+
+    name: str
+    reference: SecretReference
+    version_id: Optional[str] = None
+    environment: Dict[str, str] = field(default_factory=dict)
+    seeded: bool = False
+
+
+class SecretWatcher:
+    """Track the current version of each secret and rewrite outputs when versions change.
+
+    Each poll describes every secret, which does not retrieve secret values,
+    and only retrieves the values of secrets whose current version has changed.
+    Only the outputs that contain changed environment variables are rewritten.
+
+    If the environment was already loaded, the watcher can be seeded with it.
+    The first poll then only records the current version of each secret.
+    When a seeded secret first changes, the seeded version is retrieved as well
+    to find out which variables it provided.
+    """
+
+    def __init__(
+        self,
+        *,
+        client,
+        secret_ids: Iterable[str],
+        environment_mappings: Dict[str, str],
+        env_file: Optional[Path] = None,
+        secrets_dir: Optional[Path] = None,
+        index: SecretIdIndex = SECRET_ID_INDEX,
+        static_environment: Optional[Dict[str, str]] = None,
+        initial_environment: Optional[Dict[str, str]] = None,
+        shared_cache: Optional[SharedSecretCache] = None,
+        negative_cache: bool = True,
+    ):
+        """Set up the watcher. Nothing is retrieved until the first poll.
+
+        :param client: Secrets Manager client
+        :param list secret_ids: Secret IDs to watch, optionally pinned to a version
+        :param dict environment_mappings: Mapping from secret keys to environment variable names
+        :param Path env_file: File to write all environment variables to
+        :param Path secrets_dir: Directory to write each environment variable to as a separate file
+        :param SecretIdIndex index: Index used to resolve secret identifiers
+        :param dict static_environment: Environment variables that are written with the secrets but never change,
+            such as those loaded from SSM parameters
+        :param dict initial_environment: All environment variables, already loaded from the current versions
+        :param SharedSecretCache shared_cache: Cache to share retrieved versions with other processes
+        :param bool negative_cache: Report and cache permanent failures shared with other invocations
+        """
+        self._client = client
+        self._static_environment = dict(static_environment or {})
+        self._initial_environment = dict(initial_environment or {})
+        self._seeded = initial_environment is not None
+        self._shared_cache = shared_cache
+        self._negative_cache = negative_cache
+        self._polled = False
+        self._index = index
+        self._environment_mappings = environment_mappings
+        self._projection = compile_projection(environment_mappings)
+        self.env_file = env_file
+        self.secrets_dir = secrets_dir
+        self._secrets = [
+            _WatchedSecret(name=name, reference=reference)
+            for reference, name in index.canonicalize(client=client, secret_ids=secret_ids).items()
+        ]
+
+    @property
+    def environment(self) -> Dict[str, str]:
+        """Environment variables from the most recently retrieved versions of all secrets."""
+        environment = dict(self._static_environment)
+        environment.update(self._initial_environment)
+        for secret in self._secrets:
+            environment.update(secret.environment)
+        return environment
+
+    def _current_version(self, secret: _WatchedSecret) -> str:
+        """Find the version ID that a secret reference currently refers to.
+
+        :raises SecretRetrievalError: if the secret cannot be described
+        """
+        if secret.reference.version_id is not None:
+            return secret.reference.version_id
+
+        stage = secret.reference.version_stage or _CURRENT_STAGE
+        try:
+            response = self._client.describe_secret(SecretId=secret.reference.secret_id)
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as error:
+            raise SecretRetrievalError(f'Encountered AWS error for secret "{secret.name}": "{error}"')
+
+        for version_id, stages in response.get("VersionIdsToStages", {}).items():
+            if stage in stages:
+                return version_id
+        raise SecretRetrievalError(f'Secret "{secret.name}" has no version with stage "{stage}"')
+
+    def _load_environment(self, secret: _WatchedSecret, version_id: str) -> Dict[str, str]:
+        """Retrieve a specific version of a secret, sharing it with other processes if possible.
+
+        :returns: Environment variables loaded from the version
+        :raises SecretRetrievalError: if the secret cannot be retrieved
+        :raises SecretFormatError: if the secret is not JSON formatted
+        :raises MappingError: if any loaded key has no environment variable mapping
+        """
+        reference = replace(secret.reference, version_id=version_id, version_stage=None)
+
+        def _fetch() -> str:
+            response = get_secret_value(
+                client=self._client,
+                reference=reference,
+                name=secret.name,
+                index=self._index,
+                negative_cache=self._negative_cache,
+            )
+            return response["SecretString"]
+
+        if self._shared_cache is None:
+            raw_secret = _fetch()
+        else:
+            # Versions never change, so they can be cached without expiring.
+            cache_key = shared_cache_key(client=self._client, reference=reference)
+            raw_secret = self._shared_cache.get_or_fetch(cache_key, None, _fetch)
+        return prep_secrets(
+            environment_mappings=self._environment_mappings,
+            secret_values=decode_secret(name=secret.name, raw_secret=raw_secret, projection=self._projection),
+        )
+
+    def _check_conflicts(self, changed: _WatchedSecret, environment: Dict[str, str]):
+        overlap = sorted(set(self._static_environment) & set(environment))
+        if overlap:
+            raise SecretFormatError(f'Environment variable "{overlap[0]}" loaded from a secret and a parameter')
+        for secret in self._secrets:
+            shared = sorted(set(secret.environment) & set(environment))
+            if secret is not changed and shared:
+                raise SecretFormatError(f'Environment variable "{shared[0]}" loaded from more than one secret')
+
+    def poll(self) -> Set[str]:
+        """Retrieve every secret whose current version has changed and rewrite affected outputs.
+
+        :returns: Names of environment variables that were added, changed, or removed
+        :rtype: set
+        :raises SecretRetrievalError: if any secret cannot be described or retrieved
+        :raises SecretFormatError: if any secret is not JSON formatted or any key is loaded more than once
+        :raises MappingError: if any loaded key has no environment variable mapping
+        """
+        seeded = self._seeded and not self._polled
+        changed: Set[str] = set() if self._polled or seeded else set(self._static_environment)
+        for secret in self._secrets:
+            if secret.version_id is not None and secret.reference.version_id is not None:
+                continue
+
+            version_id = self._current_version(secret)
+            if seeded:
+                # The initial environment was loaded from this version.
+                secret.version_id = version_id
+                secret.seeded = True
+                continue
+            if version_id == secret.version_id:
+                continue
+
+            if secret.seeded and secret.version_id is not None:
+                # Find out which variables in the initial environment came from this secret,
+                # so that variables removed by the new version are removed.
+                secret.environment = self._load_environment(secret, secret.version_id)
+                for key in secret.environment:
+                    self._initial_environment.pop(key, None)
+                secret.seeded = False
+
+            environment = self._load_environment(secret, version_id)
+            self._check_conflicts(secret, environment)
+
+            changed.update(
+                key
+                for key in set(environment) | set(secret.environment)
+                if environment.get(key) != secret.environment.get(key)
+            )
+            secret.version_id = version_id
+            secret.environment = environment
+
+        self._polled = True
+        if changed:
+            self._write(changed)
+        return changed
+
+    def _write(self, changed: Set[str]):
+        """Atomically rewrite the outputs that contain changed environment variables."""
+        environment = self.environment
+
+        if self.env_file is not None:
+            contents = format_environment(environment=environment)
+            atomic_write(path=self.env_file, data=contents.encode("utf-8"))
+
+        if self.secrets_dir is not None:
+            self.secrets_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            for key in sorted(changed):
+                path = self.secrets_dir / key
+                if key in environment:
+                    atomic_write(path=path, data=environment[key].encode("utf-8"))
+                elif path.exists():
+                    path.unlink()
+
+
+def watch_secrets(
+    *,
+    watcher: SecretWatcher,
+    interval: float = DEFAULT_WATCH_INTERVAL,
+    jitter: float = DEFAULT_WATCH_JITTER,
+    on_change: Callable[[Set[str]], None],
+    on_error: Callable[[Exception], None],
+    iterations: Optional[int] = None,
+    sleep: Callable[[float], None] = time.sleep,
+):
+    """Poll for new secret versions until interrupted.
+
+    Polls are spread out by up to ``jitter`` times the interval in either direction,
+    so that many watchers started together do not poll together.
+    Errors after the first poll are reported and retried on the next poll.
+
+    :param SecretWatcher watcher: Watcher to poll
+    :param float interval: Average seconds between polls
+    :param float jitter: Fraction of the interval to randomly add or remove
+    :param on_change: Called with the names of changed environment variables after each poll that changed any
+    :param on_error: Called with any secrets-helper error raised by a poll after the first
+    :param int iterations: Stop after this many polls (default: never stop)
+    :param sleep: Callable used to wait between polls
+    """
+    on_change(watcher.poll())
+
+    polls = 1
+    while iterations is None or polls < iterations:
+        sleep(interval * (1 + random.uniform(-jitter, jitter)))  # nosec
+        polls += 1
+        try:
+            changed = watcher.poll()
+        except SecretsHelperError as error:
+            on_error(error)
+            continue
+        if changed:
+            on_change(changed)
@@ -0,0 +1,127 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Interface for sources of secret values.
+
+A backend is selected by name.
+The ``aws`` and ``file`` backends are built in.
+Other backends are registered as ``secrets_helper.backends`` entry points
+that refer to a :class:`SecretBackend` subclass
+and are only imported when they are selected.
+"""
+import abc
+import importlib
+from typing import Dict, Iterable, List, Tuple
+
+from ._util.entry_points import find_entry_points
+from ._util.selectors import SecretSelector
+from .exceptions import ConfigurationError
+
+__all__ = ("BACKEND_ENTRY_POINT_GROUP", "DEFAULT_BACKEND", "SecretBackend", "backend_names", "load_backend")
+BACKEND_ENTRY_POINT_GROUP = "secrets_helper.backends"
+DEFAULT_BACKEND = "aws"
+_BUILTIN_BACKENDS = dict(
+    aws="secrets_helper._util.secrets:AwsBackend", file="secrets_helper._util.file_backend:FileBackend"
+)
+
+
+class SecretBackend(abc.ABC):
+    """Source of secret values and parameters.
+
+    Backends are constructed with keyword arguments from ``--backend-option KEY=VALUE``.
+    """
+
+    name = "custom"
+
+    @abc.abstractmethod
+    def get_raw_secret_values(
+        self, *, secret_ids: List[str], selectors: List[SecretSelector]
+    ) -> Iterable[Tuple[str, str]]:
+        """Retrieve raw secret values.
+
+        :param list secret_ids: Secret IDs to retrieve, optionally pinned to a version
+        :param list selectors: Selectors identifying additional secrets to retrieve
+        :returns: Secret identifier and JSON-encoded value of each secret, with each secret only returned once
+        :rtype: iterable
+        :raises SecretRetrievalError: if any secret cannot be retrieved
+        """
+
+    def get_parameter_values(self, *, names: List[str], paths: List[str]) -> Iterable[Dict[str, str]]:
+        """Retrieve parameter values.
+
+        :param list names: Parameter names
+        :param list paths: Parameter paths to retrieve all parameters under
+        :returns: Mapping of the key to the value of each parameter
+        :rtype: iterable
+        :raises SecretRetrievalError: if any parameter cannot be retrieved
+        :raises ConfigurationError: if the backend does not support parameters
+        """
+        raise ConfigurationError(f'The "{self.name}" backend does not support parameters')
+
+    def get_secret_payloads(self, *, secret_ids: List[str]) -> Iterable[Tuple[str, bytes]]:
+        """Retrieve whole secret values as bytes, for delivery as files.
+
+        Payloads should be produced one at a time so that only one is held in memory.
+
+        :param list secret_ids: Secret IDs to retrieve, optionally pinned to a version
+        :returns: Requested secret ID and payload of each secret
+        :rtype: iterable
+        :raises SecretRetrievalError: if any secret cannot be retrieved
+        :raises ConfigurationError: if the backend does not support secret files
+        """
+        raise ConfigurationError(f'The "{self.name}" backend does not support secret files')
+
+
+def _entry_points() -> Dict:
+    """Find all backends registered as entry points. This scans every installed distribution."""
+    return find_entry_points(BACKEND_ENTRY_POINT_GROUP)
+
+
+def backend_names() -> List[str]:
+    """List the names of all available backends.
+
+    :returns: Backend names
+    :rtype: list
+    """
+    return sorted(set(_BUILTIN_BACKENDS) | set(_entry_points()))
+
+
+def load_backend(name: str, **options: str) -> SecretBackend:
+    """Import and construct a backend.
+
+    Built-in backends are found without scanning entry points.
+
+    :param str name: Backend name
+    :param options: Backend options
+    :returns: Backend
+    :rtype: SecretBackend
+    :raises ConfigurationError: if the backend is unknown or does not accept the options
+    """
+    try:
+        module_name, _, attribute = _BUILTIN_BACKENDS[name].partition(":")
+        backend_class = getattr(importlib.import_module(module_name), attribute)
+    except KeyError:
+        try:
+            entry_point = _entry_points()[name]
+        except KeyError:
+            raise ConfigurationError(f'Unknown backend "{name}"')
+        backend_class = entry_point.load()
+
+    if not (isinstance(backend_class, type) and issubclass(backend_class, SecretBackend)):
+        raise ConfigurationError(f'Backend "{name}" is not a SecretBackend')
+
+    try:
+        backend = backend_class(**options)
+    except TypeError as error:
+        raise ConfigurationError(f'Invalid options for backend "{name}": {error}')
+    backend.name = name
+    return backend
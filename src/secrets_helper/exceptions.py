@@ -0,0 +1,46 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Exceptions raised by secrets-helper."""
+
+__all__ = (
+    "SecretsHelperError",
+    "ConfigurationError",
+    "MappingError",
+    "SecretRetrievalError",
+    "CircuitOpenError",
+    "SecretFormatError",
+)
+
+
+class SecretsHelperError(Exception):
+    """Base class for all errors raised by secrets-helper."""
+
+
+class ConfigurationError(SecretsHelperError):
+    """Options, local state, or the AWS environment are not usable."""
+
+
+class MappingError(ConfigurationError):
+    """A loaded secret key has no environment variable mapping."""
+
+
+class SecretRetrievalError(SecretsHelperError):
+    """A secret could not be retrieved."""
+
+
+class CircuitOpenError(SecretRetrievalError):
+    """Secrets Manager is not being called because recent calls to the endpoint failed."""
+
+
+class SecretFormatError(SecretsHelperError):
+    """A secret value is not a JSON object or repeats a key that is already loaded."""
@@ -0,0 +1,278 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Reusable, thread-safe interface for loading secrets from Python code."""
+import asyncio
+import functools
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import boto3
+
+from ._util.identity import SecretIdIndex, SecretReference
+from ._util.memory_cache import MemoryCache
+from ._util.projection import compile_projection
+from ._util.secrets import (
+    LazyClient,
+    decode_secret,
+    fetch_raw_secret_values,
+    get_secret_value,
+    merge_secret_values,
+    prep_secrets,
+)
+
+__all__ = ("DEFAULT_CACHE_TTL", "DEFAULT_MAX_CACHED_SECRETS", "SecretsHelper")
+DEFAULT_CACHE_TTL = 300.0
+DEFAULT_MAX_CACHED_SECRETS = 1024
+
+
+def _map_environment(*, environment_mappings: Dict[str, str], secret_values: Dict) -> Dict[str, str]:
+    """Map secret values to environment variable names, following any paths into nested values.
+
+    Cached secrets are fully decoded because they can be looked up with other mappings later,
+    so paths are followed through the decoded values instead of projecting while decoding.
+    """
+    projection = compile_projection(environment_mappings)
+    if projection is not None:
+        secret_values = projection.select(secret_values)
+    return prep_secrets(environment_mappings=environment_mappings, secret_values=secret_values)
+
+
+class SecretsHelper:
+    """Load JSON-encoded secrets from Secrets Manager.
+
+    A helper owns one Secrets Manager client per region and keeps decoded secret values in memory,
+    so repeated lookups do not call Secrets Manager again until the cached values expire.
+    Create one helper and share it; every method is safe to call from multiple threads.
+
+    .. code-block:: python
+
+        helper = SecretsHelper(region_name="us-west-2")
+        environment = helper.get_environment(
+            secret_ids=["MyAwesomeSecret"], environment_mappings={"username": "TWINE_USERNAME"}
+        )
+
+    Errors are raised as :class:`secrets_helper.exceptions.SecretsHelperError` subclasses.
+    """
+
+    def __init__(
+        self,
+        *,
+        region_name: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        session: Optional[boto3.session.Session] = None,
+        cache_ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        max_cached_secrets: int = DEFAULT_MAX_CACHED_SECRETS,
+    ):
+        """Set up the helper. No clients are created until secrets are first loaded.
+
+        :param str region_name: Default AWS region (default: determined by botocore)
+        :param str endpoint_url: Secrets Manager endpoint URL (default: determined by botocore)
+        :param session: boto3 session to create clients from (default: a new session)
+        :param float cache_ttl: Seconds to keep secret values in memory
+            (0 disables caching, ``None`` keeps values until they are evicted)
+        :param int max_cached_secrets: Maximum number of secret values to keep in memory
+        """
+        self.region_name = region_name
+        self._endpoint_url = endpoint_url
+        self._session = session if session is not None else boto3.session.Session()
+        self._cache = MemoryCache(ttl=cache_ttl, max_entries=max_cached_secrets)
+        self._clients: Dict[Optional[str], Tuple[LazyClient, SecretIdIndex]] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, region_name: Optional[str]) -> Tuple[LazyClient, SecretIdIndex]:
+        """Get the client and identifier index for a region, creating them if necessary.
+
+        boto3 sessions are not thread-safe, so clients are only created while holding the lock.
+        """
+        try:
+            return self._clients[region_name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if region_name not in self._clients:
+                client = LazyClient(endpoint_url=self._endpoint_url, region_name=region_name, session=self._session)
+                # Create the client now rather than on first use by a worker thread.
+                client.meta  # pylint: disable=pointless-statement
+                self._clients[region_name] = (client, SecretIdIndex())
+            return self._clients[region_name]
+
+    def _cached_values(
+        self, *, secret_ids: Iterable[str], region_name: Optional[str]
+    ) -> Tuple[LazyClient, SecretIdIndex, Dict[SecretReference, str], Dict[SecretReference, Dict[str, str]]]:
+        """Collapse secret identifiers and look them up in the cache.
+
+        :param list secret_ids: Secret IDs to load
+        :param str region_name: AWS region
+        :returns: Client and index for the region, canonical references with the identifier that named each,
+            and cached values for every reference that is cached
+        """
+        client, index = self._client(region_name)
+        references = index.canonicalize(client=client, secret_ids=secret_ids)
+
+        values: Dict[SecretReference, Dict[str, str]] = {}
+        for reference in references:
+            cached = self._cache.get((region_name, reference))
+            if cached is not None:
+                values[reference] = cached
+        return client, index, references, values
+
+    def _load_secret(
+        self,
+        *,
+        client: LazyClient,
+        index: SecretIdIndex,
+        region_name: Optional[str],
+        reference: SecretReference,
+        name: str,
+    ) -> Dict[str, str]:
+        """Retrieve, decode, and cache a single secret value."""
+        response = get_secret_value(client=client, reference=reference, name=name, index=index)
+        secret_map = decode_secret(name=name, raw_secret=response["SecretString"])
+        self._cache.put((region_name, reference), secret_map)
+        return secret_map
+
+    def get_secret_values(self, *, secret_ids: Iterable[str], region_name: Optional[str] = None) -> Dict[str, str]:
+        """Load and merge JSON-encoded secret values.
+
+        Identifiers that refer to the same secret are only loaded once.
+
+        :param list secret_ids: Secret IDs to load, optionally pinned to a version
+        :param str region_name: AWS region (default: the helper's region)
+        :returns: Mapping of secret keys to values
+        :rtype: dict
+        :raises SecretRetrievalError: if any secret cannot be retrieved
+        :raises SecretFormatError: if any secret is not JSON formatted or any key is loaded more than once
+        """
+        region_name = region_name if region_name is not None else self.region_name
+        client, index, references, values = self._cached_values(secret_ids=secret_ids, region_name=region_name)
+        missing = [name for reference, name in references.items() if reference not in values]
+
+        if missing:
+            names = {name: reference for reference, name in references.items()}
+            raw_values = fetch_raw_secret_values(
+                secrets_manager=client,
+                secret_ids=missing,
+                selectors=(),
+                selector_ttl=0,
+                shared_cache_ttl=0,
+                cache_pinned=False,
+                index=index,
+            )
+            for name, raw_secret in raw_values:
+                secret_map = decode_secret(name=name, raw_secret=raw_secret)
+                self._cache.put((region_name, names[name]), secret_map)
+                values[names[name]] = secret_map
+
+        return merge_secret_values(values[reference] for reference in references)
+
+    def get_environment(
+        self,
+        *,
+        secret_ids: Iterable[str],
+        environment_mappings: Dict[str, str],
+        region_name: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """Load secrets and map their keys to environment variable names.
+
+        :param list secret_ids: Secret IDs to load, optionally pinned to a version
+        :param dict environment_mappings: Mapping from secret keys to environment variable names
+        :param str region_name: AWS region (default: the helper's region)
+        :returns: Mapping from environment variable names to secret values
+        :rtype: dict
+        :raises MappingError: if any loaded key has no environment variable mapping
+        """
+        return _map_environment(
+            environment_mappings=environment_mappings,
+            secret_values=self.get_secret_values(secret_ids=secret_ids, region_name=region_name),
+        )
+
+    async def get_secret_values_async(
+        self, *, secret_ids: Iterable[str], region_name: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Dict[str, str]:
+        """Load and merge JSON-encoded secret values without blocking the event loop.
+
+        Secrets are retrieved concurrently in the event loop's default executor
+        and share the cache with :meth:`get_secret_values`.
+        If the call is cancelled or times out, retrievals that have already started still complete
+        and their values are cached.
+
+        :param list secret_ids: Secret IDs to load, optionally pinned to a version
+        :param str region_name: AWS region (default: the helper's region)
+        :param float timeout: Seconds to wait for all secrets (default: no limit)
+        :returns: Mapping of secret keys to values
+        :rtype: dict
+        :raises asyncio.TimeoutError: if the secrets are not loaded within ``timeout`` seconds
+        :raises SecretRetrievalError: if any secret cannot be retrieved
+        :raises SecretFormatError: if any secret is not JSON formatted or any key is loaded more than once
+        """
+        return await asyncio.wait_for(
+            self._get_secret_values_async(secret_ids=list(secret_ids), region_name=region_name), timeout
+        )
+
+    async def _get_secret_values_async(self, *, secret_ids: List[str], region_name: Optional[str]) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        region_name = region_name if region_name is not None else self.region_name
+
+        # Resolving overlapping identifiers and creating the client can call AWS, so do not run them in the loop.
+        client, index, references, values = await loop.run_in_executor(
+            None, functools.partial(self._cached_values, secret_ids=secret_ids, region_name=region_name)
+        )
+        missing = [(reference, name) for reference, name in references.items() if reference not in values]
+
+        loaded = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        self._load_secret,
+                        client=client,
+                        index=index,
+                        region_name=region_name,
+                        reference=reference,
+                        name=name,
+                    ),
+                )
+                for reference, name in missing
+            )
+        )
+        values.update(zip((reference for reference, _ in missing), loaded))
+
+        return merge_secret_values(values[reference] for reference in references)
+
+    async def get_environment_async(
+        self,
+        *,
+        secret_ids: Iterable[str],
+        environment_mappings: Dict[str, str],
+        region_name: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """Load secrets without blocking the event loop and map their keys to environment variable names.
+
+        :param list secret_ids: Secret IDs to load, optionally pinned to a version
+        :param dict environment_mappings: Mapping from secret keys to environment variable names
+        :param str region_name: AWS region (default: the helper's region)
+        :param float timeout: Seconds to wait for all secrets (default: no limit)
+        :returns: Mapping from environment variable names to secret values
+        :rtype: dict
+        :raises MappingError: if any loaded key has no environment variable mapping
+        """
+        secret_values = await self.get_secret_values_async(
+            secret_ids=secret_ids, region_name=region_name, timeout=timeout
+        )
+        return _map_environment(environment_mappings=environment_mappings, secret_values=secret_values)
+
+    def clear_cache(self):
+        """Drop every cached secret value so that the next lookups load current values."""
+        self._cache.clear()
@@ -11,12 +11,37 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """Unique identifiers used by secrets-helper."""
-__all__ = ("__version__", "CONFIG_SETTINGS_GROUP", "CONFIG_ENV_GROUP", "KNOWN_CONFIGS")
+__all__ = (
+    "__version__",
+    "CONFIG_SETTINGS_GROUP",
+    "CONFIG_ENV_GROUP",
+    "KNOWN_CONFIGS",
+    "CACHE_DIR_ENV",
+    "CACHE_KEY_ENV",
+    "BACKEND_ENV",
+    "BACKEND_OPTIONS_ENV",
+    "METRICS_FILE_ENV",
+    "TRACE_FILE_ENV",
+    "BUNDLE_ENV",
+    "BUNDLE_KEY_ENV",
+    "PROFILE_PATH_ENV",
+    "SPAWN_ENGINE_ENV",
+)
 __version__ = "0.1.0"
 
 CONFIG_NAME = "secrets-helper"
 CONFIG_SETTINGS_GROUP = f"{CONFIG_NAME}.settings"
 CONFIG_ENV_GROUP = f"{CONFIG_NAME}.env"
+CACHE_DIR_ENV = "SECRETS_HELPER_CACHE_DIR"
+CACHE_KEY_ENV = "SECRETS_HELPER_CACHE_KEY"
+BACKEND_ENV = "SECRETS_HELPER_BACKEND"
+BACKEND_OPTIONS_ENV = "SECRETS_HELPER_BACKEND_OPTIONS"
+METRICS_FILE_ENV = "SECRETS_HELPER_METRICS_FILE"
+TRACE_FILE_ENV = "SECRETS_HELPER_TRACE_FILE"
+BUNDLE_ENV = "SECRETS_HELPER_BUNDLE"
+BUNDLE_KEY_ENV = "SECRETS_HELPER_BUNDLE_KEY"
+PROFILE_PATH_ENV = "SECRETS_HELPER_PROFILE_PATH"
+SPAWN_ENGINE_ENV = "SECRETS_HELPER_SPAWN_ENGINE"
 KNOWN_CONFIGS = dict(
     twine=dict(username="TWINE_USERNAME", password="TWINE_PASSWORD", url="TWINE_REPOSITORY_URL")  # nosec
 )
@@ -0,0 +1,196 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Registry of command profiles.
+
+A profile maps secret keys to the environment variables that a command expects.
+Profiles are found, in order of precedence:
+
+* in ``NAME.config`` files in the directories listed in ``SECRETS_HELPER_PROFILE_PATH``
+  and in the ``secrets-helper/profiles`` user config directory
+* among the built-in profiles
+* as ``secrets_helper.profiles`` entry points that refer to a mapping
+
+Only the requested profile is loaded.
+Scanning installed distributions for entry points is slow,
+so the entry points that were found are cached until a ``sys.path`` directory changes.
+"""
+import configparser
+import contextlib
+import importlib
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from ._util.cache import cache_dir, read_cached_json, write_cached_json
+from ._util.entry_points import find_entry_points
+from .exceptions import ConfigurationError
+from .identifiers import CONFIG_ENV_GROUP, CONFIG_NAME, KNOWN_CONFIGS, PROFILE_PATH_ENV
+
+__all__ = ("PROFILE_ENTRY_POINT_GROUP", "load_profile", "profile_dirs", "profile_names")
+PROFILE_ENTRY_POINT_GROUP = "secrets_helper.profiles"
+_PROFILE_SUFFIX = ".config"
+_PROFILE_NAME = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+_INDEX_FILE = "profile-index.json"
+
+
+def profile_dirs() -> List[Path]:
+    """List the directories that profile files are found in, in order of precedence.
+
+    :returns: Profile directories
+    :rtype: list
+    """
+    directories = [Path(each) for each in os.environ.get(PROFILE_PATH_ENV, "").split(os.pathsep) if each]
+    base = os.environ.get("XDG_CONFIG_HOME", str(Path.home() / ".config"))
+    directories.append(Path(base) / CONFIG_NAME / "profiles")
+    return directories
+
+
+def _load_profile_file(path: Path) -> Dict[str, str]:
+    """Load the environment mappings from a profile file.
+
+    :param Path path: Profile file
+    :returns: Environment mappings
+    :rtype: dict
+    :raises ConfigurationError: if the file is not a valid profile
+    """
+    parser = configparser.ConfigParser()
+    try:
+        with path.open() as profile_file:
+            parser.read_file(profile_file)
+    except (OSError, configparser.Error) as error:
+        raise ConfigurationError(f'Unable to load profile "{path}": {error}')
+
+    if not parser.has_section(CONFIG_ENV_GROUP):
+        raise ConfigurationError(f'Profile "{path}" has no [{CONFIG_ENV_GROUP}] section')
+    return dict(parser[CONFIG_ENV_GROUP])
+
+
+def _entry_points() -> Dict:
+    """Find all profiles registered as entry points. This scans every installed distribution."""
+    return find_entry_points(PROFILE_ENTRY_POINT_GROUP)
+
+
+def _fingerprint() -> List[List]:
+    """Identify the state of ``sys.path``.
+
+    Installing or removing a distribution changes the modification time of the directory it is installed in.
+    """
+    stamps = []
+    for entry in sys.path:
+        try:
+            stamps.append([entry, os.stat(entry or ".").st_mtime_ns])
+        except OSError:
+            continue
+    return stamps
+
+
+def _index_file() -> Optional[Path]:
+    """Locate the entry point index file.
+
+    :returns: Index file or ``None`` if the cache directory is not usable
+    """
+    try:
+        return cache_dir() / _INDEX_FILE
+    except OSError:
+        return None
+
+
+def _entry_point_index() -> Dict[str, str]:
+    """Map the name of each profile entry point to the object it refers to, scanning only if ``sys.path`` changed.
+
+    :returns: Mapping from profile names to ``module:attribute`` references
+    :rtype: dict
+    """
+    path = _index_file()
+    fingerprint = _fingerprint()
+    cached = read_cached_json(path=path) if path is not None else None
+    if isinstance(cached, dict) and cached.get("fingerprint") == fingerprint:
+        return cached["profiles"]
+
+    profiles = {name: entry_point.value for name, entry_point in _entry_points().items()}
+    if path is not None:
+        with contextlib.suppress(OSError):
+            write_cached_json(path=path, value=dict(fingerprint=fingerprint, profiles=profiles), ttl=None)
+    return profiles
+
+
+def _load_entry_point(*, name: str, reference: str) -> Dict[str, str]:
+    """Import the mapping that a profile entry point refers to.
+
+    :param str name: Profile name
+    :param str reference: ``module:attribute`` reference
+    :returns: Environment mappings
+    :rtype: dict
+    :raises ConfigurationError: if the reference cannot be imported or is not a mapping of strings
+    """
+    module_name, _, attribute = reference.partition(":")
+    try:
+        target = importlib.import_module(module_name.strip())
+        for part in attribute.strip().split("."):
+            target = getattr(target, part)
+    except (ImportError, AttributeError) as error:
+        raise ConfigurationError(f'Unable to load profile "{name}" from "{reference}": {error}')
+
+    if not isinstance(target, Mapping) or not all(
+        isinstance(key, str) and isinstance(value, str) for key, value in target.items()
+    ):
+        raise ConfigurationError(f'Profile "{name}" is not a mapping of keys to environment variables')
+    return dict(target)
+
+
+def load_profile(name: str) -> Dict[str, str]:
+    """Load the environment mappings of a profile.
+
+    Built-in profiles and profile files are found without scanning entry points.
+
+    :param str name: Profile name
+    :returns: Environment mappings
+    :rtype: dict
+    :raises ConfigurationError: if the profile is unknown or cannot be loaded
+    """
+    if _PROFILE_NAME.fullmatch(name) is None:
+        raise ConfigurationError(f'Unknown profile "{name}"')
+
+    for directory in profile_dirs():
+        path = directory / f"{name}{_PROFILE_SUFFIX}"
+        if path.is_file():
+            return _load_profile_file(path)
+
+    try:
+        return dict(KNOWN_CONFIGS[name])
+    except KeyError:
+        pass
+
+    reference = _entry_point_index().get(name)
+    if reference is None:
+        raise ConfigurationError(f'Unknown profile "{name}"')
+    return _load_entry_point(name=name, reference=reference)
+
+
+def profile_names() -> List[str]:
+    """List the names of all available profiles.
+
+    :returns: Profile names
+    :rtype: list
+    """
+    names = set(KNOWN_CONFIGS) | set(_entry_point_index())
+    for directory in profile_dirs():
+        if directory.is_dir():
+            names.update(
+                path.stem
+                for path in directory.glob(f"*{_PROFILE_SUFFIX}")
+                if _PROFILE_NAME.fullmatch(path.stem) and path.is_file()
+            )
+    return sorted(names)
@@ -0,0 +1,151 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Phase timing instrumentation.
+
+Register a hook to receive a :class:`Timing` for every phase that secrets-helper measures.
+When no hook is registered, phases are not measured.
+"""
+import contextlib
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+__all__ = ("IMPORT_STARTED", "Timing", "TimingRecorder", "event", "register_hook", "unregister_hook", "timed")
+IMPORT_STARTED = time.perf_counter()
+_HOOKS: List[Callable[["Timing"], None]] = []
+
+
+@dataclass
+class Timing:
+    """Measurement of a single phase.
+
+    :param str phase: Phase name
+    :param float start: Seconds since secrets-helper was imported when the phase started
+    :param float duration: Seconds that the phase took
+    :param str detail: Additional identifying detail, such as the secret ID
+    :param str error: Error code or exception type if the phase failed
+    """
+
+    phase: str
+    start: float
+    duration: float
+    detail: Optional[str] = None
+    error: Optional[str] = None
+
+
+def register_hook(hook: Callable[[Timing], None]):
+    """Register a callable to receive every phase timing.
+
+    Hooks can be called from multiple threads.
+
+    :param hook: Callable accepting a :class:`Timing`
+    """
+    _HOOKS.append(hook)
+
+
+def unregister_hook(hook: Callable[[Timing], None]):
+    """Stop sending phase timings to a registered callable.
+
+    :param hook: Previously registered callable
+    """
+    _HOOKS.remove(hook)
+
+
+def record(timing: Timing):
+    """Send a phase timing to every registered hook.
+
+    :param Timing timing: Phase timing
+    """
+    for hook in list(_HOOKS):
+        hook(timing)
+
+
+def _error_code(error: BaseException) -> str:
+    """Identify an error by its AWS error code if it has one, otherwise by its type."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code:
+            return str(code)
+    return type(error).__name__
+
+
+@contextlib.contextmanager
+def timed(phase: str, detail: Optional[str] = None) -> Iterator[None]:
+    """Measure a phase.
+
+    :param str phase: Phase name
+    :param str detail: Additional identifying detail
+    """
+    if not _HOOKS:
+        yield
+        return
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as caught:
+        error = _error_code(caught)
+        raise
+    finally:
+        end = time.perf_counter()
+        record(Timing(phase=phase, start=start - IMPORT_STARTED, duration=end - start, detail=detail, error=error))
+
+
+def event(phase: str, detail: Optional[str] = None):
+    """Record something that happened instantly, such as a cache hit, as a phase that took no time.
+
+    :param str phase: Phase name
+    :param str detail: Additional identifying detail
+    """
+    if _HOOKS:
+        record(Timing(phase=phase, start=time.perf_counter() - IMPORT_STARTED, duration=0.0, detail=detail))
+
+
+class TimingRecorder:
+    """Hook that collects every phase timing in memory."""
+
+    def __init__(self):
+        """Set up an empty recorder."""
+        self.timings: List[Timing] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, timing: Timing):
+        """Collect a phase timing."""
+        with self._lock:
+            self.timings.append(timing)
+
+    def as_json(self) -> List[Dict]:
+        """Build a JSON-serializable description of all collected timings.
+
+        :returns: Collected timings
+        :rtype: list
+        """
+        return [asdict(timing) for timing in self.timings]
+
+    def summary(self) -> str:
+        """Build a human-readable summary of all collected timings.
+
+        :returns: Summary
+        :rtype: str
+        """
+        lines = ["secrets-helper timings:"]
+        for timing in sorted(self.timings, key=lambda each: each.start):
+            detail = "" if timing.detail is None else f"  {timing.detail}"
+            lines.append(f"  {timing.phase:<20} {timing.duration * 1000:10.2f} ms{detail}")
+        if self.timings:
+            total = max(each.start + each.duration for each in self.timings)
+            lines.append(f"  {'total':<20} {total * 1000:10.2f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,274 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Trace spans for secrets-helper phases, propagated with W3C trace context.
+
+A :class:`Tracer` is a timing hook that turns every measured phase into a span
+under a root span for the whole invocation.
+The root span continues the trace in ``TRACEPARENT``, if there is one,
+and child processes receive a ``TRACEPARENT`` that continues the trace from the root span,
+along with the ``TRACESTATE`` that the trace was received with.
+Finished spans are passed to an exporter, such as :class:`OtlpJsonFile`.
+"""
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .identifiers import __version__
+from .timings import IMPORT_STARTED, Timing
+
+__all__ = (
+    "TRACEPARENT_ENV",
+    "TRACESTATE_ENV",
+    "OtlpJsonFile",
+    "Span",
+    "TraceContext",
+    "Tracer",
+    "child_environment",
+)
+TRACEPARENT_ENV = "TRACEPARENT"
+TRACESTATE_ENV = "TRACESTATE"
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?$")
+_API_PHASES = frozenset(("get_secret_value", "get_parameters", "get_parameters_by_path"))
+# OTLP span kinds and status codes
+_KIND_INTERNAL = 1
+_KIND_CLIENT = 3
+_STATUS_ERROR = 2
+_TRACERS: List["Tracer"] = []
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    """W3C trace context.
+
+    :param str trace_id: 32 hex digit trace ID
+    :param str span_id: 16 hex digit ID of the parent span
+    :param int flags: Trace flags, where bit 0 means sampled
+    :param str state: ``tracestate`` header to pass on unchanged, if any
+    """
+
+    trace_id: str
+    span_id: str
+    flags: int = 1
+    state: str = ""
+
+    @property
+    def sampled(self) -> bool:
+        """Determine whether the trace is being recorded."""
+        return bool(self.flags & 1)
+
+    @classmethod
+    def parse(cls, traceparent: Optional[str], tracestate: Optional[str] = None) -> Optional["TraceContext"]:
+        """Parse ``traceparent`` and ``tracestate`` headers.
+
+        :param str traceparent: ``traceparent`` header value
+        :param str tracestate: ``tracestate`` header value
+        :returns: Trace context, or ``None`` if the ``traceparent`` header is missing or invalid
+        """
+        header = (traceparent or "").strip()
+        match = _TRACEPARENT.match(header)
+        if match is None:
+            return None
+        version, trace_id, span_id, flags = match.groups()
+        if version == "ff" or (version == "00" and len(header) != 55):
+            return None
+        if trace_id == "0" * 32 or span_id == "0" * 16:
+            return None
+        return cls(trace_id=trace_id, span_id=span_id, flags=int(flags, 16), state=(tracestate or "").strip())
+
+    def traceparent(self) -> str:
+        """Build a version 00 ``traceparent`` header."""
+        return f"00-{self.trace_id}-{self.span_id}-{self.flags:02x}"
+
+
+def _random_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+@dataclass
+class Span:
+    """A finished span.
+
+    :param str name: Span name
+    :param str trace_id: 32 hex digit trace ID
+    :param str span_id: 16 hex digit span ID
+    :param str parent_span_id: 16 hex digit ID of the parent span, if any
+    :param int start_time: Start time in nanoseconds since the epoch
+    :param int end_time: End time in nanoseconds since the epoch
+    :param dict attributes: Span attributes
+    :param str error: Error code or exception type if the span failed
+    :param bool client: Whether the span is a call to a remote service
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time: int
+    end_time: int
+    attributes: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    client: bool = False
+
+    def as_otlp(self) -> Dict:
+        """Build the OTLP/JSON representation of this span.
+
+        :rtype: dict
+        """
+        otlp = dict(
+            traceId=self.trace_id,
+            spanId=self.span_id,
+            name=self.name,
+            kind=_KIND_CLIENT if self.client else _KIND_INTERNAL,
+            startTimeUnixNano=str(self.start_time),
+            endTimeUnixNano=str(self.end_time),
+            attributes=[dict(key=key, value=dict(stringValue=value)) for key, value in self.attributes.items()],
+        )
+        if self.parent_span_id is not None:
+            otlp["parentSpanId"] = self.parent_span_id
+        if self.error is not None:
+            otlp["status"] = dict(code=_STATUS_ERROR, message=self.error)
+        return otlp
+
+
+class Tracer:
+    """Timing hook that records every phase as a span of one invocation.
+
+    Register the tracer with :func:`secrets_helper.timings.register_hook`
+    and call :meth:`finish` when the invocation is done.
+    Until the tracer finishes, :func:`child_environment` continues its trace.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        exporter: Callable[[List[Span]], None],
+        parent: Optional[TraceContext] = None,
+        attributes: Optional[Dict[str, str]] = None,
+    ):
+        """Start the root span.
+
+        :param str name: Root span name
+        :param exporter: Called with every span when the tracer finishes, unless the trace is not sampled
+        :param TraceContext parent: Trace to continue (default: start a new trace)
+        :param dict attributes: Root span attributes
+        """
+        self._name = name
+        self._exporter = exporter
+        self._attributes = dict(attributes or {})
+        self._parent_span_id = parent.span_id if parent is not None else None
+        self.context = TraceContext(
+            trace_id=parent.trace_id if parent is not None else _random_id(16),
+            span_id=_random_id(8),
+            flags=parent.flags if parent is not None else 1,
+            state=parent.state if parent is not None else "",
+        )
+        # Timings are measured against the import time, so anchor that to the wall clock once.
+        self._epoch = time.time_ns() - int((time.perf_counter() - IMPORT_STARTED) * 1e9)
+        self._start = time.time_ns()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        _TRACERS.append(self)
+
+    def __call__(self, timing: Timing):
+        """Record a phase timing as a span."""
+        start = self._epoch + int(timing.start * 1e9)
+        attributes = {} if timing.detail is None else {"secrets_helper.detail": timing.detail}
+        span = Span(
+            name=timing.phase,
+            trace_id=self.context.trace_id,
+            span_id=_random_id(8),
+            parent_span_id=self.context.span_id,
+            start_time=start,
+            end_time=start + int(timing.duration * 1e9),
+            attributes=attributes,
+            error=timing.error,
+            client=timing.phase in _API_PHASES,
+        )
+        with self._lock:
+            self._spans.append(span)
+
+    def finish(self):
+        """End the root span and export every span."""
+        if self in _TRACERS:
+            _TRACERS.remove(self)
+        root = Span(
+            name=self._name,
+            trace_id=self.context.trace_id,
+            span_id=self.context.span_id,
+            parent_span_id=self._parent_span_id,
+            start_time=self._start,
+            end_time=time.time_ns(),
+            attributes=self._attributes,
+        )
+        with self._lock:
+            spans = [root] + self._spans
+            self._spans = []
+        if self.context.sampled:
+            self._exporter(spans)
+
+
+def child_environment() -> Dict[str, str]:
+    """Build the trace context environment variables for a child process.
+
+    :returns: ``TRACEPARENT`` continuing the trace of the active tracer and its ``TRACESTATE``, if any,
+        or nothing if no tracer is active
+    :rtype: dict
+    """
+    if not _TRACERS:
+        return {}
+    context = _TRACERS[-1].context
+    environment = {TRACEPARENT_ENV: context.traceparent()}
+    if context.state:
+        environment[TRACESTATE_ENV] = context.state
+    return environment
+
+
+class OtlpJsonFile:
+    """Exporter that appends the spans of each invocation to a file as one line of OTLP/JSON.
+
+    This is the format of the OpenTelemetry Collector file exporter and ``otlpjsonfile`` receiver.
+    """
+
+    def __init__(self, path: str):
+        """Set up the exporter.
+
+        :param str path: File to append to
+        """
+        self.path = path
+
+    def __call__(self, spans: List[Span]):
+        """Append spans to the file in a single write."""
+        request = dict(
+            resourceSpans=[
+                dict(
+                    resource=dict(attributes=[dict(key="service.name", value=dict(stringValue="secrets-helper"))]),
+                    scopeSpans=[
+                        dict(
+                            scope=dict(name="secrets_helper", version=__version__),
+                            spans=[span.as_otlp() for span in spans],
+                        )
+                    ],
+                )
+            ]
+        )
+        line = (json.dumps(request, separators=(",", ":")) + "\n").encode("utf-8")
+        handle = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(handle, line)
+        finally:
+            os.close(handle)
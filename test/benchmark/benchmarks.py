@@ -0,0 +1,321 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Benchmarks for secrets-helper hot paths.
+
+Run all benchmarks and compare them with a saved baseline:
+
+.. code-block:: shell
+
+    $ python test/benchmark/benchmarks.py --output results.json
+    $ python test/benchmark/benchmarks.py --baseline results.json
+
+Secrets Manager is replaced by moto, so no network access or credentials are needed,
+but retrieval benchmarks include moto's own overhead.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import boto3
+from moto import mock_secretsmanager
+
+from secrets_helper import __version__
+from secrets_helper._util.config import _merge_key_ids, _merge_mappings
+from secrets_helper._util.execute import SpawnTemplate, _inject_environment_variables, prepare_command, run_command
+from secrets_helper._util.secrets import load_secrets
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+FAKE_REGION = "us-west-2"
+DEFAULT_THRESHOLD = 0.25
+_CLI = "from secrets_helper._commands import cli; cli()"
+# Each benchmark maps a parameter set to a callable that sets up a context
+# and returns the operation to time inside that context.
+Benchmark = Callable[[ExitStack, Dict[str, int]], Callable[[], object]]
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing results for one benchmark with one parameter set."""
+
+    name: str
+    params: Dict[str, int]
+    runs: int
+    minimum: float
+    median: float
+    mean: float
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.name, json.dumps(self.params, sort_keys=True)
+
+
+def _load_secrets(stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+    stack.enter_context(mock_secretsmanager())
+    client = boto3.client("secretsmanager", region_name=FAKE_REGION)
+    secret_ids = []
+    for secret in range(params["secrets"]):
+        value = {f"s{secret}-k{key}": f"value-{key}" for key in range(params["keys"])}
+        secret_ids.append(client.create_secret(Name=f"secret-{secret}", SecretString=json.dumps(value))["ARN"])
+    return lambda: load_secrets(secret_ids=secret_ids)
+
+
+def _merge_key_ids_at_scale(_stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+    config_list = [f"secret-{each}" for each in range(params["ids"])]
+    user_input_list = [f"secret-{each}" for each in range(0, params["ids"], 2)]
+    return lambda: _merge_key_ids(config_list=config_list, user_input_list=user_input_list)
+
+
+def _merge_mappings_at_scale(_stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+    config_mapping = {f"config-{each}": f"CONFIG_{each}" for each in range(params["mappings"])}
+    profile_mapping = {f"profile-{each}": f"PROFILE_{each}" for each in range(params["mappings"])}
+    return lambda: _merge_mappings(config_mapping=config_mapping, profile_mapping=profile_mapping)
+
+
+def _inject_long_command(_stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+    environment_variables = {f"VAR_{each}": f"value-{each}" for each in range(params["tags"])}
+    command = " ".join(f"--arg-{each} {{env:VAR_{each}}}" for each in range(params["tags"]))
+    return lambda: _inject_environment_variables(command_string=command, environment_variables=environment_variables)
+
+
+def _spawn_command() -> str:
+    true = shutil.which("true")
+    return true if true is not None else f"{sys.executable} -c pass"
+
+
+def _spawn_benchmark(engine: str) -> Benchmark:
+    """Benchmark spawning a command with an engine, optionally from a parent with a large resident set."""
+
+    def _benchmark(stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+        command = _spawn_command()
+        extra_env_vars = {f"SECRET_{each}": f"value-{each}" for each in range(params["env_vars"])}
+        # Touch every page so that the memory is resident, as it is in a long-running batch parent.
+        ballast = bytearray(b"x" * (params.get("rss_mb", 0) * 1024 * 1024))
+        stack.callback(ballast.clear)
+
+        if engine == "template":
+            command_args, env = prepare_command(raw_command=command, extra_env_vars=extra_env_vars)
+            template = SpawnTemplate(command_args=command_args, env=env)
+
+            def _spawn():
+                for _ in range(params["spawns"]):
+                    template.run()
+
+        else:
+
+            def _spawn():
+                for _ in range(params["spawns"]):
+                    run_command(raw_command=command, extra_env_vars=extra_env_vars, engine=engine)
+
+        return _spawn
+
+    return _benchmark
+
+
+def _cli_cold_start(_stack: ExitStack, _params: Dict[str, int]) -> Callable[[], object]:
+    command = [sys.executable, "-c", _CLI, "--version"]
+    return lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True)  # nosec
+
+
+def _cli_replay(stack: ExitStack, params: Dict[str, int]) -> Callable[[], object]:
+    workdir = stack.enter_context(tempfile.TemporaryDirectory())
+    cassette = os.path.join(workdir, "benchmark.cassette")
+    config = os.path.join(workdir, "benchmark.config")
+    secret_ids = [f"secret-{secret}" for secret in range(params["secrets"])]
+
+    with mock_secretsmanager():
+        client = boto3.client("secretsmanager", region_name=FAKE_REGION)
+        for secret, secret_id in enumerate(secret_ids):
+            client.create_secret(Name=secret_id, SecretString=json.dumps({f"key{secret}": f"value-{secret}"}))
+        load_secrets(secret_ids=secret_ids, record=cassette)
+
+    with open(config, "w") as config_file:
+        config_file.write("[secrets-helper.settings]\nsecrets:\n")
+        config_file.write("".join(f"    {secret_id}\n" for secret_id in secret_ids))
+        config_file.write("[secrets-helper.env]\n")
+        config_file.write("".join(f"key{secret}: VAR_{secret}\n" for secret in range(params["secrets"])))
+
+    command = [sys.executable, "-c", _CLI, "env", "--config", config, "--replay", cassette]
+    return lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True)  # nosec
+
+
+FULL_BENCHMARKS: Dict[str, Tuple[Benchmark, List[Dict[str, int]]]] = dict(
+    load_secrets=(
+        _load_secrets,
+        [
+            dict(secrets=1, keys=1),
+            dict(secrets=1, keys=5000),
+            dict(secrets=50, keys=50),
+            dict(secrets=50, keys=5000),
+            dict(secrets=500, keys=1),
+            dict(secrets=500, keys=50),
+        ],
+    ),
+    merge_key_ids=(_merge_key_ids_at_scale, [dict(ids=10), dict(ids=1000), dict(ids=10000)]),
+    merge_mappings=(_merge_mappings_at_scale, [dict(mappings=10), dict(mappings=1000), dict(mappings=5000)]),
+    inject_environment_variables=(_inject_long_command, [dict(tags=10), dict(tags=1000), dict(tags=5000)]),
+    run_command=(
+        _spawn_benchmark("subprocess"),
+        [dict(spawns=10, env_vars=10), dict(spawns=10, env_vars=1000), dict(spawns=200, env_vars=10, rss_mb=1024)],
+    ),
+    run_command_posix_spawn=(
+        _spawn_benchmark("posix_spawn"),
+        [dict(spawns=10, env_vars=10), dict(spawns=10, env_vars=1000), dict(spawns=200, env_vars=10, rss_mb=1024)],
+    ),
+    spawn_template=(
+        _spawn_benchmark("template"),
+        [dict(spawns=200, env_vars=10), dict(spawns=200, env_vars=10, rss_mb=1024)],
+    ),
+    cli_cold_start=(_cli_cold_start, [dict()]),
+    cli_replay=(_cli_replay, [dict(secrets=1), dict(secrets=50)]),
+)
+QUICK_BENCHMARKS: Dict[str, Tuple[Benchmark, List[Dict[str, int]]]] = dict(
+    load_secrets=(_load_secrets, [dict(secrets=2, keys=2)]),
+    merge_key_ids=(_merge_key_ids_at_scale, [dict(ids=10)]),
+    merge_mappings=(_merge_mappings_at_scale, [dict(mappings=10)]),
+    inject_environment_variables=(_inject_long_command, [dict(tags=10)]),
+    run_command=(_spawn_benchmark("subprocess"), [dict(spawns=1, env_vars=1)]),
+    run_command_posix_spawn=(_spawn_benchmark("posix_spawn"), [dict(spawns=1, env_vars=1)]),
+    spawn_template=(_spawn_benchmark("template"), [dict(spawns=1, env_vars=1)]),
+    cli_cold_start=(_cli_cold_start, [dict()]),
+    cli_replay=(_cli_replay, [dict(secrets=2)]),
+)
+
+
+def _time(operation: Callable[[], object], *, repeat: int) -> List[float]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run_benchmarks(
+    *, benchmarks: Dict[str, Tuple[Benchmark, List[Dict[str, int]]]], repeat: int, only: Optional[List[str]] = None
+) -> Iterator[BenchmarkResult]:
+    """Run benchmarks in an isolated cache directory and region."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        environment = {CACHE_DIR_ENV: cache_dir, "AWS_DEFAULT_REGION": FAKE_REGION}
+        original = {name: os.environ.get(name) for name in environment}
+        os.environ.update(environment)
+        try:
+            for name, (benchmark, param_sets) in benchmarks.items():
+                if only and name not in only:
+                    continue
+                for params in param_sets:
+                    with ExitStack() as stack:
+                        operation = benchmark(stack, params)
+                        # Warm up once so that one-time imports and caches do not skew the results.
+                        operation()
+                        durations = _time(operation, repeat=repeat)
+                    yield BenchmarkResult(
+                        name=name,
+                        params=params,
+                        runs=repeat,
+                        minimum=min(durations),
+                        median=statistics.median(durations),
+                        mean=statistics.mean(durations),
+                    )
+        finally:
+            for key, value in original.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def to_json(results: List[BenchmarkResult]) -> Dict:
+    """Build the machine-readable form of benchmark results."""
+    return dict(
+        secrets_helper_version=__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results=[asdict(result) for result in results],
+    )
+
+
+def compare(
+    *, results: List[BenchmarkResult], baseline: Dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[Tuple[BenchmarkResult, float]]:
+    """Find every result whose median is more than ``threshold`` slower than the baseline median.
+
+    :returns: Each regressed result with its baseline median
+    """
+    baseline_medians = {
+        (each["name"], json.dumps(each["params"], sort_keys=True)): each["median"] for each in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        baseline_median = baseline_medians.get(result.key)
+        if baseline_median is not None and result.median > baseline_median * (1 + threshold):
+            regressions.append((result, baseline_median))
+    return regressions
+
+
+def _format(result: BenchmarkResult) -> str:
+    params = ", ".join(f"{key}={value}" for key, value in result.params.items())
+    return f"{result.name}({params})"
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Run benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark secrets-helper hot paths.")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Compare results with JSON results from a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fractional slowdown of the median that counts as a regression",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Run small parameter sets only")
+    parser.add_argument("--only", action="append", help="Only run the named benchmark (can be repeated)")
+    parsed = parser.parse_args(args)
+
+    benchmarks = QUICK_BENCHMARKS if parsed.quick else FULL_BENCHMARKS
+    results = []
+    for result in run_benchmarks(benchmarks=benchmarks, repeat=parsed.repeat, only=parsed.only):
+        results.append(result)
+        print(f"{_format(result):<60} median {result.median * 1000:10.3f} ms")  # noqa: T001
+
+    if parsed.output:
+        with open(parsed.output, "w") as output:
+            json.dump(to_json(results), output, indent=2)
+
+    if not parsed.baseline:
+        return 0
+
+    with open(parsed.baseline) as baseline_file:
+        regressions = compare(results=results, baseline=json.load(baseline_file), threshold=parsed.threshold)
+
+    for result, baseline_median in regressions:
+        print(  # noqa: T001
+            f"REGRESSION {_format(result)}: median {result.median * 1000:.3f} ms "
+            f"vs baseline {baseline_median * 1000:.3f} ms"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Smoke tests for the benchmark suite."""
+import json
+
+import pytest
+
+from .benchmarks import QUICK_BENCHMARKS, BenchmarkResult, compare, main, run_benchmarks, to_json
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.local]
+
+
+def _result(median: float) -> BenchmarkResult:
+    return BenchmarkResult(name="a", params=dict(b=1), runs=1, minimum=median, median=median, mean=median)
+
+
+def test_run_benchmarks():
+    results = list(run_benchmarks(benchmarks=QUICK_BENCHMARKS, repeat=1))
+
+    assert [result.name for result in results] == list(QUICK_BENCHMARKS.keys())
+    assert all(result.median >= 0 for result in results)
+    assert json.loads(json.dumps(to_json(results)))["results"][0]["name"] == "load_secrets"
+
+
+@pytest.mark.parametrize(
+    "median, baseline_median, expected",
+    (
+        pytest.param(1.0, 1.0, False, id="unchanged"),
+        pytest.param(1.2, 1.0, False, id="within threshold"),
+        pytest.param(1.3, 1.0, True, id="regression"),
+        pytest.param(0.5, 1.0, False, id="improvement"),
+    ),
+)
+def test_compare(median, baseline_median, expected):
+    baseline = to_json([_result(baseline_median)])
+
+    regressions = compare(results=[_result(median)], baseline=baseline, threshold=0.25)
+
+    assert bool(regressions) is expected
+
+
+def test_compare_ignores_new_benchmarks():
+    assert compare(results=[_result(1.0)], baseline=dict(results=[])) == []
+
+
+def test_main_with_baseline(tmp_path, capsys):
+    output = tmp_path / "results.json"
+
+    assert main(["--quick", "--repeat", "1", "--only", "merge_key_ids", "--output", str(output)]) == 0
+
+    baseline = json.loads(output.read_text())
+    assert [each["name"] for each in baseline["results"]] == ["merge_key_ids"]
+
+    baseline["results"][0]["median"] = 0.0
+    output.write_text(json.dumps(baseline))
+
+    assert main(["--quick", "--repeat", "1", "--only", "merge_key_ids", "--baseline", str(output)]) == 1
+    assert "REGRESSION merge_key_ids(ids=10)" in capsys.readouterr().out
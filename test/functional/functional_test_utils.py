@@ -17,9 +17,11 @@ from pathlib import Path
 
 import boto3
 import pytest
-from moto import mock_secretsmanager
+from moto import mock_secretsmanager, mock_ssm, mock_sts
 
 from secrets_helper._commands import cli
+from secrets_helper._util.identity import SECRET_ID_INDEX
+from secrets_helper.identifiers import CACHE_DIR_ENV
 
 COMMAND_NAME = "secrets-helper"
 
@@ -33,6 +35,20 @@ FAKE_SECRET_VALUES = {
     "secret-1": {"a": "ONE", "b": "TWO"},
     "secret-2": {"c": "THREE", "d": "FOUR"},
     "twine-secret": {"username": "0cool", "password": "hunter2"},
+    "service/alpha/one": {"e": "FIVE"},
+    "service/alpha/two": {"f": "SIX"},
+}
+FAKE_ACCOUNT_PASSWORDS = {"111111111111": "swordfish", "222222222222": "correct horse"}
+FAKE_PARAMETERS = {
+    "/app/prod/db/host": ("String", "db.example.com"),
+    "/app/prod/db/password": ("SecureString", "s3cret"),
+    "/app/prod/port": ("String", "5432"),
+    "/shared/log-level": ("String", "debug"),
+}
+FAKE_SECRET_TAGS = {
+    "secret-1": {"team": "blue"},
+    "secret-2": {"team": "blue", "stage": "prod"},
+    "twine-secret": {"team": "red"},
 }
 
 
@@ -41,6 +57,11 @@ def fake_region(monkeypatch):
     monkeypatch.setenv("AWS_DEFAULT_REGION", FAKE_REGION)
 
 
+@pytest.fixture(autouse=True)
+def fake_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+
+
 @dataclass
 class ConfigFile:
     placeholder: str
@@ -55,6 +76,8 @@ a=AYE
 b=BEE
 c:CEE
 d:DEE
+e:EE
+f:EFF
 """,
 )
 COMPLEX_CONFIG_FILE = ConfigFile(
@@ -86,13 +109,48 @@ def run_test_command(args):
 
 @pytest.fixture(autouse=True)
 def fake_secrets():
+    SECRET_ID_INDEX.clear()
     with mock_secretsmanager():
         sm = boto3.client("secretsmanager", region_name=FAKE_REGION)
         for name, value in FAKE_SECRET_VALUES.items():
-            sm.create_secret(Name=name, SecretString=json.dumps(value))
+            tags = [dict(Key=key, Value=tag) for key, tag in FAKE_SECRET_TAGS.get(name, {}).items()]
+            sm.create_secret(Name=name, SecretString=json.dumps(value), Tags=tags)
+        yield
+
+
+@pytest.fixture
+def fake_parameters():
+    with mock_ssm():
+        ssm = boto3.client("ssm", region_name=FAKE_REGION)
+        for name, (parameter_type, value) in FAKE_PARAMETERS.items():
+            ssm.put_parameter(Name=name, Type=parameter_type, Value=value)
         yield
 
 
+@pytest.fixture
+def fake_accounts(fake_secrets):
+    """Create ``twine-secret`` with a different password in each of several accounts.
+
+    Yields the role ARN for each account and the password stored in that account.
+    """
+    passwords = {}
+    with mock_sts():
+        sts = boto3.client("sts", region_name=FAKE_REGION)
+        for account, password in FAKE_ACCOUNT_PASSWORDS.items():
+            role_arn = f"arn:aws:iam::{account}:role/secrets-helper"
+            credentials = sts.assume_role(RoleArn=role_arn, RoleSessionName="fixture")["Credentials"]
+            sm = boto3.client(
+                "secretsmanager",
+                region_name=FAKE_REGION,
+                aws_access_key_id=credentials["AccessKeyId"],
+                aws_secret_access_key=credentials["SecretAccessKey"],
+                aws_session_token=credentials["SessionToken"],
+            )
+            sm.create_secret(Name="twine-secret", SecretString=json.dumps(dict(username="0cool", password=password)))
+            passwords[role_arn] = password
+        yield passwords
+
+
 @pytest.fixture
 def config_files(tmpdir):
     files = {}
@@ -11,18 +11,29 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 """Functional tests to ``secrets_helper`` CLI."""
+import json
+import os
 import shlex
+import sys
 
+import boto3
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
 
+import secrets_helper._util.watch
 from secrets_helper import __version__
 
 from .functional_test_utils import config_files  # noqa: F401 pylint: disable=unused-import
+from .functional_test_utils import fake_accounts  # noqa: F401 pylint: disable=unused-import
+from .functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from .functional_test_utils import fake_parameters  # noqa: F401 pylint: disable=unused-import
 from .functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
 from .functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
 from .functional_test_utils import (
     COMMAND_NAME,
     ENV_HELPER,
+    FAKE_REGION,
     SIMPLE_CONFIG_FILE,
     STDERR_HELPER,
     STDOUT_HELPER,
@@ -63,6 +74,37 @@ def test_version(capsys):
             "",
             id="multiple secrets, config mapping",
         ),
+        pytest.param(
+            "env --secret twine-secret --secret arn:aws:secretsmanager:us-west-2:123456789012:secret:twine-secret "
+            "--profile twine",
+            'TWINE_USERNAME="0cool"\nTWINE_PASSWORD="hunter2"\n',
+            "",
+            id="same secret by name and partial ARN",
+        ),
+        pytest.param(
+            f"env --secret-prefix service/alpha/ --secret-tag team=blue --config {SIMPLE_CONFIG_FILE.placeholder}",
+            'EE="FIVE"\nEFF="SIX"\nAYE="ONE"\nBEE="TWO"\nCEE="THREE"\nDEE="FOUR"\n',
+            "",
+            id="secrets selected by prefix and tag",
+        ),
+        pytest.param(
+            "env --secret twine-secret --profile twine --format export",
+            "export TWINE_USERNAME=0cool\nexport TWINE_PASSWORD=hunter2\n",
+            "",
+            id="export format",
+        ),
+        pytest.param(
+            "env --secret twine-secret --profile twine --format json",
+            '{"TWINE_USERNAME": "0cool", "TWINE_PASSWORD": "hunter2"}\n',
+            "",
+            id="JSON format",
+        ),
+        pytest.param(
+            "env --secret twine-secret --profile twine --format nul",
+            "TWINE_USERNAME=0cool\0TWINE_PASSWORD=hunter2\0",
+            "",
+            id="NUL-delimited format",
+        ),
     ),
 )
 def test_env_command_success(capsys, config_files, args, expected_stdout, expected_stderr):
@@ -139,3 +181,467 @@ def test_env_command_fail(capsys, config_files, args, expected_stdout, expected_
     assert exit_code != 0
     assert expected_stdout in captured_output.out
     assert expected_stderr in captured_output.err
+
+
+def test_diagnostics(capsys):
+    exit_code = run_test_command(shlex.split("env --secret 0cool --profile twine"))
+    assert exit_code != 0
+
+    exit_code = run_test_command(["diagnostics"])
+    captured_output = capsys.readouterr()
+
+    assert exit_code == 0
+    assert 'secret "0cool": An error occurred (ResourceNotFoundException)' in captured_output.out
+
+    assert run_test_command(["diagnostics", "--reset"]) == 0
+    assert run_test_command(["diagnostics"]) == 0
+    assert capsys.readouterr().out == ""
+
+
+def test_timings_summary(capsys):
+    exit_code = run_test_command(
+        shlex.split(f"--timings run --command 'python {STDOUT_HELPER} hi' --secret twine-secret --profile twine")
+    )
+
+    captured_output = capsys.readouterr()
+
+    assert exit_code == 0
+    assert "secrets-helper timings:" in captured_output.err
+    for phase in ("import", "load_config", "client", "get_secret_value", "decode", "prep_secrets", "inject", "child"):
+        assert f"  {phase} " in captured_output.err
+
+
+def test_timings_file(capsys, tmp_path):
+    timings_file = tmp_path / "timings.json"
+
+    exit_code = run_test_command(
+        shlex.split(f"--timings-file {timings_file} env --secret twine-secret --profile twine")
+    )
+
+    assert exit_code == 0
+    assert "timings" not in capsys.readouterr().err
+    timings = json.loads(timings_file.read_text())
+    assert [each["detail"] for each in timings if each["phase"] == "get_secret_value"] == ["twine-secret"]
+
+
+def test_profiling(capsys, tmp_path):
+    profile_out = tmp_path / "profile.pstats"
+
+    exit_code = run_test_command(
+        shlex.split(
+            f"--profile-out {profile_out} --memory-profile "
+            f"run --command 'python {STDOUT_HELPER} hi' --secret twine-secret --profile twine"
+        )
+    )
+
+    assert exit_code == 0
+    assert profile_out.stat().st_size > 0
+    assert "secrets-helper top 20 allocation sites:" in capsys.readouterr().err
+
+
+def test_record_replay(capsys, tmp_path):
+    cassette = tmp_path / "twine.cassette"
+
+    assert run_test_command(shlex.split(f"env --secret twine-secret --profile twine --record {cassette}")) == 0
+    recorded_output = capsys.readouterr().out
+
+    boto3.client("secretsmanager", region_name=FAKE_REGION).put_secret_value(
+        SecretId="twine-secret", SecretString=json.dumps(dict(username="changed", password="changed"))
+    )
+
+    exit_code = run_test_command(shlex.split(f"env --secret twine-secret --profile twine --replay {cassette}"))
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == recorded_output
+    assert "0cool" in recorded_output
+
+
+def test_record_and_replay_exclusive(capsys, tmp_path):
+    cassette = tmp_path / "twine.cassette"
+    cassette.write_bytes(b"")
+
+    exit_code = run_test_command(
+        shlex.split(f"env --secret twine-secret --profile twine --record {cassette} --replay {cassette}")
+    )
+
+    assert exit_code != 0
+    assert "Cannot record and replay at the same time" in capsys.readouterr().err
+
+
+def test_watch_once(capsys, tmp_path):
+    env_file = tmp_path / "twine.env"
+    secrets_dir = tmp_path / "secrets"
+
+    exit_code = run_test_command(
+        shlex.split(
+            f"watch --secret twine-secret --profile twine --env-file {env_file} --secrets-dir {secrets_dir} --once"
+        )
+    )
+
+    assert exit_code == 0
+    assert env_file.read_text() == 'TWINE_USERNAME="0cool"\nTWINE_PASSWORD="hunter2"\n'
+    assert (secrets_dir / "TWINE_PASSWORD").read_text() == "hunter2"
+    assert "Updated TWINE_PASSWORD, TWINE_USERNAME" in capsys.readouterr().err
+
+
+def test_watch_requires_output(capsys):
+    exit_code = run_test_command(shlex.split("watch --secret twine-secret --profile twine --once"))
+
+    assert exit_code != 0
+    assert "Either --env-file or --secrets-dir must be provided" in capsys.readouterr().err
+
+
+def test_run_supervise(tmp_path):
+    output = tmp_path / "password"
+    script = tmp_path / "child.py"
+    script.write_text('import sys\nopen(sys.argv[1], "w").write(sys.argv[2])\nsys.exit(4)\n')
+    command = f"{sys.executable} {script}"
+
+    exit_code = run_test_command(
+        [
+            "run",
+            "--secret",
+            "twine-secret",
+            "--profile",
+            "twine",
+            "--supervise",
+            "--command",
+            f"{command} {output} {{env:TWINE_PASSWORD}}",
+        ]
+    )
+
+    assert exit_code == 4
+    assert output.read_text() == "hunter2"
+
+
+def test_run_supervise_reuses_loaded_values(tmp_path, monkeypatch):
+    monkeypatch.setattr(secrets_helper._util.watch, "get_secret_value", pytest.fail)
+    output = tmp_path / "password"
+    script = tmp_path / "child.py"
+    script.write_text('import sys\nopen(sys.argv[1], "w").write(sys.argv[2])\n')
+
+    exit_code = run_test_command(
+        [
+            "run",
+            "--secret",
+            "twine-secret",
+            "--profile",
+            "twine",
+            "--supervise",
+            "--command",
+            f"{sys.executable} {script} {output} {{env:TWINE_PASSWORD}}",
+        ]
+    )
+
+    assert exit_code == 0
+    assert output.read_text() == "hunter2"
+
+
+def test_run_accounts(capsys, tmp_path, fake_accounts):
+    script = tmp_path / "child.py"
+    script.write_text("import os\nprint(os.environ['TWINE_PASSWORD'])\n")
+    missing = "arn:aws:iam::333333333333:role/secrets-helper"
+    role_args = []
+    for role_arn in list(fake_accounts) + [missing]:
+        role_args.extend(["--role-arn", role_arn])
+
+    exit_code = run_test_command(
+        [
+            *("run-accounts", "--secret", "twine-secret", "--profile", "twine", "--output-format", "json"),
+            *role_args,
+            *("--command", f"{sys.executable} {script}"),
+        ]
+    )
+
+    assert exit_code == 1
+    captured = capsys.readouterr()
+    results = {result["role_arn"]: result for result in json.loads(captured.out)}
+    for role_arn, password in fake_accounts.items():
+        assert results[role_arn]["succeeded"]
+        assert results[role_arn]["stdout"] == f"{password}\n"
+    assert not results[missing]["succeeded"]
+    assert "Command succeeded in 2 of 3 accounts" in captured.err
+
+
+def test_run_accounts_requires_roles(capsys):
+    exit_code = run_test_command(shlex.split("run-accounts --secret twine-secret --profile twine --command true"))
+
+    assert exit_code != 0
+    assert "Either --role-arn or --role-arns-file must be provided" in capsys.readouterr().err
+
+
+def test_env_parameters(capsys, tmp_path, fake_parameters):
+    config = tmp_path / "parameters.config"
+    config.write_text(
+        "[secrets-helper.env]\ndb/host: DB_HOST\ndb/password: DB_PASSWORD\nport: DB_PORT\nlog-level: LOG_LEVEL\n"
+    )
+
+    exit_code = run_test_command(
+        shlex.split(f"env --config {config} --parameter-path /app/prod --parameter /shared/log-level")
+    )
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == (
+        'LOG_LEVEL="debug"\nDB_HOST="db.example.com"\nDB_PASSWORD="s3cret"\nDB_PORT="5432"\n'
+    )
+
+
+def test_file_backend(capsys, tmp_path, monkeypatch):
+    plain = tmp_path / "secrets.json"
+    plain.write_text(json.dumps(dict(secrets={"twine-secret": dict(username="offline", password="cached")})))
+    sealed = tmp_path / "secrets.sealed"
+
+    assert run_test_command(["seal-file", "--input", str(plain), "--output", str(sealed)]) == 0
+
+    monkeypatch.setenv("SECRETS_HELPER_BACKEND", "file")
+    exit_code = run_test_command(
+        shlex.split(f"env --secret twine-secret --profile twine --backend-option path={sealed}")
+    )
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == 'TWINE_USERNAME="offline"\nTWINE_PASSWORD="cached"\n'
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    (
+        pytest.param("--backend aws --backend-option path=x", 'The "aws" backend does not accept backend options'),
+        pytest.param("--backend file --backend-option path", 'Invalid backend option "path"'),
+        pytest.param("--backend file --backend-option path=x --replay README.rst", "can only be used with the"),
+        pytest.param("--backend nope", 'Unknown backend "nope"'),
+    ),
+)
+def test_backend_options_fail(capsys, args, message):
+    exit_code = run_test_command(shlex.split(f"env --secret twine-secret --profile twine {args}"))
+
+    assert exit_code != 0
+    assert message in capsys.readouterr().err
+
+
+@pytest.fixture
+def fake_keystore(fake_secrets):
+    payload = bytes(range(256)) * 64
+    boto3.client("secretsmanager", region_name=FAKE_REGION).create_secret(Name="keystore", SecretBinary=payload)
+    return payload
+
+
+def test_env_secret_files(capsys, tmp_path, fake_keystore):
+    files = tmp_path / "files"
+
+    exit_code = run_test_command(
+        shlex.split(f"env --profile twine --secret-file keystore=KEYSTORE --secret-files-dir {files}")
+    )
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == f'KEYSTORE="{files / "KEYSTORE"}"\n'
+    assert (files / "KEYSTORE").read_bytes() == fake_keystore
+
+
+def test_env_secret_files_requires_directory(capsys, fake_keystore):
+    exit_code = run_test_command(shlex.split("env --profile twine --secret-file keystore=KEYSTORE"))
+
+    assert exit_code != 0
+    assert "--secret-files-dir is required" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "delivery_args",
+    (
+        pytest.param([], id="temporary file"),
+        pytest.param(
+            ["--secret-files-fd"],
+            id="file descriptor",
+            marks=pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="memory file descriptors not supported"),
+        ),
+    ),
+)
+def test_run_secret_files(tmp_path, fake_keystore, delivery_args):
+    output = tmp_path / "keystore"
+    script = tmp_path / "child.py"
+    script.write_text(
+        "import os, sys\n"
+        "open(sys.argv[1], 'wb').write(open(os.environ['KEYSTORE'], 'rb').read())\n"
+        "sys.exit(0 if os.environ['TWINE_PASSWORD'] == 'hunter2' else 3)\n"
+    )
+
+    exit_code = run_test_command(
+        [
+            *("run", "--secret", "twine-secret", "--profile", "twine", "--secret-file", "keystore=KEYSTORE"),
+            *delivery_args,
+            *("--command", f"{sys.executable} {script} {output}"),
+        ]
+    )
+
+    assert exit_code == 0
+    assert output.read_bytes() == fake_keystore
+
+
+def test_env_nested_paths(capsys, tmp_path, fake_secrets):
+    document = dict(db=dict(host="db.example.com", password="s3cret"), replicas=[dict(host="replica")], unused=[1])
+    boto3.client("secretsmanager", region_name=FAKE_REGION).create_secret(
+        Name="nested", SecretString=json.dumps(document)
+    )
+    config = tmp_path / "nested.config"
+    config.write_text(
+        "[secrets-helper.env]\n/db/password: DB_PASSWORD\n$.db.host: DB_HOST\n/replicas/0/host: REPLICA_HOST\n"
+    )
+
+    exit_code = run_test_command(shlex.split(f"env --config {config} --secret nested"))
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == 'DB_HOST="db.example.com"\nDB_PASSWORD="s3cret"\nREPLICA_HOST="replica"\n'
+
+
+def test_run_nested_path_not_a_string(capsys, tmp_path, fake_secrets):
+    boto3.client("secretsmanager", region_name=FAKE_REGION).create_secret(
+        Name="nested", SecretString=json.dumps(dict(db=dict(port=5432)))
+    )
+    config = tmp_path / "nested.config"
+    config.write_text("[secrets-helper.env]\n/db/port: DB_PORT\n")
+
+    exit_code = run_test_command(shlex.split(f"run --command true --config {config} --secret nested"))
+
+    assert exit_code == 2
+    assert 'Path "/db/port" in environment mapping does not refer to a string value.' in capsys.readouterr().err
+
+
+def test_metrics_file(capsys, tmp_path, fake_secrets, monkeypatch):
+    metrics_file = tmp_path / "secrets_helper.prom"
+    monkeypatch.setenv("SECRETS_HELPER_METRICS_FILE", str(metrics_file))
+
+    for _ in range(2):
+        assert run_test_command(shlex.split("env --secret twine-secret --profile twine")) == 0
+
+    text = metrics_file.read_text()
+    assert 'secrets_helper_invocations_total{command="env"} 2\n' in text
+    assert 'secrets_helper_api_calls_total{operation="GetSecretValue"} 2\n' in text
+    assert 'secrets_helper_api_call_duration_seconds_count{operation="GetSecretValue"} 2\n' in text
+
+
+def test_run_trace_file(tmp_path, monkeypatch):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    trace_file = tmp_path / "spans.jsonl"
+    output = tmp_path / "traceparent"
+    script = tmp_path / "child.py"
+    script.write_text(
+        "import os, sys\nopen(sys.argv[1], 'w').write(os.environ['TRACEPARENT'] + ' ' + os.environ['TRACESTATE'])\n"
+    )
+    monkeypatch.setenv("TRACEPARENT", f"00-{trace_id}-00f067aa0ba902b7-01")
+    monkeypatch.setenv("TRACESTATE", "congo=t61rcWkgMzE")
+
+    exit_code = run_test_command(
+        [
+            *("--trace-file", str(trace_file), "run", "--secret", "twine-secret", "--profile", "twine"),
+            *("--command", f"{sys.executable} {script} {output}"),
+        ]
+    )
+
+    assert exit_code == 0
+    spans = json.loads(trace_file.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = spans[0]
+    assert root["name"] == "secrets-helper run"
+    assert root["parentSpanId"] == "00f067aa0ba902b7"
+    assert {"load_config", "get_secret_value", "child"} <= {span["name"] for span in spans}
+    assert all(span["traceId"] == trace_id for span in spans)
+    assert output.read_text() == f"00-{trace_id}-{root['spanId']}-01 congo=t61rcWkgMzE"
+
+
+@pytest.fixture
+def bundle_keys(tmp_path):
+    private_key = X25519PrivateKey.generate()
+    private_path = tmp_path / "worker.pem"
+    private_path.write_bytes(
+        private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+    )
+    public_path = tmp_path / "worker.pub.pem"
+    public_path.write_bytes(
+        private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM, format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    return private_path, public_path
+
+
+def test_bundle(capsys, tmp_path, bundle_keys, monkeypatch):
+    private_key, public_key = bundle_keys
+    path = tmp_path / "secrets.bundle"
+    exit_code = run_test_command(
+        shlex.split(f"bundle --secret twine-secret --profile twine --output {path} --recipient-key {public_key}")
+    )
+    assert exit_code == 0
+    assert run_test_command(shlex.split(f"bundle --bundle {path} --bundle-key {private_key} --output x --kms-key-id k"))
+    assert "--bundle cannot be used with the bundle command" in capsys.readouterr().err
+    # Workers never call Secrets Manager.
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "invalid")
+    monkeypatch.setattr(boto3, "client", None)
+
+    exit_code = run_test_command(shlex.split(f"env --bundle {path} --bundle-key {private_key}"))
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == 'TWINE_USERNAME="0cool"\nTWINE_PASSWORD="hunter2"\n'
+
+    output = tmp_path / "password"
+    script = tmp_path / "child.py"
+    script.write_text("import os, sys\nopen(sys.argv[1], 'w').write(os.environ['TWINE_PASSWORD'])\n")
+    monkeypatch.setenv("SECRETS_HELPER_BUNDLE", str(path))
+    monkeypatch.setenv("SECRETS_HELPER_BUNDLE_KEY", str(private_key))
+
+    exit_code = run_test_command(["run", "--command", f"{sys.executable} {script} {output}"])
+
+    assert exit_code == 0
+    assert output.read_text() == "hunter2"
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    (
+        pytest.param("env --bundle {bundle} --profile twine", "--bundle cannot be used with --config"),
+        pytest.param("bundle --profile twine --secret twine-secret --output x", "Exactly one of --recipient-key"),
+    ),
+)
+def test_bundle_fail(capsys, tmp_path, args, message):
+    bundle = tmp_path / "secrets.bundle"
+    bundle.write_bytes(b"")
+
+    exit_code = run_test_command(shlex.split(args.format(bundle=bundle)))
+
+    assert exit_code != 0
+    assert message in capsys.readouterr().err
+
+
+def test_profile_path(capsys, tmp_path, monkeypatch):
+    (tmp_path / "pypi.config").write_text("[secrets-helper.env]\nusername: PYPI_USERNAME\npassword: PYPI_PASSWORD\n")
+    monkeypatch.setenv("SECRETS_HELPER_PROFILE_PATH", str(tmp_path))
+
+    assert run_test_command(["profiles"]) == 0
+    assert capsys.readouterr().out.split() == ["pypi", "twine"]
+
+    exit_code = run_test_command(shlex.split("env --secret twine-secret --profile pypi"))
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == 'PYPI_USERNAME="0cool"\nPYPI_PASSWORD="hunter2"\n'
+
+
+def test_unknown_profile(capsys):
+    exit_code = run_test_command(shlex.split("env --secret twine-secret --profile nope"))
+
+    assert exit_code != 0
+    assert 'Unknown profile "nope"' in capsys.readouterr().err
+
+
+@pytest.mark.skipif(not hasattr(os, "posix_spawn"), reason="posix_spawn not supported")
+def test_run_posix_spawn(capsys, tmp_path, monkeypatch):
+    script = tmp_path / "child.py"
+    script.write_text("import os\nprint(os.environ['TWINE_PASSWORD'])\n")
+    monkeypatch.setenv("SECRETS_HELPER_SPAWN_ENGINE", "posix_spawn")
+
+    exit_code = run_test_command(
+        ["run", "--secret", "twine-secret", "--profile", "twine", "--command", f"{sys.executable} {script}"]
+    )
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == "hunter2\n\n"
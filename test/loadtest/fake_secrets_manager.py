@@ -0,0 +1,260 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Local Secrets Manager stand-in that injects latency and faults.
+
+Point secrets-helper at it with ``--endpoint-url``:
+
+.. code-block:: shell
+
+    $ python test/loadtest/fake_secrets_manager.py --secrets secrets.json --latency uniform:20:80 --throttle-rate 0.05
+    Serving on http://127.0.0.1:8000
+"""
+import argparse
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+FAKE_ACCOUNT = "111122223333"
+FAKE_REGION = "us-west-2"
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Parse a latency distribution specification, in milliseconds.
+
+    * ``constant:MS``
+    * ``uniform:LOW:HIGH``
+    * ``normal:MEAN:STDDEV``
+    * ``exponential:MEAN``
+
+    :returns: Callable that samples a latency in seconds
+    """
+    kind, *raw_args = spec.split(":")
+    args = [float(arg) / 1000 for arg in raw_args]
+    distributions = dict(
+        constant=(1, lambda rng: args[0]),
+        uniform=(2, lambda rng: rng.uniform(args[0], args[1])),
+        normal=(2, lambda rng: max(rng.gauss(args[0], args[1]), 0.0)),
+        exponential=(1, lambda rng: rng.expovariate(1 / args[0]) if args[0] else 0.0),
+    )
+    try:
+        arg_count, sample = distributions[kind]
+    except KeyError:
+        raise ValueError(f'Unknown latency distribution "{kind}"')
+    if len(args) != arg_count:
+        raise ValueError(f'Latency distribution "{kind}" requires {arg_count} parameters')
+    return sample
+
+
+@dataclass
+class FaultConfig:
+    """Latency and faults to inject into every call.
+
+    :param str latency: Latency distribution specification (see :func:`parse_latency`)
+    :param float throttle_rate: Fraction of calls that fail with ``ThrottlingException``
+    :param float error_rate: Fraction of calls that fail with HTTP 500
+    :param float stall_rate: Fraction of calls that stall and then drop the connection
+    :param float stall_seconds: Seconds that stalled calls wait before dropping the connection
+    :param int seed: Random seed
+    """
+
+    latency: str = "constant:0"
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_seconds: float = 5.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeSecretsManager:
+    """Secrets and call statistics served by the stand-in."""
+
+    secrets: Dict[str, str]
+    faults: FaultConfig = field(default_factory=FaultConfig)
+    stats: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        """Set up fault injection."""
+        self._rng = random.Random(self.faults.seed)
+        self._sample_latency = parse_latency(self.faults.latency)
+        self._lock = threading.Lock()
+        self._versions = {name: str(uuid.UUID(hashlib.md5(name.encode()).hexdigest())) for name in self.secrets}
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+
+    def draw(self) -> Tuple[float, float]:
+        """Sample a latency and a fault roll for one call."""
+        with self._lock:
+            return self._sample_latency(self._rng), self._rng.random()
+
+    def arn(self, name: str) -> str:
+        suffix = hashlib.sha256(name.encode("utf-8")).hexdigest()[:6]
+        return f"arn:aws:secretsmanager:{FAKE_REGION}:{FAKE_ACCOUNT}:secret:{name}-{suffix}"
+
+    def lookup(self, secret_id: str) -> Optional[str]:
+        if secret_id in self.secrets:
+            return secret_id
+        for name in self.secrets:
+            arn = self.arn(name)
+            if secret_id in (arn, arn[:-7]):
+                return name
+        return None
+
+    def handle(self, operation: str, request: Dict) -> Tuple[int, Dict]:
+        """Handle a single API call.
+
+        :returns: HTTP status and response body
+        """
+        if operation == "ListSecrets":
+            return 200, dict(SecretList=[dict(Name=name, ARN=self.arn(name)) for name in sorted(self.secrets)])
+
+        name = self.lookup(request.get("SecretId", ""))
+        if name is None:
+            return 400, {"__type": "ResourceNotFoundException", "message": "Secrets Manager can't find the secret."}
+
+        if operation == "DescribeSecret":
+            return 200, dict(ARN=self.arn(name), Name=name, VersionIdsToStages={self._versions[name]: ["AWSCURRENT"]})
+
+        if operation == "GetSecretValue":
+            return 200, dict(
+                ARN=self.arn(name),
+                Name=name,
+                VersionId=self._versions[name],
+                SecretString=self.secrets[name],
+                VersionStages=["AWSCURRENT"],
+            )
+
+        return 400, {"__type": "InvalidRequestException", "message": f"Unsupported operation {operation}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeSecretsManager/1.0"
+    backend: FakeSecretsManager
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Do not log every request."""
+
+    def _respond(self, status: int, body: Dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle a JSON protocol API call."""
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        operation = self.headers.get("X-Amz-Target", "").split(".")[-1]
+        faults = self.backend.faults
+
+        latency, roll = self.backend.draw()
+        time.sleep(latency)
+
+        if roll < faults.stall_rate:
+            self.backend.count("stalled")
+            time.sleep(faults.stall_seconds)
+            self.connection.shutdown(socket.SHUT_RDWR)
+            self.close_connection = True
+            return
+        roll -= faults.stall_rate
+
+        if roll < faults.throttle_rate:
+            self.backend.count("throttled")
+            self._respond(400, {"__type": "ThrottlingException", "message": "Rate exceeded"})
+            return
+        roll -= faults.throttle_rate
+
+        if roll < faults.error_rate:
+            self.backend.count("error")
+            self._respond(500, {"__type": "InternalServiceError", "message": "Injected failure"})
+            return
+
+        status, body = self.backend.handle(operation, request)
+        self.backend.count(f"{operation}:{status}")
+        self._respond(status, body)
+
+
+def serve(*, backend: FakeSecretsManager, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start serving in a background thread.
+
+    :returns: Running server (call ``shutdown`` to stop it)
+    """
+    handler = type("Handler", (_Handler,), dict(backend=backend))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def endpoint_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    """Add fault injection options to an argument parser."""
+    parser.add_argument("--latency", default="constant:0", help="Latency distribution in milliseconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls to throttle")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that return HTTP 500")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of calls that stall")
+    parser.add_argument("--stall-seconds", type=float, default=5.0, help="Seconds that stalled calls stall for")
+    parser.add_argument("--seed", type=int, help="Random seed")
+
+
+def fault_config(parsed: argparse.Namespace) -> FaultConfig:
+    """Build the fault configuration from parsed options."""
+    parse_latency(parsed.latency)
+    return FaultConfig(
+        latency=parsed.latency,
+        throttle_rate=parsed.throttle_rate,
+        error_rate=parsed.error_rate,
+        stall_rate=parsed.stall_rate,
+        stall_seconds=parsed.stall_seconds,
+        seed=parsed.seed,
+    )
+
+
+def main():
+    """Serve secrets from a JSON file mapping secret names to secret values."""
+    parser = argparse.ArgumentParser(description="Local Secrets Manager stand-in with latency and fault injection.")
+    parser.add_argument("--secrets", required=True, help="JSON file mapping secret names to values")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_fault_arguments(parser)
+    parsed = parser.parse_args()
+
+    with open(parsed.secrets) as secrets_file:
+        secrets = {name: json.dumps(value) for name, value in json.load(secrets_file).items()}
+
+    server = serve(
+        backend=FakeSecretsManager(secrets=secrets, faults=fault_config(parsed)), host=parsed.host, port=parsed.port
+    )
+    print(f"Serving on {endpoint_url(server)}")  # noqa: T001
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
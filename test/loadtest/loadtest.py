@@ -0,0 +1,177 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Load test secrets-helper against a local Secrets Manager stand-in.
+
+Launch many concurrent ``secrets-helper env`` invocations against a local server that injects
+latency, throttling, server errors, and connection stalls:
+
+.. code-block:: shell
+
+    $ python test/loadtest/loadtest.py --invocations 200 --concurrency 20 --latency exponential:50 --throttle-rate 0.05
+
+All invocations share one cache directory, as processes on one host would,
+so negative caching and circuit breaker state carry over between them.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+try:
+    from .fake_secrets_manager import FakeSecretsManager, add_fault_arguments, endpoint_url, fault_config, serve
+except ImportError:  # run as a script
+    from fake_secrets_manager import (  # type: ignore  # pylint: disable=import-error
+        FakeSecretsManager,
+        add_fault_arguments,
+        endpoint_url,
+        fault_config,
+        serve,
+    )
+
+_CLI = "from secrets_helper._commands import cli; cli()"
+
+
+@dataclass
+class LoadTestReport:
+    """Summary of one load test run."""
+
+    invocations: int
+    concurrency: int
+    duration: float
+    throughput: float
+    p50: float
+    p99: float
+    error_rate: float
+    server_calls: Dict[str, int]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(max(math.ceil(fraction * len(ordered)), 1), len(ordered))
+    return ordered[rank - 1]
+
+
+def _environment(cache_dir: str) -> Dict[str, str]:
+    environment = dict(os.environ)
+    environment.update(
+        {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-west-2",
+            CACHE_DIR_ENV: cache_dir,
+        }
+    )
+    for variable in ("AWS_PROFILE", "AWS_SESSION_TOKEN", "AWS_SECURITY_TOKEN"):
+        environment.pop(variable, None)
+    return environment
+
+
+def run_load_test(
+    *, invocations: int, concurrency: int, secret_count: int, backend_kwargs: Optional[Dict] = None
+) -> LoadTestReport:
+    """Run ``invocations`` CLI invocations, ``concurrency`` at a time.
+
+    :param int invocations: Total number of invocations
+    :param int concurrency: Maximum concurrent invocations
+    :param int secret_count: Number of secrets each invocation loads
+    :param dict backend_kwargs: Additional arguments for :class:`FakeSecretsManager`
+    """
+    secrets = {f"loadtest/secret-{i}": json.dumps({f"key{i}": f"value{i}"}) for i in range(secret_count)}
+    backend = FakeSecretsManager(secrets=secrets, **(backend_kwargs or {}))
+    server = serve(backend=backend)
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            config = os.path.join(workdir, "loadtest.config")
+            with open(config, "w") as config_file:
+                config_file.write("[secrets-helper.settings]\nsecrets:\n")
+                config_file.write("".join(f"    {name}\n" for name in secrets))
+                config_file.write("[secrets-helper.env]\n")
+                config_file.write("".join(f"key{i}: LOADTEST_{i}\n" for i in range(secret_count)))
+
+            command = [sys.executable, "-c", _CLI, "env", "--config", config, "--endpoint-url", endpoint_url(server)]
+            environment = _environment(os.path.join(workdir, "cache"))
+
+            def _invoke(_: int):
+                start = time.perf_counter()
+                result = subprocess.run(  # nosec
+                    command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+                )
+                return time.perf_counter() - start, result.returncode == 0
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(_invoke, range(invocations)))
+            duration = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    latencies = [latency for latency, _ in outcomes]
+    failures = sum(1 for _, succeeded in outcomes if not succeeded)
+    return LoadTestReport(
+        invocations=invocations,
+        concurrency=concurrency,
+        duration=duration,
+        throughput=invocations / duration if duration else 0.0,
+        p50=percentile(latencies, 0.5),
+        p99=percentile(latencies, 0.99),
+        error_rate=failures / invocations if invocations else 0.0,
+        server_calls=dict(backend.stats),
+    )
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Run a load test from the command line."""
+    parser = argparse.ArgumentParser(description="Load test secrets-helper against a local Secrets Manager.")
+    parser.add_argument("--invocations", type=int, default=100, help="Total CLI invocations")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum concurrent invocations")
+    parser.add_argument("--secrets", type=int, default=3, help="Secrets loaded by each invocation")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    add_fault_arguments(parser)
+    parsed = parser.parse_args(args)
+
+    report = run_load_test(
+        invocations=parsed.invocations,
+        concurrency=parsed.concurrency,
+        secret_count=parsed.secrets,
+        backend_kwargs=dict(faults=fault_config(parsed)),
+    )
+
+    print(  # noqa: T001
+        f"{report.invocations} invocations in {report.duration:.2f} s "
+        f"({report.throughput:.1f}/s, concurrency {report.concurrency})\n"
+        f"latency p50 {report.p50 * 1000:.1f} ms, p99 {report.p99 * 1000:.1f} ms\n"
+        f"error rate {report.error_rate:.1%}\n"
+        f"server calls {json.dumps(report.server_calls, sort_keys=True)}"
+    )
+    if parsed.output:
+        with open(parsed.output, "w") as output:
+            json.dump(asdict(report), output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
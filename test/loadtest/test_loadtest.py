@@ -0,0 +1,138 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Smoke tests for the load test harness."""
+import http.client
+import json
+import random
+
+import pytest
+
+from .fake_secrets_manager import FakeSecretsManager, FaultConfig, endpoint_url, parse_latency, serve
+from .loadtest import percentile, run_load_test
+
+pytestmark = [pytest.mark.local]
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def _serve(**faults):
+        backend = FakeSecretsManager(secrets={"a": '{"b": "c"}'}, faults=FaultConfig(seed=0, **faults))
+        server = serve(backend=backend)
+        servers.append(server)
+        return server, backend
+
+    yield _serve
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _call(server, operation: str, **request):
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.request(
+        "POST", "/", body=json.dumps(request), headers={"X-Amz-Target": f"secretsmanager.{operation}"}
+    )
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    (
+        pytest.param("constant:20", (0.02, 0.02), id="constant"),
+        pytest.param("uniform:10:30", (0.01, 0.03), id="uniform"),
+        pytest.param("normal:20:5", (0.0, 1.0), id="normal"),
+        pytest.param("exponential:20", (0.0, 1.0), id="exponential"),
+    ),
+)
+def test_parse_latency(spec, expected):
+    sample = parse_latency(spec)(random.Random(0))
+
+    assert expected[0] <= sample <= expected[1]
+
+
+@pytest.mark.parametrize("spec", ("pareto:1", "uniform:10", "constant"))
+def test_parse_latency_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_latency(spec)
+
+
+def test_get_secret_value(fake_server):
+    server, backend = fake_server()
+
+    status, body = _call(server, "GetSecretValue", SecretId=backend.arn("a"))
+
+    assert status == 200
+    assert body["Name"] == "a"
+    assert body["SecretString"] == '{"b": "c"}'
+
+
+def test_get_secret_value_not_found(fake_server):
+    server, _ = fake_server()
+
+    status, body = _call(server, "GetSecretValue", SecretId="missing")
+
+    assert status == 400
+    assert body["__type"] == "ResourceNotFoundException"
+
+
+@pytest.mark.parametrize(
+    "faults, status, error_type",
+    (
+        pytest.param(dict(throttle_rate=1.0), 400, "ThrottlingException", id="throttle"),
+        pytest.param(dict(error_rate=1.0), 500, "InternalServiceError", id="error"),
+    ),
+)
+def test_injected_faults(fake_server, faults, status, error_type):
+    server, backend = fake_server(**faults)
+
+    actual_status, body = _call(server, "GetSecretValue", SecretId="a")
+
+    assert actual_status == status
+    assert body["__type"] == error_type
+    assert sum(backend.stats.values()) == 1
+
+
+def test_injected_stall(fake_server):
+    server, backend = fake_server(stall_rate=1.0, stall_seconds=0.01)
+
+    with pytest.raises((http.client.RemoteDisconnected, ConnectionError)):
+        _call(server, "GetSecretValue", SecretId="a")
+
+    assert backend.stats == {"stalled": 1}
+
+
+def test_endpoint_url(fake_server):
+    server, _ = fake_server()
+
+    assert endpoint_url(server).startswith("http://127.0.0.1:")
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_run_load_test():
+    report = run_load_test(invocations=2, concurrency=2, secret_count=2)
+
+    assert report.error_rate == 0.0
+    assert report.server_calls == {"GetSecretValue:200": 4}
+    assert report.p50 <= report.p99
@@ -0,0 +1,165 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.accounts``."""
+import datetime
+import sys
+
+import pytest
+
+from secrets_helper._util.accounts import AccountClients, _SealedCredentialCache, account_id, run_in_accounts
+from secrets_helper.exceptions import ConfigurationError
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+from ...functional.functional_test_utils import fake_accounts  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import FAKE_REGION
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.fixture
+def print_password(tmp_path):
+    script = tmp_path / "print_password.py"
+    script.write_text("import os\nprint(os.environ['TWINE_PASSWORD'])\n")
+    return f"{sys.executable} {script}"
+
+
+def _run(role_arns, command, credential_cache=None, **kwargs):
+    return run_in_accounts(
+        clients=AccountClients(region_name=FAKE_REGION, credential_cache=credential_cache),
+        role_arns=role_arns,
+        command=command,
+        secret_ids=["twine-secret"],
+        environment_mappings=dict(username="TWINE_USERNAME", password="TWINE_PASSWORD"),
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize(
+    "role_arn, expected",
+    (
+        ("arn:aws:iam::123456789012:role/admin", "123456789012"),
+        ("arn:aws-us-gov:iam::123456789012:role/path/admin", "123456789012"),
+    ),
+)
+def test_account_id(role_arn, expected):
+    assert account_id(role_arn) == expected
+
+
+@pytest.mark.parametrize(
+    "role_arn",
+    ("admin", "arn:aws:iam::123456789012:user/admin", "arn:aws:iam::12345:role/admin"),
+)
+def test_account_id_invalid(role_arn):
+    with pytest.raises(ConfigurationError) as excinfo:
+        account_id(role_arn)
+
+    excinfo.match("is not an IAM role ARN")
+
+
+def test_sealed_credential_cache(tmp_path):
+    cache = _SealedCredentialCache(directory=tmp_path / "credentials")
+    expiration = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+
+    assert "key" not in cache
+    cache["key"] = dict(Credentials=dict(AccessKeyId="AKID", Expiration=expiration))
+
+    assert "key" in cache
+    assert cache["key"] == dict(Credentials=dict(AccessKeyId="AKID", Expiration=expiration.isoformat()))
+    assert b"AKID" not in (tmp_path / "credentials" / "key.entry").read_bytes()
+
+
+def test_sealed_credential_cache_corrupt(tmp_path):
+    cache = _SealedCredentialCache(directory=tmp_path / "credentials")
+    (tmp_path / "credentials" / "key.entry").write_bytes(b"not sealed")
+
+    assert "key" not in cache
+
+
+def test_account_clients_reuses_clients():
+    clients = AccountClients(region_name=FAKE_REGION, credential_cache={})
+
+    first = clients.client(role_arn="arn:aws:iam::111111111111:role/a")
+
+    assert clients.client(role_arn="arn:aws:iam::111111111111:role/a") is first
+    assert clients.client(role_arn="arn:aws:iam::222222222222:role/a") is not first
+
+
+def test_run_in_accounts(fake_accounts, print_password):
+    role_arns = list(fake_accounts)
+
+    results = _run(role_arns, print_password)
+
+    assert [result.role_arn for result in results] == role_arns
+    for result in results:
+        assert result.succeeded
+        assert result.stdout == f"{fake_accounts[result.role_arn]}\n"
+
+
+def test_run_in_accounts_caches_credentials(fake_accounts, print_password):
+    credential_cache = {}
+
+    _run(list(fake_accounts), print_password, credential_cache=credential_cache)
+
+    assert len(credential_cache) == len(fake_accounts)
+    cached = {key: value["Credentials"]["AccessKeyId"] for key, value in credential_cache.items()}
+
+    _run(list(fake_accounts), print_password, credential_cache=credential_cache)
+
+    assert {key: value["Credentials"]["AccessKeyId"] for key, value in credential_cache.items()} == cached
+
+
+def test_run_in_accounts_isolates_failures(fake_accounts, print_password):
+    missing = "arn:aws:iam::333333333333:role/secrets-helper"
+
+    results = _run([missing] + list(fake_accounts), print_password, max_workers=1)
+
+    assert results[0].returncode is None
+    assert 'Encountered AWS error for secret "twine-secret"' in results[0].error
+    assert all(result.succeeded for result in results[1:])
+
+
+@pytest.mark.parametrize(
+    "command, error",
+    (
+        pytest.param("echo {env:NOT_LOADED}", "Unable to inject environment variable", id="unknown variable"),
+        pytest.param("/does/not/exist", "No such file or directory", id="missing executable"),
+    ),
+)
+def test_run_in_accounts_command_fails_to_start(fake_accounts, command, error):
+    results = _run(list(fake_accounts), command)
+
+    assert len(results) == len(fake_accounts)
+    for result in results:
+        assert result.returncode is None
+        assert error in result.error
+
+
+def test_run_in_accounts_unwritable_cache_dir(fake_accounts, print_password, tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+
+    results = _run(list(fake_accounts), print_password)
+
+    assert all(result.succeeded for result in results)
+
+
+def test_run_in_accounts_deduplicates(fake_accounts, print_password):
+    role_arn = next(iter(fake_accounts))
+
+    results = _run([role_arn, role_arn], print_password)
+
+    assert len(results) == 1
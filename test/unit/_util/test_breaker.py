@@ -0,0 +1,202 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.breaker``."""
+import time
+
+import botocore.exceptions
+import pytest
+
+from secrets_helper._util.breaker import (
+    CircuitBreaker,
+    check_negative_cache,
+    failure_state,
+    is_transient_failure,
+    record_negative_cache,
+    reset_failure_state,
+)
+from secrets_helper.exceptions import CircuitOpenError, SecretRetrievalError
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+ENDPOINT = "https://secretsmanager.us-west-2.amazonaws.com"
+PRINCIPAL = "principal"
+
+
+def _client_error(code: str, status: int) -> botocore.exceptions.ClientError:
+    return botocore.exceptions.ClientError(
+        dict(Error=dict(Code=code, Message="nope"), ResponseMetadata=dict(HTTPStatusCode=status)), "GetSecretValue"
+    )
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    (
+        pytest.param(_client_error("InternalServiceError", 500), True, id="5xx"),
+        pytest.param(_client_error("ResourceNotFoundException", 400), False, id="4xx"),
+        pytest.param(botocore.exceptions.ReadTimeoutError(endpoint_url=ENDPOINT), True, id="read timeout"),
+        pytest.param(botocore.exceptions.EndpointConnectionError(endpoint_url=ENDPOINT), True, id="connection"),
+        pytest.param(botocore.exceptions.NoCredentialsError(), False, id="other botocore error"),
+    ),
+)
+def test_is_transient_failure(error, expected):
+    assert is_transient_failure(error) is expected
+
+
+@pytest.mark.parametrize("code", ("ResourceNotFoundException", "AccessDeniedException"))
+def test_negative_cache_records_permanent_errors(code):
+    record_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1", error=_client_error(code, 400))
+
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        check_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1")
+
+    excinfo.match(r"\(cached failure\)")
+    check_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-2")
+    check_negative_cache(endpoint="https://elsewhere", principal=PRINCIPAL, secret_id="secret-1")
+    check_negative_cache(endpoint=ENDPOINT, principal="someone-else", secret_id="secret-1")
+
+
+@pytest.mark.parametrize(
+    "error",
+    (
+        pytest.param(_client_error("ThrottlingException", 400), id="throttling"),
+        pytest.param(_client_error("InternalServiceError", 500), id="5xx"),
+    ),
+)
+def test_negative_cache_ignores_other_errors(error):
+    record_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1", error=error)
+
+    check_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1")
+
+
+def test_negative_cache_expires(monkeypatch):
+    record_negative_cache(
+        endpoint=ENDPOINT,
+        principal=PRINCIPAL,
+        secret_id="secret-1",
+        error=_client_error("AccessDeniedException", 400),
+        ttl=5,
+    )
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 6)
+
+    check_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1")
+
+
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=3)
+
+    for _ in range(2):
+        breaker.record_failure(_client_error("InternalServiceError", 500))
+        breaker.check()
+
+    breaker.record_failure(_client_error("InternalServiceError", 500))
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    excinfo.match("Too many recent failures")
+
+    # State is shared with other invocations
+    with pytest.raises(CircuitOpenError):
+        CircuitBreaker(endpoint=ENDPOINT, threshold=3).check()
+
+
+def test_circuit_breaker_ignores_client_errors():
+    breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=1)
+
+    breaker.record_failure(_client_error("ResourceNotFoundException", 400))
+
+    breaker.check()
+
+
+def test_circuit_breaker_half_open(monkeypatch):
+    breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=2, reset_timeout=10)
+    for _ in range(2):
+        breaker.record_failure(_client_error("InternalServiceError", 500))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    breaker.check()
+
+    breaker.record_failure(_client_error("InternalServiceError", 500))
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    breaker.check()
+    assert list(failure_state()) == []
+
+
+def test_failure_state_and_reset():
+    CircuitBreaker(endpoint=ENDPOINT, threshold=1).record_failure(_client_error("InternalServiceError", 500))
+    record_negative_cache(
+        endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1", error=_client_error("AccessDeniedException", 400)
+    )
+
+    state = list(failure_state())
+
+    assert [(entry["kind"], entry.get("state")) for entry in state] == [("circuit", "open"), ("failure", None)]
+    assert state[1]["secret_id"] == "secret-1"
+
+    reset_failure_state()
+
+    assert list(failure_state()) == []
+
+
+def test_circuit_breaker_not_persistent():
+    breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=1, persistent=False)
+    breaker.record_failure(_client_error("InternalServiceError", 500))
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    CircuitBreaker(endpoint=ENDPOINT, threshold=1).check()
+    assert list(failure_state()) == []
+
+
+def test_circuit_breaker_picks_up_shared_state():
+    breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=2)
+    other = CircuitBreaker(endpoint=ENDPOINT, threshold=2)
+
+    breaker.record_failure(_client_error("InternalServiceError", 500))
+    other.record_failure(_client_error("InternalServiceError", 500))
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_unwritable_cache_dir_keeps_state_in_memory(tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+
+    try:
+        breaker = CircuitBreaker(endpoint=ENDPOINT, threshold=1)
+        breaker.record_failure(_client_error("InternalServiceError", 500))
+        record_negative_cache(
+            endpoint=ENDPOINT,
+            principal=PRINCIPAL,
+            secret_id="secret-1",
+            error=_client_error("AccessDeniedException", 400),
+        )
+
+        with pytest.raises(CircuitOpenError):
+            CircuitBreaker(endpoint=ENDPOINT, threshold=1).check()
+        with pytest.raises(SecretRetrievalError):
+            check_negative_cache(endpoint=ENDPOINT, principal=PRINCIPAL, secret_id="secret-1")
+        assert [entry["kind"] for entry in failure_state()] == ["circuit", "failure"]
+    finally:
+        reset_failure_state()
+
+    assert list(failure_state()) == []
@@ -0,0 +1,171 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.bundle``."""
+import time
+
+import boto3
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from moto import mock_kms
+
+from secrets_helper._util.bundle import read_bundle, write_bundle
+from secrets_helper.exceptions import ConfigurationError, SecretFormatError, SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import FAKE_REGION
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+ENVIRONMENT = {"TWINE_USERNAME": "0cool", "TWINE_PASSWORD": "hunter2"}
+
+
+def _write_keys(directory, name):
+    private_key = X25519PrivateKey.generate()
+    private_path = directory / f"{name}.pem"
+    private_path.write_bytes(
+        private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+    )
+    public_path = directory / f"{name}.pub.pem"
+    public_path.write_bytes(
+        private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM, format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    return private_path, public_path
+
+
+@pytest.fixture
+def keys(tmp_path):
+    return _write_keys(tmp_path, "worker")
+
+
+@pytest.fixture
+def kms_client():
+    with mock_kms():
+        yield boto3.client("kms", region_name=FAKE_REGION)
+
+
+def test_recipient_key_round_trip(tmp_path, keys):
+    private_key, public_key = keys
+    path = tmp_path / "secrets.bundle"
+
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=public_key)
+
+    assert b"hunter2" not in path.read_bytes()
+    assert read_bundle(path=path, private_key=private_key) == ENVIRONMENT
+
+
+def test_kms_round_trip(tmp_path, kms_client):
+    key_id = kms_client.create_key()["KeyMetadata"]["KeyId"]
+    path = tmp_path / "secrets.bundle"
+
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, kms_key_id=key_id, kms_client=kms_client)
+
+    assert read_bundle(path=path, kms_client=kms_client) == ENVIRONMENT
+
+
+def test_kms_unknown_key(tmp_path, kms_client):
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        write_bundle(path=tmp_path / "secrets.bundle", environment={}, ttl=60, kms_key_id="nope", kms_client=kms_client)
+
+    excinfo.match('Encountered AWS error for KMS key "nope"')
+
+
+@pytest.mark.parametrize("recipient", (True, False))
+def test_write_requires_one_key(tmp_path, keys, recipient):
+    with pytest.raises(ConfigurationError) as excinfo:
+        write_bundle(
+            path=tmp_path / "secrets.bundle",
+            environment={},
+            ttl=60,
+            recipient_key=keys[1] if recipient else None,
+            kms_key_id="alias/bundle" if recipient else None,
+        )
+
+    excinfo.match("exactly one recipient key or KMS key")
+
+
+def test_expired(tmp_path, keys, monkeypatch):
+    private_key, public_key = keys
+    path = tmp_path / "secrets.bundle"
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=public_key)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        read_bundle(path=path, private_key=private_key)
+
+    excinfo.match("expired at")
+
+
+def test_extended_expiry_is_rejected(tmp_path, keys):
+    private_key, public_key = keys
+    path = tmp_path / "secrets.bundle"
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=public_key)
+    raw = path.read_bytes()
+    expires = raw.split(b'"expires": ')[1].split(b",")[0]
+    path.write_bytes(raw.replace(expires, str(int(expires) + 3600).encode("ascii"), 1))
+
+    with pytest.raises(SecretFormatError) as excinfo:
+        read_bundle(path=path, private_key=private_key)
+
+    excinfo.match("corrupt or has been modified")
+
+
+def test_modified_payload(tmp_path, keys):
+    private_key, public_key = keys
+    path = tmp_path / "secrets.bundle"
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=public_key)
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 1
+    path.write_bytes(bytes(raw))
+
+    with pytest.raises(SecretFormatError):
+        read_bundle(path=path, private_key=private_key)
+
+
+def test_wrong_private_key(tmp_path, keys):
+    _, public_key = keys
+    other_private_key, _ = _write_keys(tmp_path, "other")
+    path = tmp_path / "secrets.bundle"
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=public_key)
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        read_bundle(path=path, private_key=other_private_key)
+
+    excinfo.match("is not encrypted for bundle key")
+
+
+def test_missing_private_key(tmp_path, keys):
+    path = tmp_path / "secrets.bundle"
+    write_bundle(path=path, environment=ENVIRONMENT, ttl=60, recipient_key=keys[1])
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        read_bundle(path=path)
+
+    excinfo.match("Provide --bundle-key")
+
+
+def test_not_a_bundle(tmp_path):
+    path = tmp_path / "secrets.bundle"
+    path.write_text("TWINE_PASSWORD=hunter2\n")
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        read_bundle(path=path)
+
+    excinfo.match("is not a bundle")
@@ -0,0 +1,65 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.cache``."""
+import time
+
+import pytest
+
+from secrets_helper._util.cache import cache_dir, read_cached_json, write_cached_json
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def test_cache_dir_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "a" / "b"))
+
+    actual = cache_dir()
+
+    assert actual == tmp_path / "a" / "b"
+    assert actual.is_dir()
+
+
+def test_cache_dir_default(monkeypatch, tmp_path):
+    monkeypatch.delenv(CACHE_DIR_ENV, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    assert cache_dir() == tmp_path / "secrets-helper"
+
+
+@pytest.mark.parametrize("ttl", (None, 60))
+def test_cached_json_round_trip(tmp_path, ttl):
+    path = tmp_path / "entry.json"
+
+    write_cached_json(path=path, value=dict(a=[1, 2]), ttl=ttl)
+
+    assert read_cached_json(path=path) == dict(a=[1, 2])
+
+
+def test_cached_json_expired(monkeypatch, tmp_path):
+    path = tmp_path / "entry.json"
+    write_cached_json(path=path, value="value", ttl=10)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+
+    assert read_cached_json(path=path) is None
+
+
+@pytest.mark.parametrize("body", (None, "not json"))
+def test_cached_json_unusable(tmp_path, body):
+    path = tmp_path / "entry.json"
+    if body is not None:
+        path.write_text(body)
+
+    assert read_cached_json(path=path) is None
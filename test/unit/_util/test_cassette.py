@@ -0,0 +1,149 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.cassette``."""
+import datetime
+from types import SimpleNamespace
+
+import botocore.exceptions
+import pytest
+
+from secrets_helper._util.cassette import Cassette, Interaction, RecordingClient, ReplayClient
+from secrets_helper.exceptions import ConfigurationError, SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+class FakeClient:
+    meta = SimpleNamespace(endpoint_url="https://example.com", region_name="us-west-2")
+
+    def __init__(self):
+        """Set up without any calls."""
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):  # pylint: disable=invalid-name
+        self.calls += 1
+        if SecretId == "missing":
+            raise botocore.exceptions.ClientError(
+                dict(Error=dict(Code="ResourceNotFoundException", Message="not found")), "GetSecretValue"
+            )
+        return dict(
+            Name=SecretId,
+            SecretString=f"value-{self.calls}",
+            SecretBinary=b"\x00\x01",
+            CreatedDate=datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone.utc),
+            ResponseMetadata=dict(RequestId="abc"),
+        )
+
+    def get_paginator(self, operation):
+        assert operation == "list_secrets"
+        return SimpleNamespace(paginate=lambda **_kwargs: iter([dict(SecretList=[dict(Name="a")])]))
+
+
+def _record(tmp_path):
+    cassette = Cassette()
+    client = RecordingClient(client=FakeClient(), cassette=cassette)
+
+    client.get_secret_value(SecretId="a")
+    client.get_secret_value(SecretId="a")
+    with pytest.raises(botocore.exceptions.ClientError):
+        client.get_secret_value(SecretId="missing")
+    assert list(client.get_paginator("list_secrets").paginate(Filters=[])) == [dict(SecretList=[dict(Name="a")])]
+
+    path = tmp_path / "test.cassette"
+    cassette.save(path=path)
+    return path
+
+
+def test_record(tmp_path):
+    path = _record(tmp_path)
+
+    assert b"value-1" not in path.read_bytes()
+
+    cassette = Cassette.load(path=path)
+    assert cassette.endpoint_url == "https://example.com"
+    assert cassette.region_name == "us-west-2"
+    assert cassette.recorded_at > 0
+    assert [each.operation for each in cassette.interactions] == [
+        "get_secret_value",
+        "get_secret_value",
+        "get_secret_value",
+        "list_secrets",
+    ]
+    assert all(each.duration >= 0 for each in cassette.interactions)
+    assert "ResponseMetadata" not in cassette.interactions[0].response
+
+
+def test_replay(tmp_path):
+    path = _record(tmp_path)
+    client = ReplayClient(cassette=Cassette.load(path=path), path=path)
+
+    first = client.get_secret_value(SecretId="a")
+    assert first["SecretString"] == "value-1"
+    assert first["SecretBinary"] == b"\x00\x01"
+    assert first["CreatedDate"] == datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone.utc)
+    assert client.get_secret_value(SecretId="a")["SecretString"] == "value-2"
+    # Exhausted recordings repeat the last one.
+    assert client.get_secret_value(SecretId="a")["SecretString"] == "value-2"
+
+    with pytest.raises(client.exceptions.ResourceNotFoundException):
+        client.get_secret_value(SecretId="missing")
+
+    assert list(client.get_paginator("list_secrets").paginate(Filters=[])) == [dict(SecretList=[dict(Name="a")])]
+    assert client.meta.endpoint_url.startswith("cassette://")
+
+
+def test_replay_unrecorded_call(tmp_path):
+    path = _record(tmp_path)
+    client = ReplayClient(cassette=Cassette.load(path=path), path=path)
+
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        client.get_secret_value(SecretId="b")
+
+    excinfo.match("has no recorded get_secret_value call")
+
+
+def test_replay_recorded_latency(tmp_path, monkeypatch):
+    path = tmp_path / "test.cassette"
+    interaction = Interaction(operation="get_secret_value", request=dict(SecretId="a"), response={}, duration=1.5)
+    Cassette(interactions=[interaction]).save(path=path)
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+
+    ReplayClient(cassette=Cassette.load(path=path), path=path).get_secret_value(SecretId="a")
+    ReplayClient(cassette=Cassette.load(path=path), path=path, latency="recorded").get_secret_value(SecretId="a")
+
+    assert sleeps == [1.5]
+
+
+def test_load_wrong_key(tmp_path, monkeypatch):
+    path = tmp_path / "test.cassette"
+    monkeypatch.setenv("SECRETS_HELPER_CACHE_KEY", "BAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQ=")
+    Cassette().save(path=path)
+    monkeypatch.setenv("SECRETS_HELPER_CACHE_KEY", "BQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQU=")
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        Cassette.load(path=path)
+
+    excinfo.match("Unable to decrypt cassette")
+
+
+def test_load_not_a_cassette(tmp_path):
+    path = tmp_path / "test.cassette"
+    path.write_bytes(b"{}")
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        Cassette.load(path=path)
+
+    excinfo.match("is not a secrets-helper cassette")
@@ -19,6 +19,8 @@ import pytest
 
 import secrets_helper._util.config
 from secrets_helper._util.config import HelperConfig, _load_config_from_file, _mapping_from_profile_names, load_config
+from secrets_helper._util.selectors import SecretSelector
+from secrets_helper.exceptions import ConfigurationError
 from secrets_helper.identifiers import KNOWN_CONFIGS
 
 from ..unit_test_helpers import get_vector_filepath
@@ -82,6 +84,38 @@ def test_mapping_from_profile_names_fail(config_profile, user_profile):
                 environment_mappings=dict(d="VAL_D", e="VAL_E", f="VAL_F", **KNOWN_CONFIGS["twine"]),
             ),
         ),
+        (
+            "selectors",
+            None,
+            HelperConfig(
+                secret_ids=["secret-1"],
+                environment_mappings=dict(a="VAL_A"),
+                secret_selectors=[
+                    SecretSelector(prefix="service/alpha/"),
+                    SecretSelector(tag_key="team", tag_value="blue"),
+                    SecretSelector(tag_key="stage", tag_value="prod"),
+                ],
+            ),
+        ),
+        (
+            "parameters",
+            None,
+            HelperConfig(
+                secret_ids=[],
+                environment_mappings={"log-level": "LOG_LEVEL"},
+                parameter_names=["/shared/log-level"],
+                parameter_paths=["/app/prod", "/app/common"],
+            ),
+        ),
+        (
+            "secret-files",
+            None,
+            HelperConfig(
+                secret_ids=["secret-1"],
+                environment_mappings=dict(a="VAL_A"),
+                secret_files={"keystore": "KEYSTORE", "certs/CA-bundle": "CA_BUNDLE"},
+            ),
+        ),
     ),
 )
 def test_load_config_from_file_success(name, profile, expected):
@@ -128,6 +162,91 @@ def _load_config_scenarios_good():
     )
 
 
+def test_load_config_selectors_only(monkeypatch):
+    loaded_config = HelperConfig(
+        secret_ids=[], environment_mappings=dict(a="VAL_A"), secret_selectors=[SecretSelector(prefix="a/")]
+    )
+    monkeypatch.setattr(
+        secrets_helper._util.config, "_load_config_from_file", _fake_load_config_from_file(loaded_config)
+    )
+
+    actual = load_config(
+        config=io.BytesIO(),
+        profile=None,
+        secret_ids=[],
+        secret_selectors=[SecretSelector(prefix="b/"), SecretSelector(prefix="a/")],
+    )
+
+    assert actual == HelperConfig(
+        secret_ids=[],
+        environment_mappings=dict(a="VAL_A"),
+        secret_selectors=[SecretSelector(prefix="b/"), SecretSelector(prefix="a/")],
+    )
+
+
+def test_load_config_parameters_only(monkeypatch):
+    loaded_config = HelperConfig(
+        secret_ids=[], environment_mappings=dict(a="VAL_A"), parameter_names=["/a"], parameter_paths=["/b"]
+    )
+    monkeypatch.setattr(
+        secrets_helper._util.config, "_load_config_from_file", _fake_load_config_from_file(loaded_config)
+    )
+
+    actual = load_config(
+        config=io.BytesIO(), profile=None, secret_ids=[], parameter_names=["/c", "/a"], parameter_paths=["/b"]
+    )
+
+    assert actual == HelperConfig(
+        secret_ids=[], environment_mappings=dict(a="VAL_A"), parameter_names=["/c", "/a"], parameter_paths=["/b"]
+    )
+
+
+def test_load_config_secret_files_only(monkeypatch):
+    loaded_config = HelperConfig(secret_ids=[], environment_mappings={}, secret_files=dict(keystore="KEYSTORE"))
+    monkeypatch.setattr(
+        secrets_helper._util.config, "_load_config_from_file", _fake_load_config_from_file(loaded_config)
+    )
+
+    actual = load_config(
+        config=io.BytesIO(), profile=None, secret_ids=[], secret_files=["truststore=TRUSTSTORE", "keystore=KEYSTORE"]
+    )
+
+    assert actual == HelperConfig(
+        secret_ids=[], environment_mappings={}, secret_files=dict(truststore="TRUSTSTORE", keystore="KEYSTORE")
+    )
+
+
+@pytest.mark.parametrize(
+    "secret_files, message",
+    (
+        pytest.param(["keystore=OTHER"], 'Secret "keystore" already mapped to a secret file.', id="secret conflict"),
+        pytest.param(
+            ["other=KEYSTORE"],
+            'Another secret file already maps to environment variable "KEYSTORE".',
+            id="environment variable conflict",
+        ),
+        pytest.param(
+            ["other=VAL_A"],
+            'Environment variable "VAL_A" is mapped to both a key and a secret file.',
+            id="key mapping conflict",
+        ),
+        pytest.param(["keystore"], 'Invalid secret file mapping "keystore".', id="invalid"),
+    ),
+)
+def test_load_config_secret_files_fail(monkeypatch, secret_files, message):
+    loaded_config = HelperConfig(
+        secret_ids=["secret-1"], environment_mappings=dict(a="VAL_A"), secret_files=dict(keystore="KEYSTORE")
+    )
+    monkeypatch.setattr(
+        secrets_helper._util.config, "_load_config_from_file", _fake_load_config_from_file(loaded_config)
+    )
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_config(config=io.BytesIO(), profile=None, secret_ids=[], secret_files=secret_files)
+
+    assert message in str(excinfo.value)
+
+
 def _fake_load_config_from_file(loaded_config):
     def _fake(*, config_file: IO, profile: Optional[str]) -> HelperConfig:
         return loaded_config
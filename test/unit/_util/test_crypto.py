@@ -0,0 +1,97 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.crypto``."""
+import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import secrets_helper._util.crypto
+from secrets_helper._util.crypto import _read_or_create_key, local_key, seal, unseal
+from secrets_helper.exceptions import ConfigurationError
+from secrets_helper.identifiers import CACHE_KEY_ENV
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def test_local_key_created_once(monkeypatch):
+    monkeypatch.delenv(CACHE_KEY_ENV, raising=False)
+
+    key = local_key()
+
+    assert len(key) == 32
+    assert local_key() == key
+
+
+def test_local_key_created_concurrently(monkeypatch, tmp_path):
+    winner = b"\x02" * 32
+    link = os.link
+
+    def _link(source, destination):
+        (tmp_path / "cache.key").write_bytes(winner)
+        link(source, destination)
+
+    monkeypatch.setattr(secrets_helper._util.crypto.os, "link", _link)
+
+    assert _read_or_create_key(tmp_path / "cache.key") == winner
+    assert [each.name for each in tmp_path.iterdir()] == ["cache.key"]
+
+
+def test_local_key_created_by_parallel_threads(tmp_path):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        keys = set(executor.map(lambda _: _read_or_create_key(tmp_path / "cache.key"), range(32)))
+
+    assert keys == {(tmp_path / "cache.key").read_bytes()}
+
+
+def test_local_key_from_environment(monkeypatch):
+    monkeypatch.setenv(CACHE_KEY_ENV, base64.b64encode(b"\x01" * 32).decode("ascii"))
+
+    assert local_key() == b"\x01" * 32
+
+
+@pytest.mark.parametrize("value", ("not base64!", base64.b64encode(b"short").decode("ascii")))
+def test_local_key_from_environment_invalid(monkeypatch, value):
+    monkeypatch.setenv(CACHE_KEY_ENV, value)
+
+    with pytest.raises(ConfigurationError):
+        local_key()
+
+
+def test_seal_round_trip():
+    key = b"\x02" * 32
+
+    sealed = seal(key=key, plaintext=b"hunter2", associated_data=b"context")
+
+    assert b"hunter2" not in sealed
+    assert unseal(key=key, sealed=sealed, associated_data=b"context") == b"hunter2"
+
+
+@pytest.mark.parametrize(
+    "key, associated_data, tamper",
+    (
+        pytest.param(b"\x03" * 32, b"context", False, id="wrong key"),
+        pytest.param(b"\x02" * 32, b"other context", False, id="wrong associated data"),
+        pytest.param(b"\x02" * 32, b"context", True, id="modified ciphertext"),
+    ),
+)
+def test_unseal_fail(key, associated_data, tamper):
+    sealed = bytearray(seal(key=b"\x02" * 32, plaintext=b"hunter2", associated_data=b"context"))
+    if tamper:
+        sealed[-1] ^= 1
+
+    with pytest.raises(ValueError):
+        unseal(key=key, sealed=bytes(sealed), associated_data=associated_data)
@@ -0,0 +1,28 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.entry_points``."""
+import pytest
+
+from secrets_helper._util.entry_points import find_entry_points
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def test_find_entry_points():
+    found = find_entry_points("console_scripts")
+
+    assert found["secrets-helper"].value == "secrets_helper._commands:cli"
+
+
+def test_find_entry_points_unknown_group():
+    assert find_entry_points("secrets_helper.does_not_exist") == {}
@@ -12,6 +12,7 @@
 # language governing permissions and limitations under the License.
 """Unit tests to ``secrets_helper._util.command``."""
 import os
+import sys
 from typing import Iterable, List
 from unittest.mock import Mock
 
@@ -20,15 +21,19 @@ import pytest
 
 import secrets_helper._util.execute
 from secrets_helper._util.execute import (
+    SpawnTemplate,
     Tag,
     _clean_command_arguments,
     _inject_environment_variables,
     _tag_in_string,
     _value_to_triplet,
+    prepare_command,
     run_command,
 )
+from secrets_helper.tracing import TraceContext, Tracer
 
 pytestmark = [pytest.mark.unit, pytest.mark.local]
+requires_posix_spawn = pytest.mark.skipif(not hasattr(os, "posix_spawn"), reason="posix_spawn not supported")
 
 
 @pytest.mark.parametrize(
@@ -149,7 +154,9 @@ def test_run_command(monkeypatch, capsys, raw_command, expected_command, extra_e
     test = run_command(raw_command=raw_command, extra_env_vars=extra_env_vars)
 
     assert test is mock_run.return_value
-    mock_run.assert_called_once_with(expected_command, capture_output=True, env=expected_env, check=False, shell=False)
+    mock_run.assert_called_once_with(
+        expected_command, capture_output=True, env=expected_env, check=False, shell=False, pass_fds=()
+    )
 
     captured_output = capsys.readouterr()
 
@@ -167,7 +174,12 @@ def test_run_command_env_override(monkeypatch, capsys):
     run_command(raw_command="test", extra_env_vars={"z": "OVERRIDE!"})
 
     mock_run.assert_called_once_with(
-        ["test"], capture_output=True, env={"z": "OVERRIDE!", "y": "TWENTY_FIVE"}, check=False, shell=False
+        ["test"],
+        capture_output=True,
+        env={"z": "OVERRIDE!", "y": "TWENTY_FIVE"},
+        check=False,
+        shell=False,
+        pass_fds=(),
     )
 
     captured_output = capsys.readouterr()
@@ -175,3 +187,115 @@ def test_run_command_env_override(monkeypatch, capsys):
     assert not captured_output.out
 
     assert 'Environment variable "z" will be overwritten in subprocess' in captured_output.err
+
+
+@pytest.mark.parametrize(
+    "parent, expected",
+    (
+        pytest.param(
+            TraceContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", state="new=1"),
+            "new=1",
+            id="continued trace",
+        ),
+        pytest.param(None, None, id="new trace"),
+    ),
+)
+def test_prepare_command_tracestate(monkeypatch, parent, expected):
+    monkeypatch.setattr(os, "environ", {"TRACESTATE": "stale=1"})
+    tracer = Tracer(name="secrets-helper run", exporter=lambda spans: None, parent=parent)
+    try:
+        _args, env = prepare_command(raw_command="test", extra_env_vars={})
+    finally:
+        tracer.finish()
+
+    assert env.get("TRACESTATE") == expected
+
+
+@requires_posix_spawn
+def test_run_command_posix_spawn(monkeypatch, tmp_path):
+    script = tmp_path / "child.py"
+    script.write_text(
+        "import os, sys\n"
+        "sys.stdout.write(os.environ['SECRET'] * 100000)\n"
+        "sys.stderr.write(sys.argv[1])\n"
+        "sys.exit(3)\n"
+    )
+    monkeypatch.setattr(secrets_helper._util.execute.subprocess, "run", pytest.fail)
+
+    result = run_command(
+        raw_command=f"{sys.executable} {script} {{env:SECRET}}",
+        extra_env_vars={"SECRET": "s3cret"},
+        engine="posix_spawn",
+    )
+
+    assert result.args == [sys.executable, str(script), "s3cret"]
+    assert result.returncode == 3
+    assert result.stdout == b"s3cret" * 100000
+    assert result.stderr == b"s3cret"
+
+
+@requires_posix_spawn
+def test_run_command_posix_spawn_pass_fds(monkeypatch):
+    mock_run = Mock()
+    monkeypatch.setattr(secrets_helper._util.execute.subprocess, "run", mock_run)
+
+    run_command(raw_command="test", extra_env_vars={}, pass_fds=(5,), engine="posix_spawn")
+
+    assert mock_run.call_args.kwargs["pass_fds"] == (5,)
+
+
+def test_run_command_unknown_engine():
+    with pytest.raises(ValueError) as excinfo:
+        run_command(raw_command="test", extra_env_vars={}, engine="fork")
+
+    excinfo.match('Unknown spawn engine "fork"')
+
+
+@requires_posix_spawn
+def test_spawn_template_reuse(tmp_path):
+    script = tmp_path / "child.sh"
+    script.write_text("#!/bin/sh\necho $1\n")
+    script.chmod(0o700)
+    template = SpawnTemplate(command_args=["child.sh", "hello"], env={"PATH": str(tmp_path)})
+
+    results = [template.run() for _ in range(3)]
+
+    assert [(result.returncode, result.stdout) for result in results] == [(0, b"hello\n")] * 3
+
+
+@requires_posix_spawn
+def test_spawn_template_signal():
+    template = SpawnTemplate(
+        command_args=[sys.executable, "-c", "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"], env={}
+    )
+
+    assert template.run().returncode == -15
+
+
+@requires_posix_spawn
+def test_spawn_template_interrupted(monkeypatch):
+    pids = []
+    posix_spawn = os.posix_spawn
+
+    def _posix_spawn(*args, **kwargs):
+        pids.append(posix_spawn(*args, **kwargs))
+        return pids[-1]
+
+    def _read_pipes(**_kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(secrets_helper._util.execute.os, "posix_spawn", _posix_spawn)
+    monkeypatch.setattr(secrets_helper._util.execute, "_read_pipes", _read_pipes)
+    template = SpawnTemplate(command_args=[sys.executable, "-c", "import time; time.sleep(30)"], env={})
+
+    with pytest.raises(KeyboardInterrupt):
+        template.run()
+
+    (pid,) = pids
+    with pytest.raises(ChildProcessError):
+        os.waitpid(pid, os.WNOHANG)
+
+
+def test_spawn_template_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SpawnTemplate(command_args=["secrets-helper-missing-command"], env={"PATH": str(tmp_path)})
@@ -0,0 +1,145 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.file_backend``."""
+import base64
+import json
+
+import pytest
+
+from secrets_helper._util.file_backend import FileBackend, seal_secrets_file
+from secrets_helper._util.secrets import load_secrets
+from secrets_helper._util.selectors import SecretSelector
+from secrets_helper.exceptions import ConfigurationError, SecretFormatError, SecretRetrievalError
+from secrets_helper.identifiers import CACHE_KEY_ENV
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+CONTENTS = dict(
+    secrets={
+        "twine-secret": dict(username="0cool", password="hunter2"),
+        "service/alpha/one": '{"a": "ONE"}',
+        "service/beta/two": dict(b="TWO"),
+    },
+    tags={"service/beta/two": dict(team="blue")},
+    parameters={"/app/prod/port": "5432", "/app/prod/db/host": "db.example.com", "/shared/log-level": "debug"},
+)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    path = tmp_path / "secrets.sealed"
+    seal_secrets_file(path=path, contents=CONTENTS)
+    return FileBackend(path=str(path))
+
+
+def test_file_is_encrypted(tmp_path, backend):
+    assert b"hunter2" not in (tmp_path / "secrets.sealed").read_bytes()
+
+
+@pytest.mark.parametrize(
+    "secret_id",
+    (
+        "twine-secret",
+        "twine-secret@stage:AWSPREVIOUS",
+        "arn:aws:secretsmanager:us-west-2:123456789012:secret:twine-secret",
+        "arn:aws:secretsmanager:us-west-2:123456789012:secret:twine-secret-AbCdEf",
+    ),
+)
+def test_get_raw_secret_values(backend, secret_id):
+    assert list(backend.get_raw_secret_values(secret_ids=[secret_id], selectors=[])) == [
+        (secret_id, json.dumps(dict(username="0cool", password="hunter2")))
+    ]
+
+
+def test_get_raw_secret_values_selectors(backend):
+    values = backend.get_raw_secret_values(
+        secret_ids=["service/alpha/one"],
+        selectors=[SecretSelector(prefix="service/"), SecretSelector(tag_key="team", tag_value="blue")],
+    )
+
+    assert list(values) == [("service/alpha/one", '{"a": "ONE"}'), ("service/beta/two", '{"b": "TWO"}')]
+
+
+def test_get_raw_secret_values_missing(backend):
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        list(backend.get_raw_secret_values(secret_ids=["0cool"], selectors=[]))
+
+    excinfo.match('Secret "0cool" not found in secrets file')
+
+
+def test_get_parameter_values(backend):
+    values = backend.get_parameter_values(names=["/shared/log-level", "/app/prod/port"], paths=["/app/prod/"])
+
+    assert list(values) == [{"log-level": "debug"}, {"port": "5432"}, {"db/host": "db.example.com"}]
+
+
+@pytest.mark.parametrize(
+    "names, paths, message",
+    (
+        (["/app/prod/missing"], [], 'Parameters not found: "/app/prod/missing"'),
+        ([], ["/app/dev"], 'No parameters found under path "/app/dev"'),
+    ),
+)
+def test_get_parameter_values_missing(backend, names, paths, message):
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        list(backend.get_parameter_values(names=names, paths=paths))
+
+    excinfo.match(message)
+
+
+def test_load_secrets(backend):
+    values = load_secrets(secret_ids=["twine-secret"], parameter_names=["/app/prod/port"], backend=backend)
+
+    assert values == dict(username="0cool", password="hunter2", port="5432")
+
+
+def test_not_read_until_used(tmp_path):
+    backend = FileBackend(path=str(tmp_path / "missing"))
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        list(backend.get_raw_secret_values(secret_ids=["a"], selectors=[]))
+
+    excinfo.match("Unable to read secrets file")
+
+
+def test_not_a_secrets_file(tmp_path):
+    (tmp_path / "plain.json").write_text(json.dumps(CONTENTS))
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        list(FileBackend(path=str(tmp_path / "plain.json")).get_raw_secret_values(secret_ids=["a"], selectors=[]))
+
+    excinfo.match("is not a secrets file")
+
+
+def test_wrong_key(tmp_path, backend, monkeypatch):
+    monkeypatch.setenv(CACHE_KEY_ENV, base64.b64encode(b"\0" * 32).decode("ascii"))
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        list(backend.get_raw_secret_values(secret_ids=["twine-secret"], selectors=[]))
+
+    excinfo.match("Unable to decrypt secrets file")
+
+
+@pytest.mark.parametrize(
+    "contents",
+    (
+        pytest.param([], id="not an object"),
+        pytest.param(dict(values={}), id="unknown section"),
+        pytest.param(dict(secrets=[]), id="section not an object"),
+        pytest.param(dict(parameters={"/a": 1}), id="parameter not a string"),
+    ),
+)
+def test_seal_secrets_file_invalid(tmp_path, contents):
+    with pytest.raises(SecretFormatError):
+        seal_secrets_file(path=tmp_path / "secrets.sealed", contents=contents)
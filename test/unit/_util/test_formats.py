@@ -0,0 +1,99 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.formats``."""
+import json
+import shlex
+import subprocess
+
+import pytest
+
+from secrets_helper._util.formats import ENV_FORMATS, format_environment
+from secrets_helper.exceptions import SecretFormatError
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+TRICKY = dict(PLAIN="hunter2", QUOTES="say \"hi\" and 'bye'", LINES="one\ntwo\r\n", SLASH="C:\\temp\\", EMPTY="")
+
+
+def test_env_formats():
+    assert ENV_FORMATS == ("dotenv", "export", "json", "nul")
+
+
+def test_dotenv():
+    assert format_environment(environment=TRICKY) == (
+        'PLAIN="hunter2"\n'
+        'QUOTES="say \\"hi\\" and \'bye\'"\n'
+        'LINES="one\\ntwo\\r\\n"\n'
+        'SLASH="C:\\\\temp\\\\"\n'
+        'EMPTY=""\n'
+    )
+
+
+def test_dotenv_no_expansion():
+    environment = dict(DOLLAR="pa$$word ${HOME} $(id)", BACKTICK="`id`")
+
+    contents = format_environment(environment=environment)
+
+    assert contents == 'DOLLAR="pa\\$\\$word \\${HOME} \\$(id)"\nBACKTICK="\\`id\\`"\n'
+    script = contents + "".join(f'printf "%s\\0" "${key}"\n' for key in environment)
+    output = subprocess.run(["sh", "-c", script], capture_output=True, check=True).stdout.decode("utf-8")
+    assert output.split("\0")[:-1] == list(environment.values())
+
+
+def test_dotenv_one_line_per_variable():
+    assert len(format_environment(environment=TRICKY, output_format="dotenv").splitlines()) == len(TRICKY)
+
+
+def test_export_round_trip():
+    script = format_environment(environment=TRICKY, output_format="export")
+    script += "".join(f'printf "%s\\0" "${key}"\n' for key in TRICKY)
+
+    output = subprocess.run(["sh", "-c", script], capture_output=True, check=True).stdout.decode("utf-8")
+
+    assert output.split("\0")[:-1] == list(TRICKY.values())
+
+
+def test_export_invalid_name():
+    with pytest.raises(SecretFormatError) as excinfo:
+        format_environment(environment={"NOT-VALID": "value"}, output_format="export")
+
+    excinfo.match('"NOT-VALID" is not a valid shell variable name')
+
+
+def test_json():
+    assert json.loads(format_environment(environment=TRICKY, output_format="json")) == TRICKY
+
+
+def test_nul():
+    output = format_environment(environment=TRICKY, output_format="nul")
+
+    assert output.endswith("\0")
+    assert dict(entry.split("=", 1) for entry in output.split("\0")[:-1]) == TRICKY
+
+
+@pytest.mark.parametrize("environment", ({"A=B": "value"}, {"A": "value\0"}))
+def test_nul_invalid(environment):
+    with pytest.raises(SecretFormatError) as excinfo:
+        format_environment(environment=environment, output_format="nul")
+
+    excinfo.match("cannot be written in NUL-delimited format")
+
+
+def test_nul_with_env(tmp_path):
+    script = tmp_path / "entries"
+    script.write_text(format_environment(environment=dict(PLAIN="hunter2", LINES="one\ntwo"), output_format="nul"))
+
+    output = subprocess.run(
+        ["sh", "-c", f"xargs -0 env -i < {shlex.quote(str(script))}"], capture_output=True, check=True
+    ).stdout.decode("utf-8")
+
+    assert output == "PLAIN=hunter2\nLINES=one\ntwo\n"
@@ -0,0 +1,166 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.identity``."""
+import boto3
+import pytest
+
+from secrets_helper._util.identity import SecretIdIndex, SecretReference, candidate_names
+from secrets_helper.exceptions import SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import FAKE_REGION
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+class _CountingClient:
+    def __init__(self):
+        self._client = boto3.client("secretsmanager", region_name=FAKE_REGION)
+        self.describe_calls = 0
+
+    def describe_secret(self, **kwargs):
+        self.describe_calls += 1
+        return self._client.describe_secret(**kwargs)
+
+
+@pytest.mark.parametrize(
+    "secret_id, expected",
+    (
+        pytest.param(
+            "arn:aws:secretsmanager:us-west-2:111222333444:secret:MySecret-AbCdEf",
+            {"MySecret-AbCdEf", "MySecret"},
+            id="full ARN",
+        ),
+        pytest.param("arn:aws:secretsmanager:us-west-2:111222333444:secret:MySecret", {"MySecret"}, id="partial ARN"),
+        pytest.param("MySecret-AbCdEf", {"MySecret-AbCdEf"}, id="friendly name"),
+        pytest.param(b"invalid value", {b"invalid value"}, id="not a string"),
+    ),
+)
+def test_candidate_names(secret_id, expected):
+    assert candidate_names(secret_id) == expected
+
+
+_VERSION = "a1b2c3d4-90ab-cdef-fedc-ba9876543210"
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    (
+        pytest.param("secret-1", SecretReference(secret_id="secret-1"), id="unpinned"),
+        pytest.param(
+            f"secret-1@{_VERSION}", SecretReference(secret_id="secret-1", version_id=_VERSION), id="version ID"
+        ),
+        pytest.param(
+            "arn:aws:secretsmanager:us-west-2:111222333444:secret:a@b-AbCdEf@stage:AWSPREVIOUS",
+            SecretReference(
+                secret_id="arn:aws:secretsmanager:us-west-2:111222333444:secret:a@b-AbCdEf", version_stage="AWSPREVIOUS"
+            ),
+            id="version stage on ARN containing marker",
+        ),
+        pytest.param("user@example.com", SecretReference(secret_id="user@example.com"), id="marker in name"),
+        pytest.param("secret-1@stage:", SecretReference(secret_id="secret-1@stage:"), id="empty stage"),
+        pytest.param(b"invalid value", SecretReference(secret_id=b"invalid value"), id="not a string"),
+    ),
+)
+def test_secret_reference_parse(raw, expected):
+    assert SecretReference.parse(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "reference, expected",
+    (
+        pytest.param(SecretReference(secret_id="a"), dict(SecretId="a"), id="unpinned"),
+        pytest.param(SecretReference(secret_id="a", version_id="v"), dict(SecretId="a", VersionId="v"), id="version"),
+        pytest.param(
+            SecretReference(secret_id="a", version_stage="s"), dict(SecretId="a", VersionStage="s"), id="stage"
+        ),
+    ),
+)
+def test_secret_reference_request(reference, expected):
+    assert reference.request() == expected
+    assert reference.immutable is (reference.version_id is not None)
+
+
+def test_resolve_caches_lookups():
+    client = _CountingClient()
+    index = SecretIdIndex()
+
+    arn = index.resolve(client=client, secret_id="secret-1")
+    again = index.resolve(client=client, secret_id="secret-1")
+    by_arn = index.resolve(client=client, secret_id=arn)
+
+    assert arn == again == by_arn
+    assert arn.startswith("arn:aws:secretsmanager:")
+    assert client.describe_calls == 1
+
+
+def test_canonicalize_collapses_aliases():
+    client = _CountingClient()
+    index = SecretIdIndex()
+    arn = index.resolve(client=client, secret_id="secret-1")
+    partial_arn = arn[:-7]
+
+    actual = SecretIdIndex().canonicalize(
+        client=client, secret_ids=["secret-1", partial_arn, "secret-2", arn, "secret-1"]
+    )
+
+    assert actual == {SecretReference(secret_id=arn): "secret-1", SecretReference(secret_id="secret-2"): "secret-2"}
+
+
+def test_canonicalize_skips_distinct_names():
+    client = _CountingClient()
+
+    actual = SecretIdIndex().canonicalize(client=client, secret_ids=["secret-1", "secret-2", "secret-1"])
+
+    assert actual == {
+        SecretReference(secret_id="secret-1"): "secret-1",
+        SecretReference(secret_id="secret-2"): "secret-2",
+    }
+    assert client.describe_calls == 0
+
+
+def test_canonicalize_keeps_pinned_versions_apart():
+    client = _CountingClient()
+    arn = SecretIdIndex().resolve(client=client, secret_id="secret-1")
+
+    actual = SecretIdIndex().canonicalize(
+        client=client, secret_ids=["secret-1", f"{arn}@stage:AWSPREVIOUS", f"secret-1@{_VERSION}", f"{arn}@{_VERSION}"]
+    )
+
+    assert actual == {
+        SecretReference(secret_id=arn): "secret-1",
+        SecretReference(secret_id=arn, version_stage="AWSPREVIOUS"): f"{arn}@stage:AWSPREVIOUS",
+        SecretReference(secret_id=arn, version_id=_VERSION): f"secret-1@{_VERSION}",
+    }
+
+
+def test_invalidate():
+    client = _CountingClient()
+    index = SecretIdIndex()
+    arn = index.resolve(client=client, secret_id="secret-1")
+
+    index.invalidate(arn=arn)
+
+    assert "secret-1" not in index
+    assert arn not in index
+    index.resolve(client=client, secret_id="secret-1")
+    assert client.describe_calls == 2
+
+
+def test_resolve_fail():
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        SecretIdIndex().resolve(client=_CountingClient(), secret_id="0cool")
+
+    excinfo.match(r"Encountered AWS error for secret *")
@@ -0,0 +1,75 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.memory_cache``."""
+import time
+
+import pytest
+
+from secrets_helper._util.memory_cache import MemoryCache
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def test_put_get():
+    cache = MemoryCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_expired(monkeypatch):
+    cache = MemoryCache(ttl=10, max_entries=2)
+    cache.put("a", 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_no_ttl(monkeypatch):
+    cache = MemoryCache(ttl=None, max_entries=2)
+    cache.put("a", 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10 ** 6)
+
+    assert cache.get("a") == 1
+
+
+def test_evicts_least_recently_used():
+    cache = MemoryCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+@pytest.mark.parametrize("ttl, max_entries", ((0, 2), (60, 0)))
+def test_disabled(ttl, max_entries):
+    cache = MemoryCache(ttl=ttl, max_entries=max_entries)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None
+
+
+def test_clear():
+    cache = MemoryCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.clear()
+
+    assert cache.get("a") is None
@@ -0,0 +1,116 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.metrics``."""
+import threading
+
+import pytest
+
+from secrets_helper._util.metrics import MetricsRecorder, merge_textfile
+from secrets_helper.timings import Timing
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def _recorder():
+    recorder = MetricsRecorder(command="run")
+    recorder(Timing(phase="get_secret_value", start=0.0, duration=0.02, detail="secret-1"))
+    recorder(Timing(phase="get_secret_value", start=0.0, duration=0.3, detail="secret-2", error="ThrottlingException"))
+    recorder(Timing(phase="get_parameters", start=0.0, duration=0.001))
+    recorder(Timing(phase="shared_cache_hit", start=0.0, duration=0.0))
+    recorder(Timing(phase="child", start=0.0, duration=2.0))
+    recorder(Timing(phase="decode", start=0.0, duration=0.001))
+    return recorder
+
+
+def test_recorder_samples():
+    samples = _recorder().samples()
+
+    assert samples['secrets_helper_invocations_total{command="run"}'] == 1
+    assert samples['secrets_helper_api_calls_total{operation="GetSecretValue"}'] == 2
+    assert samples['secrets_helper_api_calls_total{operation="GetParameters"}'] == 1
+    assert samples['secrets_helper_api_errors_total{operation="GetSecretValue",code="ThrottlingException"}'] == 1
+    assert samples['secrets_helper_api_throttles_total{operation="GetSecretValue"}'] == 1
+    assert samples['secrets_helper_cache_hits_total{cache="shared"}'] == 1
+    assert samples['secrets_helper_api_call_duration_seconds_bucket{operation="GetSecretValue",le="0.01"}'] == 0
+    assert samples['secrets_helper_api_call_duration_seconds_bucket{operation="GetSecretValue",le="0.025"}'] == 1
+    assert samples['secrets_helper_api_call_duration_seconds_bucket{operation="GetSecretValue",le="0.5"}'] == 2
+    assert samples['secrets_helper_api_call_duration_seconds_bucket{operation="GetSecretValue",le="+Inf"}'] == 2
+    assert samples['secrets_helper_api_call_duration_seconds_sum{operation="GetSecretValue"}'] == pytest.approx(0.32)
+    assert samples['secrets_helper_child_duration_seconds_bucket{le="1"}'] == 0
+    assert samples['secrets_helper_child_duration_seconds_bucket{le="5"}'] == 1
+    assert samples["secrets_helper_child_duration_seconds_count"] == 1
+
+
+def test_recorder_escapes_labels():
+    recorder = MetricsRecorder(command='we"ird\\')
+
+    assert list(recorder.samples()) == ['secrets_helper_invocations_total{command="we\\"ird\\\\"}']
+
+
+def test_merge_textfile(tmp_path):
+    path = tmp_path / "secrets_helper.prom"
+
+    merge_textfile(path=path, samples=_recorder().samples())
+    merge_textfile(path=path, samples=MetricsRecorder(command="env").samples())
+    merge_textfile(path=path, samples=_recorder().samples())
+
+    text = path.read_text()
+    samples = _samples(text)
+    assert samples['secrets_helper_invocations_total{command="run"}'] == "2"
+    assert samples['secrets_helper_invocations_total{command="env"}'] == "1"
+    assert samples['secrets_helper_api_calls_total{operation="GetSecretValue"}'] == "4"
+    assert samples['secrets_helper_api_call_duration_seconds_bucket{operation="GetSecretValue",le="+Inf"}'] == "4"
+    assert oct(path.stat().st_mode & 0o777) == oct(0o644)
+
+    # Every sample of a family follows its TYPE line.
+    families = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(families) == len(set(families))
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE"):
+            current = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.startswith(current)
+
+
+def test_merge_textfile_keeps_unknown_samples(tmp_path):
+    path = tmp_path / "secrets_helper.prom"
+    path.write_text("# a comment\nother_metric 3\nnot a sample\n")
+
+    merge_textfile(path=path, samples={"other_metric": 1.0})
+
+    assert _samples(path.read_text()) == {"other_metric": "4"}
+
+
+def test_merge_textfile_empty(tmp_path):
+    path = tmp_path / "secrets_helper.prom"
+
+    merge_textfile(path=path, samples={})
+
+    assert not path.exists()
+
+
+def test_merge_textfile_concurrent(tmp_path):
+    path = tmp_path / "secrets_helper.prom"
+    samples = MetricsRecorder(command="run").samples()
+    threads = [threading.Thread(target=merge_textfile, kwargs=dict(path=path, samples=samples)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _samples(path.read_text()) == {'secrets_helper_invocations_total{command="run"}': "20"}
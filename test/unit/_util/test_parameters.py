@@ -0,0 +1,149 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.parameters``."""
+import time
+
+import boto3
+import pytest
+
+from secrets_helper._util.parameters import get_parameter_values, parameter_key
+from secrets_helper._util.secrets import load_parameters, load_secrets
+from secrets_helper.exceptions import ConfigurationError, SecretFormatError, SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_parameters  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import FAKE_REGION
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.fixture
+def ssm(fake_parameters):
+    """SSM client that records the operation of every call made through it."""
+    client = boto3.client("ssm", region_name=FAKE_REGION)
+    calls = []
+    client.meta.events.register("before-call.ssm.*", lambda model, **_kwargs: calls.append(model.name))
+    client.calls = calls
+    return client
+
+
+@pytest.mark.parametrize(
+    "name, path, expected",
+    (
+        ("/app/prod/port", None, "port"),
+        ("port", None, "port"),
+        ("/app/prod/db/password", "/app/prod", "db/password"),
+        ("/app/prod/db/password", "/app/prod/", "db/password"),
+        ("/app/prod/db/password", "/", "app/prod/db/password"),
+    ),
+)
+def test_parameter_key(name, path, expected):
+    assert parameter_key(name=name, path=path) == expected
+
+
+def test_get_parameter_values_by_name(ssm):
+    values = list(get_parameter_values(client=ssm, names=["/app/prod/port", "/app/prod/db/password"], paths=[]))
+
+    assert sorted(values, key=lambda value: list(value)) == [dict(password="s3cret"), dict(port="5432")]
+    assert ssm.calls == ["GetParameters"]
+
+
+def test_get_parameter_values_batches(ssm):
+    names = [f"/batch/{number}" for number in range(23)]
+    for name in names:
+        ssm.put_parameter(Name=name, Type="String", Value=name)
+    ssm.calls.clear()
+
+    values = list(get_parameter_values(client=ssm, names=names, paths=[]))
+
+    assert len(values) == 23
+    assert ssm.calls == ["GetParameters"] * 3
+
+
+def test_get_parameter_values_by_path(ssm):
+    values = list(get_parameter_values(client=ssm, names=[], paths=["/app/prod"]))
+
+    assert sorted(values, key=lambda value: list(value)) == [
+        {"db/host": "db.example.com"},
+        {"db/password": "s3cret"},
+        {"port": "5432"},
+    ]
+
+
+def test_get_parameter_values_by_name_and_path(ssm):
+    values = list(get_parameter_values(client=ssm, names=["/app/prod/port"], paths=["/app/prod"]))
+
+    # The parameter loaded by name is not loaded again by path.
+    assert values[0] == dict(port="5432")
+    assert len(values) == 3
+
+
+def test_get_parameter_values_missing(ssm):
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        list(get_parameter_values(client=ssm, names=["/app/prod/port", "/does/not/exist"], paths=[]))
+
+    excinfo.match('Parameters not found: "/does/not/exist"')
+
+
+def test_get_parameter_values_empty_path(ssm):
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        list(get_parameter_values(client=ssm, names=[], paths=["/does/not/exist"]))
+
+    excinfo.match('No parameters found under path "/does/not/exist"')
+
+
+def test_load_parameters(fake_parameters):
+    assert load_parameters(parameter_names=["/shared/log-level"], parameter_paths=["/app/prod"]) == {
+        "log-level": "debug",
+        "db/host": "db.example.com",
+        "db/password": "s3cret",
+        "port": "5432",
+    }
+
+
+def test_load_parameters_creates_one_client(fake_parameters, monkeypatch):
+    created = []
+    session_client = boto3.session.Session.client
+
+    def _client(self, service_name, **kwargs):
+        created.append(service_name)
+        time.sleep(0.05)
+        return session_client(self, service_name, **kwargs)
+
+    monkeypatch.setattr(boto3.session.Session, "client", _client)
+
+    load_parameters(parameter_names=["/shared/log-level"], parameter_paths=["/app/prod/db", "/app/prod"])
+
+    assert created == ["ssm"]
+
+
+def test_load_secrets_with_parameters(fake_parameters):
+    values = load_secrets(secret_ids=["twine-secret"], parameter_names=["/app/prod/port"])
+
+    assert values == dict(username="0cool", password="hunter2", port="5432")
+
+
+def test_load_secrets_parameter_collision(fake_parameters):
+    with pytest.raises(SecretFormatError) as excinfo:
+        load_secrets(secret_ids=["twine-secret"], parameter_names=["/app/prod/db/password"])
+
+    excinfo.match('Key "password" already loaded!')
+
+
+def test_load_secrets_parameters_not_recorded(fake_parameters, tmp_path):
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_secrets(secret_ids=["twine-secret"], parameter_names=["/app/prod/port"], record=str(tmp_path / "c"))
+
+    excinfo.match("SSM parameters cannot be recorded or replayed")
@@ -0,0 +1,73 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.profiling``."""
+import io
+import pstats
+import tracemalloc
+
+import pytest
+
+from secrets_helper._util.profiling import Profiler, active, excluded
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+def _profiled_work():
+    return sum(range(1000))
+
+
+def _excluded_work():
+    return sum(range(1000))
+
+
+def _function_names(path):
+    return {func[2] for func in pstats.Stats(str(path)).stats}
+
+
+def test_cpu_profile(tmp_path):
+    profile_out = tmp_path / "profile.pstats"
+    profiler = Profiler(profile_out=str(profile_out), memory=False)
+
+    profiler.start()
+    assert active()
+    _profiled_work()
+    with excluded():
+        _excluded_work()
+    profiler.stop(report=io.StringIO())
+
+    assert not active()
+    names = _function_names(profile_out)
+    assert "_profiled_work" in names
+    assert "_excluded_work" not in names
+
+
+def test_memory_profile():
+    report = io.StringIO()
+    profiler = Profiler(profile_out=None, memory=True)
+
+    profiler.start()
+    data = [bytearray(1024) for _ in range(100)]
+    profiler.stop(report=report)
+
+    assert not tracemalloc.is_tracing()
+    lines = report.getvalue().splitlines()
+    assert lines[0].startswith("secrets-helper peak traced memory:")
+    assert "test_profiling.py" in report.getvalue()
+    del data
+
+
+def test_excluded_without_profiler():
+    assert not active()
+
+    with excluded():
+        _excluded_work()
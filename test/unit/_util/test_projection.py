@@ -0,0 +1,140 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.projection``."""
+import json
+import re
+
+import pytest
+
+from secrets_helper._util.projection import compile_projection, is_path
+from secrets_helper.exceptions import ConfigurationError, MappingError, SecretFormatError
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+_DOCUMENT = json.dumps(
+    {
+        "db": {"password": "s3cret", "hosts": ["primary", {"name": "replica"}], "port": 5432},
+        "a/b": {"~c": "escaped"},
+        "unused": {"deep": [[{"]": "[{"}], '"\\'], "more": None},
+        "token": "t0ken",
+    }
+)
+
+
+@pytest.mark.parametrize(
+    "key, expected", (("/db/password", True), ("$.db.password", True), ("db/password", False), ("db", False))
+)
+def test_is_path(key, expected):
+    assert is_path(key) == expected
+
+
+def test_compile_projection_flat():
+    assert compile_projection(dict(a="A", b="B")) is None
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    (
+        ("/db/password", "s3cret"),
+        ("$.db.password", "s3cret"),
+        ("/db/hosts/0", "primary"),
+        ("$.db.hosts.1.name", "replica"),
+        ("/a~1b/~0c", "escaped"),
+        ("token", "t0ken"),
+    ),
+)
+def test_project(key, expected):
+    projection = compile_projection({key: "VALUE", "/db/password": "PASSWORD"})
+
+    assert projection.project(name="secret", raw_secret=_DOCUMENT)[key] == expected
+
+
+def test_project_only_mapped_keys():
+    projection = compile_projection({"/db/password": "PASSWORD", "$.db.hosts.1.name": "REPLICA", "/missing/key": "X"})
+
+    assert projection.project(name="secret", raw_secret=_DOCUMENT) == {
+        "/db/password": "s3cret",
+        "$.db.hosts.1.name": "replica",
+    }
+
+
+@pytest.mark.parametrize(
+    "mappings, key",
+    (
+        pytest.param({"/db/port": "PORT"}, "/db/port", id="number"),
+        pytest.param({"$.db.hosts": "HOSTS"}, "$.db.hosts", id="array"),
+        pytest.param({"/db": "DB", "/db/password": "PASSWORD"}, "/db", id="object with mapped member"),
+    ),
+)
+def test_project_not_a_string(mappings, key):
+    projection = compile_projection(mappings)
+
+    with pytest.raises(MappingError) as excinfo:
+        projection.project(name="secret", raw_secret=_DOCUMENT)
+
+    excinfo.match(re.escape(f'Path "{key}" in environment mapping does not refer to a string value.'))
+
+
+def test_select_not_a_string():
+    projection = compile_projection({"/db/port": "PORT"})
+
+    with pytest.raises(MappingError):
+        projection.select(json.loads(_DOCUMENT))
+
+
+def test_project_top_level_keys_unchecked():
+    projection = compile_projection({"/db/password": "PASSWORD", "db": "DB"})
+
+    assert projection.project(name="secret", raw_secret=_DOCUMENT)["db"]["port"] == 5432
+
+
+def test_project_matches_json_loads():
+    keys = ["/db/password", "/db/hosts/1/name", "/a~1b/~0c", "token"]
+    projection = compile_projection({key: key for key in keys})
+    decoded = json.loads(_DOCUMENT)
+
+    assert projection.project(name="secret", raw_secret=_DOCUMENT) == projection.select(decoded)
+
+
+@pytest.mark.parametrize(
+    "raw_secret",
+    (
+        "not json",
+        "[]",
+        '{"db": {"password": "s3cret"}',
+        '{"db": {"password": "s3cret"}} extra',
+        '{"unused": {"deep": [}',
+        '{"unused": "unterminated}',
+        '{"db" {"password": "s3cret"}}',
+    ),
+)
+def test_project_invalid(raw_secret):
+    projection = compile_projection({"/db/password": "PASSWORD"})
+
+    with pytest.raises(SecretFormatError) as excinfo:
+        projection.project(name="secret", raw_secret=raw_secret)
+
+    excinfo.match('Secret "secret" value is not JSON formatted.')
+
+
+@pytest.mark.parametrize("key", ("/", "/db/", "$.", "$.db..password"))
+def test_compile_projection_empty_segment(key):
+    with pytest.raises(ConfigurationError) as excinfo:
+        compile_projection({key: "VALUE"})
+
+    excinfo.match("Invalid path")
+
+
+def test_select_does_not_index_strings():
+    projection = compile_projection({"/token/0": "FIRST", "log-level": "LOG_LEVEL"})
+
+    assert projection.select({"token": "t0ken", "log-level": "debug"}) == {"log-level": "debug"}
@@ -0,0 +1,154 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.secret_files``."""
+import os
+import stat
+
+import boto3
+import pytest
+
+from secrets_helper._util.secret_files import SecretFileDelivery, deliver_secret_files, parse_secret_file
+from secrets_helper._util.secrets import AwsBackend, LazyClient, _get_secret_payloads
+from secrets_helper.exceptions import ConfigurationError, MappingError, SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import FAKE_REGION
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+_PAYLOAD = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def binary_secret(fake_secrets):
+    boto3.client("secretsmanager", region_name=FAKE_REGION).create_secret(Name="keystore", SecretBinary=_PAYLOAD)
+    return "keystore"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        ("keystore=KEYSTORE", ("keystore", "KEYSTORE")),
+        ("a=b=KEYSTORE", ("a=b", "KEYSTORE")),
+        (
+            "arn:aws:secretsmanager:us-west-2:111111111111:secret:ks-AbCdEf=KS",
+            ("arn:aws:secretsmanager:us-west-2:111111111111:secret:ks-AbCdEf", "KS"),
+        ),
+    ),
+)
+def test_parse_secret_file(value, expected):
+    assert parse_secret_file(value) == expected
+
+
+@pytest.mark.parametrize("value", ("keystore", "=KEYSTORE", "keystore="))
+def test_parse_secret_file_invalid(value):
+    with pytest.raises(ConfigurationError) as excinfo:
+        parse_secret_file(value)
+
+    excinfo.match("Invalid secret file mapping")
+
+
+def test_get_secret_payloads(binary_secret):
+    payloads = _get_secret_payloads(secrets_manager=LazyClient(), secret_ids=[binary_secret, "secret-1"])
+
+    assert list(payloads) == [(binary_secret, _PAYLOAD), ("secret-1", b'{"a": "ONE", "b": "TWO"}')]
+
+
+def test_get_secret_payloads_missing(fake_secrets):
+    with pytest.raises(SecretRetrievalError):
+        list(_get_secret_payloads(secrets_manager=LazyClient(), secret_ids=["missing"]))
+
+
+def test_aws_backend_payloads_not_replayed(tmp_path):
+    cassette = tmp_path / "cassette.json"
+    cassette.write_text("[]")
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        AwsBackend(replay=str(cassette)).get_secret_payloads(secret_ids=["keystore"])
+
+    excinfo.match("Secret files cannot be recorded or replayed")
+
+
+def test_delivery_temporary_file():
+    delivery = SecretFileDelivery()
+    path = delivery.deliver(env_var="KEYSTORE", data=_PAYLOAD)
+
+    assert not delivery.persistent
+    assert delivery.pass_fds == ()
+    with open(path, "rb") as payload:
+        assert payload.read() == _PAYLOAD
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+    delivery.close()
+
+    assert not os.path.exists(os.path.dirname(path))
+
+
+def test_delivery_directory(tmp_path):
+    directory = tmp_path / "files"
+    delivery = SecretFileDelivery(directory=directory)
+    path = delivery.deliver(env_var="KEYSTORE", data=b"old")
+    delivery.deliver(env_var="KEYSTORE", data=b"new")
+    delivery.close()
+
+    assert delivery.persistent
+    assert path == str(directory / "KEYSTORE")
+    assert (directory / "KEYSTORE").read_bytes() == b"new"
+    assert stat.S_IMODE((directory / "KEYSTORE").stat().st_mode) == 0o600
+
+
+@pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="memory file descriptors are not supported")
+def test_delivery_fds():
+    delivery = SecretFileDelivery(use_fds=True)
+    path = delivery.deliver(env_var="KEYSTORE", data=_PAYLOAD)
+    (fd,) = delivery.pass_fds
+
+    assert path == f"/dev/fd/{fd}"
+    for _ in range(2):
+        with open(path, "rb") as payload:
+            assert payload.read() == _PAYLOAD
+
+    delivery.close()
+
+    assert delivery.pass_fds == ()
+    with pytest.raises(OSError):
+        os.fstat(fd)
+
+
+def test_delivery_directory_and_fds(tmp_path):
+    with pytest.raises(ConfigurationError) as excinfo:
+        SecretFileDelivery(directory=tmp_path, use_fds=True)
+
+    excinfo.match("both to a directory and as file descriptors")
+
+
+def test_deliver_secret_files(tmp_path):
+    env_vars = deliver_secret_files(
+        payloads=iter([("keystore", b"one"), ("truststore", b"two")]),
+        secret_files=dict(keystore="KEYSTORE", truststore="TRUSTSTORE"),
+        delivery=SecretFileDelivery(directory=tmp_path),
+    )
+
+    assert env_vars == dict(KEYSTORE=str(tmp_path / "KEYSTORE"), TRUSTSTORE=str(tmp_path / "TRUSTSTORE"))
+    assert (tmp_path / "TRUSTSTORE").read_bytes() == b"two"
+
+
+def test_deliver_secret_files_unmapped(tmp_path):
+    with pytest.raises(MappingError) as excinfo:
+        deliver_secret_files(
+            payloads=iter([("other", b"one")]), secret_files={}, delivery=SecretFileDelivery(directory=tmp_path)
+        )
+
+    excinfo.match('Secret "other" has no secret file mapping')
@@ -12,14 +12,21 @@
 # language governing permissions and limitations under the License.
 """Unit tests to ``secrets_helper._util.secrets``."""
 import json
+import time
 from typing import Iterator, List
 
-import click
+import boto3
 import pytest
 
 import secrets_helper._util.secrets
+from secrets_helper._util.breaker import failure_state, reset_failure_state
+from secrets_helper._util.identity import SECRET_ID_INDEX
+from secrets_helper._util.projection import compile_projection
 from secrets_helper._util.secrets import _get_raw_secret_values, load_secrets, prep_secrets
+from secrets_helper.exceptions import ConfigurationError, MappingError, SecretFormatError, SecretRetrievalError
+from secrets_helper.identifiers import CACHE_DIR_ENV
 
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
 from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
 from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
 from ...functional.functional_test_utils import FAKE_SECRET_VALUES
@@ -45,22 +52,177 @@ def test_get_raw_secret_values_success():
     ),
 )
 def test_get_raw_secret_values_fail(secret_ids):
-    with pytest.raises(click.UsageError) as excinfo:
+    with pytest.raises(SecretRetrievalError) as excinfo:
         list(_get_raw_secret_values(secret_ids=secret_ids))
 
     excinfo.match(r"Encountered AWS error for secret *")
 
 
+def test_get_raw_secret_values_collapses_duplicates():
+    arn = SECRET_ID_INDEX.resolve(client=boto3.client("secretsmanager"), secret_id="secret-1")
+
+    result = list(_get_raw_secret_values(secret_ids=["secret-1", arn[:-7], arn, "secret-2"]))
+
+    assert [name for name, _value in result] == ["secret-1", "secret-2"]
+
+
+def test_get_raw_secret_values_stale_index():
+    client = boto3.client("secretsmanager")
+    old_arn = SECRET_ID_INDEX.resolve(client=client, secret_id="secret-1")
+    client.delete_secret(SecretId=old_arn, ForceDeleteWithoutRecovery=True)
+    client.create_secret(Name="secret-1", SecretString=json.dumps({"z": "NEW"}))
+
+    result = list(_get_raw_secret_values(secret_ids=["secret-1"]))
+
+    assert result == [("secret-1", json.dumps({"z": "NEW"}))]
+    assert SECRET_ID_INDEX.resolve(client=client, secret_id="secret-1") != old_arn
+
+
+def test_get_raw_secret_values_pinned_stage():
+    client = boto3.client("secretsmanager")
+    client.put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+
+    result = list(_get_raw_secret_values(secret_ids=["secret-1", "secret-1@stage:AWSPREVIOUS"]))
+
+    assert result == [
+        ("secret-1", json.dumps({"a": "NEW"})),
+        ("secret-1@stage:AWSPREVIOUS", json.dumps(FAKE_SECRET_VALUES["secret-1"])),
+    ]
+
+
+def test_get_raw_secret_values_pinned_version_cached(monkeypatch):
+    client = boto3.client("secretsmanager")
+    version_id = client.describe_secret(SecretId="secret-2")["VersionIdsToStages"].popitem()[0]
+    secret_id = f"secret-2@{version_id}"
+    expected = [(secret_id, json.dumps(FAKE_SECRET_VALUES["secret-2"]))]
+
+    assert list(_get_raw_secret_values(secret_ids=[secret_id])) == expected
+
+    client.delete_secret(SecretId="secret-2", ForceDeleteWithoutRecovery=True)
+    monkeypatch.delenv("AWS_DEFAULT_REGION")
+
+    assert list(_get_raw_secret_values(secret_ids=[secret_id])) == expected
+
+
+def test_get_raw_secret_values_pinned_version_encrypted(tmp_path):
+    client = boto3.client("secretsmanager")
+    version_id = client.describe_secret(SecretId="secret-2")["VersionIdsToStages"].popitem()[0]
+
+    list(_get_raw_secret_values(secret_ids=[f"secret-2@{version_id}"]))
+
+    for path in (tmp_path / "cache").rglob("*"):
+        if path.is_file():
+            assert b"THREE" not in path.read_bytes()
+
+
+def test_get_raw_secret_values_shared_cache():
+    client = boto3.client("secretsmanager")
+    expected = [("secret-1", json.dumps(FAKE_SECRET_VALUES["secret-1"]))]
+
+    assert list(_get_raw_secret_values(secret_ids=["secret-1"], shared_cache_ttl=60)) == expected
+
+    client.put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+
+    assert list(_get_raw_secret_values(secret_ids=["secret-1"], shared_cache_ttl=60)) == expected
+    assert list(_get_raw_secret_values(secret_ids=["secret-1"])) == [("secret-1", json.dumps({"a": "NEW"}))]
+
+
+def test_get_raw_secret_values_shared_cache_per_principal(monkeypatch):
+    client = boto3.client("secretsmanager")
+    version_id = client.describe_secret(SecretId="secret-2")["VersionIdsToStages"].popitem()[0]
+    pinned = f"secret-2@{version_id}"
+    expected = [
+        ("secret-1", json.dumps(FAKE_SECRET_VALUES["secret-1"])),
+        (pinned, json.dumps(FAKE_SECRET_VALUES["secret-2"])),
+    ]
+
+    assert list(_get_raw_secret_values(secret_ids=["secret-1", pinned], shared_cache_ttl=60)) == expected
+
+    client.put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+    client.delete_secret(SecretId="secret-2", ForceDeleteWithoutRecovery=True)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "other-principal")
+    monkeypatch.setattr(boto3, "DEFAULT_SESSION", None)
+
+    assert list(_get_raw_secret_values(secret_ids=["secret-1"], shared_cache_ttl=60)) == [
+        ("secret-1", json.dumps({"a": "NEW"}))
+    ]
+    with pytest.raises(SecretRetrievalError):
+        list(_get_raw_secret_values(secret_ids=[pinned]))
+
+
+def test_get_raw_secret_values_negative_cache():
+    with pytest.raises(SecretRetrievalError):
+        list(_get_raw_secret_values(secret_ids=["0cool"]))
+
+    boto3.client("secretsmanager").create_secret(Name="0cool", SecretString="{}")
+
+    with pytest.raises(SecretRetrievalError) as excinfo:
+        list(_get_raw_secret_values(secret_ids=["0cool"]))
+
+    excinfo.match(r"\(cached failure\)")
+
+
+def test_get_raw_secret_values_replay_ignores_failure_state(tmp_path):
+    cassette = str(tmp_path / "missing.cassette")
+    with pytest.raises(SecretRetrievalError):
+        list(_get_raw_secret_values(secret_ids=["0cool"], record=cassette))
+
+    for _ in range(2):
+        with pytest.raises(SecretRetrievalError) as excinfo:
+            list(_get_raw_secret_values(secret_ids=["0cool"], replay=cassette))
+        assert "cached failure" not in str(excinfo.value)
+
+    assert list(failure_state()) == []
+
+
+def test_load_secrets_unwritable_cache_dir(tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+    version_id = boto3.client("secretsmanager").describe_secret(SecretId="secret-2")["VersionIdsToStages"]
+    pinned = f"secret-2@{next(iter(version_id))}"
+
+    try:
+        assert load_secrets(secret_ids=["secret-1", pinned]) == {
+            **FAKE_SECRET_VALUES["secret-1"],
+            **FAKE_SECRET_VALUES["secret-2"],
+        }
+        with pytest.raises(SecretRetrievalError):
+            load_secrets(secret_ids=["0cool"])
+        with pytest.raises(SecretRetrievalError) as excinfo:
+            load_secrets(secret_ids=["0cool"])
+        excinfo.match(r"\(cached failure\)")
+    finally:
+        reset_failure_state()
+
+
+def test_get_raw_secret_values_creates_one_client(monkeypatch):
+    created = []
+    session_client = boto3.session.Session.client
+
+    def _client(self, service_name, **kwargs):
+        created.append(service_name)
+        time.sleep(0.05)
+        return session_client(self, service_name, **kwargs)
+
+    monkeypatch.setattr(boto3.session.Session, "client", _client)
+
+    values = dict(_get_raw_secret_values(secret_ids=list(FAKE_SECRET_VALUES)))
+
+    assert {name: json.loads(value) for name, value in values.items()} == FAKE_SECRET_VALUES
+    assert created == ["secretsmanager"]
+
+
 def test_get_raw_secret_values_no_region(monkeypatch):
     monkeypatch.delenv("AWS_DEFAULT_REGION")
-    with pytest.raises(click.UsageError) as excinfo:
+    with pytest.raises(ConfigurationError) as excinfo:
         list(_get_raw_secret_values(secret_ids=["foo"]))
 
     excinfo.match("Unable to determine correct AWS region")
 
 
 def _fake_get_raw_secret_values(return_value):
-    def _fake(*, secret_ids: List[str]) -> Iterator[str]:
+    def _fake(*, secret_ids: List[str], **_kwargs) -> Iterator[str]:
         for pos, each in enumerate(return_value):
             yield (f"mock-{pos}", each)
 
@@ -99,10 +261,28 @@ def test_load_secrets_fail(monkeypatch, loaded_secrets):
         secrets_helper._util.secrets, "_get_raw_secret_values", _fake_get_raw_secret_values(loaded_secrets)
     )
 
-    with pytest.raises(click.UsageError):
+    with pytest.raises(SecretFormatError):
         load_secrets(secret_ids=["secret ONE", "secret TWO"])
 
 
+def test_load_secrets_projection(monkeypatch):
+    loaded_secrets = [
+        json.dumps(dict(db=dict(password="s3cret", host="db"), unused="x")),
+        json.dumps(dict(token="t0ken", other=dict(deep=[1, 2]))),
+    ]
+    monkeypatch.setattr(
+        secrets_helper._util.secrets, "_get_raw_secret_values", _fake_get_raw_secret_values(loaded_secrets)
+    )
+    environment_mappings = {"/db/password": "DB_PASSWORD", "token": "TOKEN"}
+
+    actual = load_secrets(secret_ids=["secret ONE", "secret TWO"], projection=compile_projection(environment_mappings))
+
+    assert actual == {"/db/password": "s3cret", "token": "t0ken"}
+    assert prep_secrets(environment_mappings=environment_mappings, secret_values=actual) == dict(
+        DB_PASSWORD="s3cret", TOKEN="t0ken"
+    )
+
+
 @pytest.mark.parametrize(
     "environment_mappings, secret_values, expected",
     (
@@ -127,5 +307,5 @@ def test_prep_secrets_succeed(environment_mappings, secret_values, expected):
     "environment_mappings, secret_values", (pytest.param({}, {"a": "A"}, id="secret with no environment mapping"),)
 )
 def test_prep_secrets_fail(environment_mappings, secret_values):
-    with pytest.raises(click.UsageError):
+    with pytest.raises(MappingError):
         prep_secrets(environment_mappings=environment_mappings, secret_values=secret_values)
@@ -0,0 +1,108 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.selectors``."""
+import boto3
+import pytest
+
+from secrets_helper._util.selectors import SecretSelector, parse_tag_selector, resolve_selectors
+from secrets_helper.exceptions import ConfigurationError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        pytest.param("team=blue", SecretSelector(tag_key="team", tag_value="blue"), id="key and value"),
+        pytest.param("team=", SecretSelector(tag_key="team", tag_value=""), id="empty value"),
+        pytest.param("a=b=c", SecretSelector(tag_key="a", tag_value="b=c"), id="separator in value"),
+    ),
+)
+def test_parse_tag_selector_success(value, expected):
+    assert parse_tag_selector(value) == expected
+
+
+@pytest.mark.parametrize("value", ("team", "=blue", ""))
+def test_parse_tag_selector_fail(value):
+    with pytest.raises(ConfigurationError):
+        parse_tag_selector(value)
+
+
+@pytest.mark.parametrize(
+    "selector, secret, expected",
+    (
+        pytest.param(SecretSelector(prefix="a/"), dict(Name="a/b"), True, id="prefix match"),
+        pytest.param(SecretSelector(prefix="a/"), dict(Name="b/a/"), False, id="prefix mismatch"),
+        pytest.param(
+            SecretSelector(tag_key="k", tag_value="v"),
+            dict(Name="x", Tags=[dict(Key="k", Value="v")]),
+            True,
+            id="tag match",
+        ),
+        pytest.param(
+            SecretSelector(tag_key="k", tag_value="v"),
+            dict(Name="x", Tags=[dict(Key="k", Value="w"), dict(Key="j", Value="v")]),
+            False,
+            id="tag key and value on different tags",
+        ),
+        pytest.param(SecretSelector(tag_key="k", tag_value="v"), dict(Name="x"), False, id="no tags"),
+    ),
+)
+def test_selector_matches(selector, secret, expected):
+    assert selector.matches(secret) is expected
+
+
+def _names(secrets):
+    return sorted(secret["Name"] for secret in secrets)
+
+
+@pytest.mark.parametrize(
+    "selectors, expected",
+    (
+        pytest.param(
+            [SecretSelector(prefix="service/alpha/")], ["service/alpha/one", "service/alpha/two"], id="prefix"
+        ),
+        pytest.param([SecretSelector(tag_key="team", tag_value="blue")], ["secret-1", "secret-2"], id="tag"),
+        pytest.param(
+            [SecretSelector(tag_key="team", tag_value="blue"), SecretSelector(tag_key="stage", tag_value="prod")],
+            ["secret-1", "secret-2"],
+            id="overlapping selectors",
+        ),
+        pytest.param([SecretSelector(prefix="nope/")], [], id="no matches"),
+    ),
+)
+def test_resolve_selectors(selectors, expected):
+    client = boto3.client("secretsmanager")
+
+    actual = resolve_selectors(client=client, selectors=selectors)
+
+    assert _names(actual) == expected
+
+
+def test_resolve_selectors_cached():
+    client = boto3.client("secretsmanager")
+    selector = SecretSelector(prefix="service/alpha/")
+    first = resolve_selectors(client=client, selectors=[selector])
+
+    client.create_secret(Name="service/alpha/three", SecretString="{}")
+
+    assert resolve_selectors(client=client, selectors=[selector]) == first
+    assert _names(resolve_selectors(client=client, selectors=[selector], ttl=0)) == [
+        "service/alpha/one",
+        "service/alpha/three",
+        "service/alpha/two",
+    ]
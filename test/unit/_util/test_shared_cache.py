@@ -0,0 +1,93 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.shared_cache``."""
+import threading
+import time
+
+import pytest
+
+from secrets_helper._util.shared_cache import SharedSecretCache
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedSecretCache(directory=tmp_path / "shared", key=b"\x04" * 32)
+
+
+@pytest.mark.parametrize("ttl", (None, 60))
+def test_put_get(cache, ttl):
+    cache.put("a", "hunter2", ttl)
+
+    assert cache.get("a") == "hunter2"
+    assert cache.get("b") is None
+
+
+def test_entries_encrypted(cache, tmp_path):
+    cache.put("a", "hunter2", None)
+
+    for path in (tmp_path / "shared").iterdir():
+        assert b"hunter2" not in path.read_bytes()
+
+
+def test_expired(cache, monkeypatch):
+    cache.put("a", "hunter2", 10)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+
+    assert cache.get("a") is None
+
+
+def test_wrong_key(cache, tmp_path):
+    cache.put("a", "hunter2", None)
+
+    assert SharedSecretCache(directory=tmp_path / "shared", key=b"\x05" * 32).get("a") is None
+
+
+def test_corrupt_entry(cache, tmp_path):
+    cache.put("a", "hunter2", None)
+    for path in (tmp_path / "shared").glob("*.entry"):
+        path.write_bytes(b"SHC")
+
+    assert cache.get("a") is None
+
+
+def test_default_directory_and_key():
+    cache = SharedSecretCache()
+    cache.put("a", "hunter2", None)
+
+    assert SharedSecretCache().get("a") == "hunter2"
+
+
+def test_get_or_fetch_single_flight(cache):
+    calls = []
+
+    def _fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "hunter2"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("a", 60, _fetch))) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["hunter2"] * 5
+    assert len(calls) == 1
@@ -0,0 +1,174 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.supervise``."""
+import signal
+import sys
+import textwrap
+
+import pytest
+
+from secrets_helper._util.supervise import RestartLimiter, Supervisor
+from secrets_helper.exceptions import SecretRetrievalError
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+class FakeWatcher:
+    """Replays a sequence of environments, one per poll. ``None`` raises a retrieval error."""
+
+    def __init__(self, *environments):
+        """Set up the environments to replay."""
+        self._environments = list(environments)
+        self.environment = {}
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+        if not self._environments:
+            return set()
+        update = self._environments.pop(0)
+        if update is None:
+            raise SecretRetrievalError("Secrets Manager is unavailable")
+        changed = {key for key, value in update.items() if self.environment.get(key) != value}
+        self.environment = update
+        return changed
+
+
+class FakeClock:
+    def __init__(self):
+        """Start the clock."""
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _child(tmp_path, source):
+    script = tmp_path / "child.py"
+    script.write_text(textwrap.dedent(source))
+    return f"{sys.executable} {script} {tmp_path / 'out'}"
+
+
+def _supervisor(command, watcher, **kwargs):
+    messages = []
+    supervisor = Supervisor(
+        command=command,
+        watcher=watcher,
+        interval=0.3,
+        jitter=0,
+        limiter=RestartLimiter(min_backoff=0),
+        stop_timeout=5,
+        log=messages.append,
+        **kwargs,
+    )
+    return supervisor, messages
+
+
+def test_restart_limiter_backoff():
+    clock = FakeClock()
+    limiter = RestartLimiter(min_backoff=1, max_backoff=4, reset_after=60, clock=clock)
+
+    assert limiter.delay() == 0
+
+    delays = []
+    for _ in range(5):
+        limiter.record_start()
+        delays.append(limiter.delay())
+        clock.now += limiter.delay()
+
+    assert delays == [1, 2, 4, 4, 4]
+
+
+def test_restart_limiter_resets_after_stable_run():
+    clock = FakeClock()
+    limiter = RestartLimiter(min_backoff=1, max_backoff=4, reset_after=60, clock=clock)
+    limiter.record_start()
+    clock.now += 1
+    limiter.record_start()
+    assert limiter.delay() == 2
+
+    clock.now += 60
+    limiter.record_start()
+    assert limiter.delay() == 1
+
+
+def test_supervisor_unknown_action():
+    with pytest.raises(ValueError) as excinfo:
+        Supervisor(command="true", watcher=FakeWatcher(), on_rotate="reload")
+
+    excinfo.match('Unknown rotation action "reload"')
+
+
+def test_supervisor_returns_exit_code(tmp_path):
+    command = _child(
+        tmp_path,
+        """
+        import os, sys
+        with open(sys.argv[1], "w") as out:
+            out.write(os.environ["VALUE"])
+        sys.exit(3)
+        """,
+    )
+    supervisor, _ = _supervisor(command, FakeWatcher(dict(VALUE="first")))
+
+    assert supervisor.run() == 3
+    assert (tmp_path / "out").read_text() == "first"
+
+
+def test_supervisor_restarts_on_rotation(tmp_path):
+    command = _child(
+        tmp_path,
+        """
+        import os, sys, time
+        with open(sys.argv[1], "a") as out:
+            out.write(os.environ["VALUE"] + "\\n")
+        if os.environ["VALUE"] == "second":
+            sys.exit(0)
+        time.sleep(60)
+        """,
+    )
+    watcher = FakeWatcher(dict(VALUE="first"), None, dict(VALUE="second"))
+    supervisor, messages = _supervisor(command, watcher)
+
+    assert supervisor.run() == 0
+    assert (tmp_path / "out").read_text().splitlines() == ["first", "second"]
+    assert messages == [
+        "Error: Secrets Manager is unavailable",
+        "Rotated VALUE",
+        "Restarting command with rotated secrets",
+    ]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP is not available")
+def test_supervisor_signals_on_rotation(tmp_path):
+    command = _child(
+        tmp_path,
+        """
+        import os, signal, sys, time
+
+        def _reload(signum, frame):
+            with open(sys.argv[1], "w") as out:
+                out.write(os.environ["VALUE"])
+            sys.exit(5)
+
+        signal.signal(signal.SIGHUP, _reload)
+        time.sleep(60)
+        """,
+    )
+    watcher = FakeWatcher(dict(VALUE="first"), dict(VALUE="second"))
+    supervisor, messages = _supervisor(command, watcher, on_rotate="signal", rotate_signal=signal.SIGHUP)
+
+    assert supervisor.run() == 5
+    # The command is signalled rather than restarted, so it still has the secrets it was started with.
+    assert (tmp_path / "out").read_text() == "first"
+    assert messages == ["Rotated VALUE"]
@@ -0,0 +1,214 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper._util.watch``."""
+import json
+
+import boto3
+import pytest
+
+import secrets_helper._util.watch
+from secrets_helper._util.secrets import LazyClient
+from secrets_helper._util.shared_cache import SharedSecretCache
+from secrets_helper._util.watch import SecretWatcher, watch_secrets
+from secrets_helper.exceptions import SecretFormatError, SecretRetrievalError
+
+from ...functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ...functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+MAPPINGS = dict(a="AYE", b="BEE", c="CEE", d="DEE", e="EE")
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    names = []
+    original = secrets_helper._util.watch.get_secret_value
+
+    def _get_secret_value(**kwargs):
+        names.append(kwargs["name"])
+        return original(**kwargs)
+
+    monkeypatch.setattr(secrets_helper._util.watch, "get_secret_value", _get_secret_value)
+    return names
+
+
+def _watcher(tmp_path, secret_ids=("secret-1", "secret-2"), mappings=None):
+    return SecretWatcher(
+        client=LazyClient(),
+        secret_ids=list(secret_ids),
+        environment_mappings=MAPPINGS if mappings is None else mappings,
+        env_file=tmp_path / "secrets.env",
+        secrets_dir=tmp_path / "secrets",
+    )
+
+
+def test_first_poll_writes_everything(tmp_path):
+    watcher = _watcher(tmp_path)
+
+    assert watcher.poll() == {"AYE", "BEE", "CEE", "DEE"}
+
+    assert (tmp_path / "secrets.env").read_text() == 'AYE="ONE"\nBEE="TWO"\nCEE="THREE"\nDEE="FOUR"\n'
+    assert (tmp_path / "secrets" / "CEE").read_text() == "THREE"
+    assert (tmp_path / "secrets" / "CEE").stat().st_mode & 0o077 == 0
+
+
+def test_static_environment(tmp_path, fetched):
+    watcher = SecretWatcher(
+        client=LazyClient(),
+        secret_ids=["secret-1"],
+        environment_mappings=MAPPINGS,
+        env_file=tmp_path / "secrets.env",
+        static_environment=dict(PORT="5432"),
+    )
+
+    assert watcher.poll() == {"AYE", "BEE", "PORT"}
+    assert watcher.poll() == set()
+
+    assert watcher.environment == dict(PORT="5432", AYE="ONE", BEE="TWO")
+    assert (tmp_path / "secrets.env").read_text() == 'PORT="5432"\nAYE="ONE"\nBEE="TWO"\n'
+
+
+def test_static_environment_conflict(tmp_path):
+    watcher = SecretWatcher(
+        client=LazyClient(), secret_ids=["secret-1"], environment_mappings=MAPPINGS, static_environment=dict(AYE="1")
+    )
+
+    with pytest.raises(SecretFormatError) as excinfo:
+        watcher.poll()
+
+    excinfo.match('Environment variable "AYE" loaded from a secret and a parameter')
+
+
+def test_poll_without_changes(tmp_path, fetched):
+    watcher = _watcher(tmp_path)
+    watcher.poll()
+    before = (tmp_path / "secrets" / "AYE").stat().st_ino
+
+    assert watcher.poll() == set()
+
+    assert fetched == ["secret-1", "secret-2"]
+    assert (tmp_path / "secrets" / "AYE").stat().st_ino == before
+
+
+def test_poll_rotated_secret(tmp_path, fetched):
+    watcher = _watcher(tmp_path)
+    watcher.poll()
+    unchanged = (tmp_path / "secrets" / "CEE").stat().st_ino
+
+    boto3.client("secretsmanager").put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+
+    assert watcher.poll() == {"AYE", "BEE"}
+
+    assert fetched == ["secret-1", "secret-2", "secret-1"]
+    assert (tmp_path / "secrets" / "AYE").read_text() == "NEW"
+    assert not (tmp_path / "secrets" / "BEE").exists()
+    assert (tmp_path / "secrets" / "CEE").stat().st_ino == unchanged
+    assert (tmp_path / "secrets.env").read_text() == 'AYE="NEW"\nCEE="THREE"\nDEE="FOUR"\n'
+
+
+def test_pinned_version_not_polled(tmp_path, fetched, monkeypatch):
+    version_id = boto3.client("secretsmanager").describe_secret(SecretId="secret-1")["VersionIdsToStages"]
+    watcher = _watcher(tmp_path, secret_ids=[f"secret-1@{list(version_id)[0]}"])
+    watcher.poll()
+
+    monkeypatch.setattr(watcher, "_current_version", pytest.fail)
+
+    assert watcher.poll() == set()
+    assert len(fetched) == 1
+
+
+def test_seeded_first_poll_does_not_retrieve(tmp_path, fetched):
+    initial = dict(AYE="ONE", BEE="TWO", CEE="THREE", DEE="FOUR", PORT="5432")
+    watcher = SecretWatcher(
+        client=LazyClient(),
+        secret_ids=["secret-1", "secret-2"],
+        environment_mappings=MAPPINGS,
+        initial_environment=initial,
+    )
+
+    assert watcher.poll() == set()
+    assert watcher.poll() == set()
+
+    assert fetched == []
+    assert watcher.environment == initial
+
+
+def test_seeded_rotated_secret(tmp_path, fetched):
+    initial = dict(AYE="ONE", BEE="TWO", CEE="THREE", DEE="FOUR", PORT="5432")
+    watcher = SecretWatcher(
+        client=LazyClient(),
+        secret_ids=["secret-1", "secret-2"],
+        environment_mappings=MAPPINGS,
+        initial_environment=initial,
+    )
+    watcher.poll()
+
+    boto3.client("secretsmanager").put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+
+    assert watcher.poll() == {"AYE", "BEE"}
+    # The seeded version is retrieved once to find out that it provided BEE.
+    assert fetched == ["secret-1", "secret-1"]
+    assert watcher.environment == dict(AYE="NEW", CEE="THREE", DEE="FOUR", PORT="5432")
+
+
+def test_shared_cache(tmp_path, fetched):
+    shared_cache = SharedSecretCache(directory=tmp_path / "shared", key=b"k" * 32)
+    for _ in range(2):
+        watcher = SecretWatcher(
+            client=LazyClient(), secret_ids=["secret-1"], environment_mappings=MAPPINGS, shared_cache=shared_cache
+        )
+        assert watcher.poll() == {"AYE", "BEE"}
+
+    assert fetched == ["secret-1"]
+
+
+@pytest.mark.parametrize(
+    "secret_ids, mappings, error",
+    (
+        pytest.param(["0cool"], MAPPINGS, SecretRetrievalError, id="unknown secret"),
+        pytest.param(["secret-1@stage:AWSPREVIOUS"], MAPPINGS, SecretRetrievalError, id="unknown stage"),
+        pytest.param(["secret-1", "secret-2"], dict(a="X", b="Y", c="X", d="Z"), SecretFormatError, id="conflict"),
+    ),
+)
+def test_poll_fail(tmp_path, secret_ids, mappings, error):
+    with pytest.raises(error):
+        _watcher(tmp_path, secret_ids=secret_ids, mappings=mappings).poll()
+
+
+def test_watch_secrets(tmp_path):
+    watcher = _watcher(tmp_path)
+    changes, errors, sleeps = [], [], []
+
+    def _sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 1:
+            boto3.client("secretsmanager").put_secret_value(SecretId="secret-2", SecretString=json.dumps({"c": "3"}))
+        elif len(sleeps) == 2:
+            boto3.client("secretsmanager").delete_secret(SecretId="secret-2", ForceDeleteWithoutRecovery=True)
+
+    watch_secrets(
+        watcher=watcher,
+        interval=100,
+        jitter=0.1,
+        on_change=changes.append,
+        on_error=errors.append,
+        iterations=4,
+        sleep=_sleep,
+    )
+
+    assert changes == [{"AYE", "BEE", "CEE", "DEE"}, {"CEE", "DEE"}]
+    assert len(errors) == 2
+    assert all(isinstance(error, SecretRetrievalError) for error in errors)
+    assert len(sleeps) == 3
+    assert all(90 <= seconds <= 110 for seconds in sleeps)
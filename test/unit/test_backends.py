@@ -0,0 +1,102 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper.backends``."""
+import pytest
+
+import secrets_helper.backends
+from secrets_helper._util.file_backend import FileBackend
+from secrets_helper._util.secrets import AwsBackend
+from secrets_helper.backends import SecretBackend, backend_names, load_backend
+from secrets_helper.exceptions import ConfigurationError
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+class StaticBackend(SecretBackend):
+    def __init__(self, *, value: str = "{}"):
+        """Set up the value returned for every secret."""
+        self.value = value
+
+    def get_raw_secret_values(self, *, secret_ids, selectors):
+        return [(secret_id, self.value) for secret_id in secret_ids]
+
+
+class FakeEntryPoint:
+    def __init__(self, name, target):
+        """Set up an entry point that loads a target."""
+        self.name = name
+        self._target = target
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        return self._target
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    entry_points = dict(static=FakeEntryPoint("static", StaticBackend), broken=FakeEntryPoint("broken", object))
+    monkeypatch.setattr(secrets_helper.backends, "_entry_points", lambda: entry_points)
+    return entry_points
+
+
+@pytest.mark.parametrize(
+    "name, options, backend_class", (("aws", {}, AwsBackend), ("file", dict(path="x"), FileBackend))
+)
+def test_load_builtin_backend(monkeypatch, name, options, backend_class):
+    monkeypatch.setattr(secrets_helper.backends, "_entry_points", pytest.fail)
+
+    backend = load_backend(name, **options)
+
+    assert isinstance(backend, backend_class)
+    assert backend.name == name
+
+
+def test_load_plugin_backend(plugins):
+    backend = load_backend("static", value='{"a": "b"}')
+
+    assert isinstance(backend, StaticBackend)
+    assert backend.name == "static"
+    assert list(backend.get_raw_secret_values(secret_ids=["s"], selectors=[])) == [("s", '{"a": "b"}')]
+    assert not plugins["broken"].loaded
+
+
+@pytest.mark.parametrize(
+    "name, options, message",
+    (
+        pytest.param("missing", {}, 'Unknown backend "missing"', id="unknown backend"),
+        pytest.param("broken", {}, 'Backend "broken" is not a SecretBackend', id="not a backend"),
+        pytest.param("static", dict(colour="blue"), 'Invalid options for backend "static"', id="unknown option"),
+        pytest.param("file", {}, 'Invalid options for backend "file"', id="missing option"),
+    ),
+)
+def test_load_backend_fail(plugins, name, options, message):
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_backend(name, **options)
+
+    excinfo.match(message)
+
+
+def test_backend_names(plugins):
+    assert backend_names() == ["aws", "broken", "file", "static"]
+
+
+def test_backend_names_installed():
+    assert {"aws", "file"} <= set(backend_names())
+
+
+def test_parameters_unsupported(plugins):
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_backend("static").get_parameter_values(names=["/a"], paths=[])
+
+    excinfo.match('The "static" backend does not support parameters')
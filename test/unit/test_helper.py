@@ -0,0 +1,239 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper.helper``."""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+
+import secrets_helper.helper
+from secrets_helper import SecretsHelper
+from secrets_helper.exceptions import (
+    ConfigurationError,
+    MappingError,
+    SecretFormatError,
+    SecretRetrievalError,
+    SecretsHelperError,
+)
+from secrets_helper.identifiers import CACHE_DIR_ENV
+
+from ..functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+from ..functional.functional_test_utils import fake_region  # noqa: F401 pylint: disable=unused-import
+from ..functional.functional_test_utils import fake_secrets  # noqa: F401 pylint: disable=unused-import
+from ..functional.functional_test_utils import FAKE_REGION, FAKE_SECRET_VALUES
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.fixture
+def helper():
+    return SecretsHelper(region_name=FAKE_REGION)
+
+
+@pytest.fixture
+def get_secret_value_calls(monkeypatch):
+    calls = []
+    original = boto3.session.Session.client
+
+    def _client(session, *args, **kwargs):
+        client = original(session, *args, **kwargs)
+        original_get = client.get_secret_value
+
+        def _get_secret_value(**request):
+            calls.append(request["SecretId"])
+            return original_get(**request)
+
+        client.get_secret_value = _get_secret_value
+        return client
+
+    monkeypatch.setattr(boto3.session.Session, "client", _client)
+    return calls
+
+
+def test_get_secret_values(helper):
+    values = helper.get_secret_values(secret_ids=["secret-1", "secret-2"])
+
+    assert values == {**FAKE_SECRET_VALUES["secret-1"], **FAKE_SECRET_VALUES["secret-2"]}
+
+
+def test_get_secret_values_cached(helper, get_secret_value_calls):
+    first = helper.get_secret_values(secret_ids=["secret-1"])
+    first["a"] = "CHANGED"
+    boto3.client("secretsmanager").put_secret_value(SecretId="secret-1", SecretString=json.dumps({"a": "NEW"}))
+
+    assert helper.get_secret_values(secret_ids=["secret-1"]) == FAKE_SECRET_VALUES["secret-1"]
+    assert get_secret_value_calls == ["secret-1"]
+
+    helper.clear_cache()
+
+    assert helper.get_secret_values(secret_ids=["secret-1"]) == {"a": "NEW"}
+    assert get_secret_value_calls == ["secret-1", "secret-1"]
+
+
+def test_get_secret_values_cache_disabled(get_secret_value_calls):
+    helper = SecretsHelper(region_name=FAKE_REGION, cache_ttl=0)
+
+    helper.get_secret_values(secret_ids=["secret-1"])
+    helper.get_secret_values(secret_ids=["secret-1"])
+
+    assert get_secret_value_calls == ["secret-1", "secret-1"]
+
+
+def test_get_secret_values_collapses_duplicates(helper, get_secret_value_calls):
+    arn = boto3.client("secretsmanager").describe_secret(SecretId="secret-1")["ARN"]
+
+    for _ in range(2):
+        assert helper.get_secret_values(secret_ids=["secret-1", arn]) == FAKE_SECRET_VALUES["secret-1"]
+
+    assert len(get_secret_value_calls) == 1
+
+
+def test_get_environment(helper):
+    environment = helper.get_environment(
+        secret_ids=["twine-secret"], environment_mappings=dict(username="TWINE_USERNAME", password="TWINE_PASSWORD")
+    )
+
+    assert environment == dict(TWINE_USERNAME="0cool", TWINE_PASSWORD="hunter2")
+
+
+def test_reuses_client_per_region(helper):
+    helper.get_secret_values(secret_ids=["secret-1"])
+    client = helper._client(FAKE_REGION)[0]
+    helper.get_secret_values(secret_ids=["secret-2"], region_name=FAKE_REGION)
+
+    assert helper._client(FAKE_REGION)[0] is client
+    assert helper._client("us-east-1")[0] is not client
+
+
+def test_thread_safe(helper, get_secret_value_calls):
+    secret_ids = ["secret-1", "secret-2", "twine-secret"]
+    expected = helper.get_secret_values(secret_ids=secret_ids)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: helper.get_secret_values(secret_ids=secret_ids), range(50)))
+
+    assert all(result == expected for result in results)
+    assert sorted(get_secret_value_calls) == sorted(secret_ids)
+
+
+@pytest.mark.parametrize(
+    "secret_ids, environment_mappings, error",
+    (
+        pytest.param(["0cool"], {}, SecretRetrievalError, id="unknown secret"),
+        pytest.param(["secret-1", "secret-1@stage:AWSPREVIOUS"], {}, SecretRetrievalError, id="unknown stage"),
+        pytest.param(["secret-1"], {"a": "A"}, MappingError, id="unmapped key"),
+    ),
+)
+def test_get_environment_fail(helper, secret_ids, environment_mappings, error):
+    with pytest.raises(error) as excinfo:
+        helper.get_environment(secret_ids=secret_ids, environment_mappings=environment_mappings)
+
+    assert isinstance(excinfo.value, SecretsHelperError)
+
+
+def test_get_secret_values_not_json(helper):
+    boto3.client("secretsmanager").create_secret(Name="not-json", SecretString="not json")
+
+    with pytest.raises(SecretFormatError):
+        helper.get_secret_values(secret_ids=["not-json"])
+
+
+def test_no_region(monkeypatch):
+    monkeypatch.delenv("AWS_DEFAULT_REGION")
+
+    with pytest.raises(ConfigurationError):
+        SecretsHelper().get_secret_values(secret_ids=["secret-1"])
+
+
+def test_get_secret_values_unwritable_cache_dir(tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+
+    values = SecretsHelper().get_secret_values(secret_ids=["secret-1"])
+
+    assert values == FAKE_SECRET_VALUES["secret-1"]
+
+
+def test_get_secret_values_async(helper, get_secret_value_calls):
+    secret_ids = ["secret-1", "secret-2", "twine-secret"]
+
+    values = asyncio.run(helper.get_secret_values_async(secret_ids=secret_ids))
+
+    assert values == helper.get_secret_values(secret_ids=secret_ids)
+    assert sorted(get_secret_value_calls) == sorted(secret_ids)
+
+
+def test_get_secret_values_async_shares_cache(helper, get_secret_value_calls):
+    helper.get_secret_values(secret_ids=["secret-1"])
+
+    assert asyncio.run(helper.get_secret_values_async(secret_ids=["secret-1"])) == FAKE_SECRET_VALUES["secret-1"]
+    assert get_secret_value_calls == ["secret-1"]
+
+
+def test_get_environment_async(helper):
+    environment = asyncio.run(
+        helper.get_environment_async(
+            secret_ids=["twine-secret"],
+            environment_mappings=dict(username="TWINE_USERNAME", password="TWINE_PASSWORD"),
+        )
+    )
+
+    assert environment == dict(TWINE_USERNAME="0cool", TWINE_PASSWORD="hunter2")
+
+
+def test_get_secret_values_async_fail(helper):
+    with pytest.raises(SecretRetrievalError):
+        asyncio.run(helper.get_secret_values_async(secret_ids=["0cool"]))
+
+
+def test_get_secret_values_async_timeout(helper, monkeypatch):
+    release = threading.Event()
+
+    def _slow_get_secret_value(**_kwargs):
+        release.wait(5)
+        return dict(SecretString="{}")
+
+    monkeypatch.setattr(secrets_helper.helper, "get_secret_value", _slow_get_secret_value)
+
+    async def _load():
+        try:
+            await helper.get_secret_values_async(secret_ids=["secret-1"], timeout=0.01)
+        finally:
+            release.set()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_load())
+
+
+def test_get_secret_values_async_does_not_block_loop(helper, monkeypatch):
+    release = threading.Event()
+
+    def _blocking_get_secret_value(**_kwargs):
+        release.wait(5)
+        return dict(SecretString=json.dumps({"a": "ONE"}))
+
+    monkeypatch.setattr(secrets_helper.helper, "get_secret_value", _blocking_get_secret_value)
+
+    async def _load():
+        task = asyncio.ensure_future(helper.get_secret_values_async(secret_ids=["secret-1"]))
+        await asyncio.sleep(0.01)
+        # The loop is still running while the retrieval is blocked.
+        assert not task.done()
+        release.set()
+        return await task
+
+    assert asyncio.run(_load()) == {"a": "ONE"}
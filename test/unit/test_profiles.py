@@ -0,0 +1,134 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper.profiles``."""
+import sys
+import types
+
+import pytest
+
+import secrets_helper.profiles
+from secrets_helper.exceptions import ConfigurationError
+from secrets_helper.identifiers import CACHE_DIR_ENV, KNOWN_CONFIGS
+from secrets_helper.profiles import load_profile, profile_dirs, profile_names
+
+from ..functional.functional_test_utils import fake_cache_dir  # noqa: F401 pylint: disable=unused-import
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+TOOL_PROFILE = dict(token="TOOL_TOKEN")
+
+
+class FakeEntryPoint:
+    def __init__(self, name, value):
+        """Set up an entry point that refers to a value."""
+        self.name = name
+        self.value = value
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(monkeypatch, tmp_path):
+    directory = tmp_path / "profiles"
+    directory.mkdir()
+    monkeypatch.setenv("SECRETS_HELPER_PROFILE_PATH", str(directory))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    return directory
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    module = types.ModuleType("fake_profiles")
+    module.TOOL = TOOL_PROFILE
+    module.BROKEN = dict(token=1)
+    monkeypatch.setitem(sys.modules, "fake_profiles", module)
+    entry_points = dict(
+        tool=FakeEntryPoint("tool", "fake_profiles:TOOL"),
+        broken=FakeEntryPoint("broken", "fake_profiles:BROKEN"),
+        missing=FakeEntryPoint("missing", "fake_profiles:MISSING"),
+    )
+    scans = []
+
+    def _entry_points():
+        scans.append(True)
+        return entry_points
+
+    monkeypatch.setattr(secrets_helper.profiles, "_entry_points", _entry_points)
+    return scans
+
+
+def test_profile_dirs(tmp_path, profile_dir):
+    assert profile_dirs() == [profile_dir, tmp_path / "config" / "secrets-helper" / "profiles"]
+
+
+def test_load_builtin_profile(monkeypatch):
+    monkeypatch.setattr(secrets_helper.profiles, "_entry_points", pytest.fail)
+
+    assert load_profile("twine") == KNOWN_CONFIGS["twine"]
+
+
+def test_load_profile_file(monkeypatch, profile_dir):
+    monkeypatch.setattr(secrets_helper.profiles, "_entry_points", pytest.fail)
+    (profile_dir / "twine.config").write_text("[secrets-helper.env]\nusername: PYPI_USERNAME\n")
+
+    assert load_profile("twine") == dict(username="PYPI_USERNAME")
+
+
+def test_load_profile_file_without_mappings(profile_dir):
+    (profile_dir / "empty.config").write_text("[secrets-helper.settings]\nsecrets: a\n")
+
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_profile("empty")
+
+    excinfo.match(r"has no \[secrets-helper.env\] section")
+
+
+def test_load_entry_point_profile_is_indexed(monkeypatch, plugins):
+    assert load_profile("tool") == TOOL_PROFILE
+    assert load_profile("tool") == TOOL_PROFILE
+    assert len(plugins) == 1
+
+    monkeypatch.setattr(secrets_helper.profiles, "_fingerprint", lambda: [["changed", 0]])
+
+    assert load_profile("tool") == TOOL_PROFILE
+    assert len(plugins) == 2
+
+
+def test_load_entry_point_profile_unwritable_cache_dir(monkeypatch, tmp_path, plugins):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    monkeypatch.setenv(CACHE_DIR_ENV, str(blocker / "cache"))
+
+    assert load_profile("tool") == TOOL_PROFILE
+    assert load_profile("tool") == TOOL_PROFILE
+    assert len(plugins) == 2
+
+
+@pytest.mark.parametrize(
+    "name, message",
+    (
+        ("broken", 'Profile "broken" is not a mapping'),
+        ("missing", 'Unable to load profile "missing" from "fake_profiles:MISSING"'),
+        ("nope", 'Unknown profile "nope"'),
+        ("../twine", r'Unknown profile "\.\./twine"'),
+    ),
+)
+def test_load_profile_fail(plugins, name, message):
+    with pytest.raises(ConfigurationError) as excinfo:
+        load_profile(name)
+
+    excinfo.match(message)
+
+
+def test_profile_names(plugins, profile_dir):
+    (profile_dir / "in-house.config").write_text("[secrets-helper.env]\na: A\n")
+    (profile_dir / "notes.txt").write_text("")
+
+    assert profile_names() == ["broken", "in-house", "missing", "tool", "twine"]
@@ -0,0 +1,94 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper.timings``."""
+import botocore.exceptions
+import pytest
+
+from secrets_helper.timings import Timing, TimingRecorder, event, register_hook, timed, unregister_hook
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+
+
+@pytest.fixture
+def recorder():
+    recorder = TimingRecorder()
+    register_hook(recorder)
+    yield recorder
+    unregister_hook(recorder)
+
+
+def test_timed_without_hooks():
+    with timed("phase"):
+        pass
+
+
+def test_timed_records(recorder):
+    with timed("phase", "detail"):
+        pass
+
+    assert len(recorder.timings) == 1
+    timing = recorder.timings[0]
+    assert (timing.phase, timing.detail) == ("phase", "detail")
+    assert timing.duration >= 0
+    assert timing.start > 0
+
+
+def test_timed_records_on_error(recorder):
+    with pytest.raises(ValueError):
+        with timed("phase"):
+            raise ValueError()
+
+    assert [(timing.phase, timing.error) for timing in recorder.timings] == [("phase", "ValueError")]
+
+
+def test_timed_records_aws_error_code(recorder):
+    error = botocore.exceptions.ClientError({"Error": {"Code": "ThrottlingException"}}, "GetSecretValue")
+    with pytest.raises(botocore.exceptions.ClientError):
+        with timed("get_secret_value"):
+            raise error
+
+    assert recorder.timings[0].error == "ThrottlingException"
+
+
+def test_event(recorder):
+    event("shared_cache_hit", "detail")
+
+    assert [(timing.phase, timing.detail, timing.duration) for timing in recorder.timings] == [
+        ("shared_cache_hit", "detail", 0.0)
+    ]
+
+
+def test_unregister_hook(recorder):
+    unregister_hook(recorder)
+
+    with timed("phase"):
+        pass
+
+    register_hook(recorder)
+    assert recorder.timings == []
+
+
+def test_recorder_output():
+    recorder = TimingRecorder()
+    recorder(Timing(phase="b", start=0.5, duration=0.25, detail="secret-1"))
+    recorder(Timing(phase="a", start=0.0, duration=0.5))
+
+    assert recorder.as_json() == [
+        dict(phase="b", start=0.5, duration=0.25, detail="secret-1", error=None),
+        dict(phase="a", start=0.0, duration=0.5, detail=None, error=None),
+    ]
+    lines = recorder.summary().splitlines()
+    assert lines[0] == "secrets-helper timings:"
+    assert lines[1].split() == ["a", "500.00", "ms"]
+    assert lines[2].split() == ["b", "250.00", "ms", "secret-1"]
+    assert lines[3].split() == ["total", "750.00", "ms"]
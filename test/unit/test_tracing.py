@@ -0,0 +1,149 @@
+# Copyright 2019 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Unit tests to ``secrets_helper.tracing``."""
+import json
+
+import pytest
+
+from secrets_helper.timings import Timing, register_hook, timed, unregister_hook
+from secrets_helper.tracing import OtlpJsonFile, TraceContext, Tracer, child_environment
+
+pytestmark = [pytest.mark.unit, pytest.mark.local]
+_TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+_SPAN_ID = "00f067aa0ba902b7"
+
+
+@pytest.mark.parametrize(
+    "traceparent, expected",
+    (
+        (f"00-{_TRACE_ID}-{_SPAN_ID}-01", TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=1)),
+        (f"00-{_TRACE_ID}-{_SPAN_ID}-00", TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=0)),
+        (f" 00-{_TRACE_ID}-{_SPAN_ID}-01\n", TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=1)),
+        (f"01-{_TRACE_ID}-{_SPAN_ID}-01-future", TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=1)),
+        (None, None),
+        ("", None),
+        ("garbage", None),
+        (f"00-{_TRACE_ID}-{_SPAN_ID}-01-extra", None),
+        (f"ff-{_TRACE_ID}-{_SPAN_ID}-01", None),
+        (f"00-{'0' * 32}-{_SPAN_ID}-01", None),
+        (f"00-{_TRACE_ID}-{'0' * 16}-01", None),
+        (f"00-{_TRACE_ID.upper()}-{_SPAN_ID}-01", None),
+    ),
+)
+def test_parse_traceparent(traceparent, expected):
+    assert TraceContext.parse(traceparent) == expected
+
+
+def test_parse_tracestate():
+    context = TraceContext.parse(f"00-{_TRACE_ID}-{_SPAN_ID}-01", " congo=t61rcWkgMzE \n")
+
+    assert context == TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=1, state="congo=t61rcWkgMzE")
+    assert TraceContext.parse("garbage", "congo=t61rcWkgMzE") is None
+
+
+def test_traceparent():
+    context = TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, flags=1)
+
+    assert context.traceparent() == f"00-{_TRACE_ID}-{_SPAN_ID}-01"
+    assert TraceContext.parse(context.traceparent()) == context
+
+
+def test_tracer_continues_trace():
+    exported = []
+    parent = TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID)
+    tracer = Tracer(name="secrets-helper run", exporter=exported.append, parent=parent)
+    register_hook(tracer)
+    try:
+        with timed("get_secret_value", "secret-1"):
+            pass
+        with pytest.raises(ValueError):
+            with timed("child"):
+                raise ValueError()
+        environment = child_environment()
+    finally:
+        unregister_hook(tracer)
+    tracer.finish()
+
+    (spans,) = exported
+    root, fetch, child = spans
+    assert environment == dict(TRACEPARENT=f"00-{_TRACE_ID}-{root.span_id}-01")
+    assert (root.name, root.trace_id, root.parent_span_id) == ("secrets-helper run", _TRACE_ID, _SPAN_ID)
+    assert root.span_id != _SPAN_ID
+    assert all(span.trace_id == _TRACE_ID and span.parent_span_id == root.span_id for span in (fetch, child))
+    assert (fetch.name, fetch.attributes, fetch.client, fetch.error) == (
+        "get_secret_value",
+        {"secrets_helper.detail": "secret-1"},
+        True,
+        None,
+    )
+    assert (child.name, child.client, child.error) == ("child", False, "ValueError")
+    assert root.start_time <= fetch.start_time <= fetch.end_time <= child.start_time <= child.end_time
+    assert child.end_time <= root.end_time
+    assert child_environment() == {}
+
+
+def test_tracer_propagates_tracestate():
+    parent = TraceContext(trace_id=_TRACE_ID, span_id=_SPAN_ID, state="congo=t61rcWkgMzE")
+    tracer = Tracer(name="secrets-helper run", exporter=lambda spans: None, parent=parent)
+
+    environment = child_environment()
+    tracer.finish()
+
+    assert environment == dict(
+        TRACEPARENT=f"00-{_TRACE_ID}-{tracer.context.span_id}-01", TRACESTATE="congo=t61rcWkgMzE"
+    )
+
+
+def test_tracer_new_trace():
+    exported = []
+    tracer = Tracer(name="secrets-helper env", exporter=exported.append)
+    tracer.finish()
+
+    (root,) = exported[0]
+    assert len(root.trace_id) == 32
+    assert root.parent_span_id is None
+
+
+def test_tracer_not_sampled():
+    exported = []
+    tracer = Tracer(
+        name="secrets-helper run", exporter=exported.append, parent=TraceContext(_TRACE_ID, _SPAN_ID, flags=0)
+    )
+
+    assert child_environment()["TRACEPARENT"].endswith("-00")
+    tracer.finish()
+
+    assert exported == []
+
+
+def test_otlp_json_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = OtlpJsonFile(str(path))
+    tracer = Tracer(name="secrets-helper run", exporter=exporter, parent=TraceContext(_TRACE_ID, _SPAN_ID))
+    tracer(Timing(phase="get_secret_value", start=0.0, duration=0.5, detail="secret-1", error="ThrottlingException"))
+    tracer.finish()
+    Tracer(name="secrets-helper env", exporter=exporter).finish()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    (resource,) = json.loads(lines[0])["resourceSpans"]
+    assert resource["resource"]["attributes"] == [dict(key="service.name", value=dict(stringValue="secrets-helper"))]
+    (scope,) = resource["scopeSpans"]
+    root, fetch = scope["spans"]
+    assert root["traceId"] == fetch["traceId"] == _TRACE_ID
+    assert root["parentSpanId"] == _SPAN_ID
+    assert fetch["parentSpanId"] == root["spanId"]
+    assert fetch["kind"] == 3
+    assert fetch["status"] == dict(code=2, message="ThrottlingException")
+    assert int(fetch["endTimeUnixNano"]) - int(fetch["startTimeUnixNano"]) == 500000000
+    assert fetch["attributes"] == [dict(key="secrets_helper.detail", value=dict(stringValue="secret-1"))]